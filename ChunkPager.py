@@ -0,0 +1,204 @@
+from PyQt5.QtCore import QObject, QRectF
+
+import map_chunks
+from MapJournal import journal_id
+from map_records import item_record
+from TextureDecoder import TextureDecoder
+
+
+class ChunkPager(QObject):
+    """Keeps only the chunks of a chunked map near the view in the scene.
+
+    update() pages in the chunks with geometry around the visible area and
+    pages out the ones that scrolled far away, so the number of items in the
+    scene stays about the same however long the map is. An item belongs to
+    the chunk its left edge lies in, wherever it came from.
+
+    A chunk paged out unchanged is dropped and read from the map file again
+    when needed. Edited chunks are kept as records, with the journal ids of
+    their items, and paged in from those.
+    """
+
+    def __init__(self, scene, journal, add_data, resolve, parent=None):
+        """add_data(data) adds map data to the scene, resolve maps a texture path to a file"""
+        super().__init__(parent)
+        self.scene = scene
+        self.journal = journal
+        self.add_data = add_data
+        self.resolve = resolve
+        self.map = None
+        self.frozen = False
+        self._loaded = {}  # chunk index -> {journal id: record} as paged in
+        self._edited = set()  # loaded chunks that came from _stash
+        self._stash = {}  # chunk index -> {journal id: record} of edited chunks paged out
+        self._bounds = {}  # chunk index -> (left, top, right, bottom) of its geometry
+
+    def is_active(self):
+        return self.map is not None
+
+    @property
+    def chunk_width(self):
+        return self.map.chunk_width
+
+    def open(self, path):
+        """Start paging a chunked map, returns its global data to add to the scene"""
+        self.close()
+        self.map = map_chunks.ChunkedMap.open(path)
+        self._bounds = {index: self.map.bounds(index) for index in self.map.chunks}
+        print(f"Opened {path}: {len(self.map.chunks)} chunks of {self.map.chunk_width} units")
+        return dict(self.map.meta)
+
+    def reopen(self, path):
+        """Continue with the file a save just wrote, the scene and edits stay as they are"""
+        self.map = map_chunks.ChunkedMap.open(path)
+        for index in self.map.chunks:
+            if index not in self._stash:
+                self._bounds[index] = self.map.bounds(index)
+
+    def close(self):
+        self.map = None
+        self.frozen = False
+        self._loaded = {}
+        self._edited = set()
+        self._stash = {}
+        self._bounds = {}
+
+    def bounds(self):
+        """Rect of all geometry of the map, loaded or not"""
+        rect = QRectF()
+        for left, top, right, bottom in self._bounds.values():
+            rect = rect.united(QRectF(left, top, max(right - left, 1), max(bottom - top, 1)))
+        return rect
+
+    def loaded_chunks(self):
+        return sorted(self._loaded)
+
+    def journaled_chunks(self):
+        """Chunks whose items are in the scene or stashed"""
+        return set(self._loaded) | set(self._stash)
+
+    def stashed_records(self):
+        """(journal id, record) pairs of the edited chunks paged out"""
+        return [pair for records in self._stash.values() for pair in records.items()]
+
+    def paged_out_records(self):
+        """Records of every item not in the scene, for saving the whole map"""
+        records = []
+        for stashed in self._stash.values():
+            records.extend(stashed.values())
+        for index in self.map.chunks:
+            if index not in self._loaded and index not in self._stash:
+                for kind, entries in self.map.chunk(index).items():
+                    records.extend((kind, entry) for entry in entries)
+        return records
+
+    def update(self, visible_rect):
+        """Page chunks in and out for the area shown by the view"""
+        if self.map is None or self.frozen:
+            return
+        # Prefetch a screen to either side, keep chunks until they are three away
+        margin = max(visible_rect.width(), self.chunk_width)
+        wanted = self._chunks_in(visible_rect.left() - margin, visible_rect.right() + margin)
+        keep = self._chunks_in(visible_rect.left() - 3 * margin, visible_rect.right() + 3 * margin)
+
+        for index in sorted(set(self._loaded) - keep):
+            self.page_out(index)
+        # Nearest first
+        center = visible_rect.center().x()
+        for index in sorted(wanted - set(self._loaded), key=lambda i: abs((i + 0.5) * self.chunk_width - center)):
+            self.page_in(index)
+
+    def _chunks_in(self, left, right):
+        """Chunks with geometry between left and right, plus the empty strips there"""
+        chunks = {index for index, (l, _, r, _) in self._bounds.items() if l <= right and r >= left}
+        chunks.update(range(map_chunks.chunk_index(left, self.chunk_width),
+                            map_chunks.chunk_index(right, self.chunk_width) + 1))
+        return chunks
+
+    def load_all(self):
+        """Page in every chunk and stop paging, e.g. before saving in another format"""
+        if self.map is None:
+            return
+        for index in set(self._bounds) - set(self._loaded):
+            self.page_in(index)
+        self.close()
+
+    def page_in(self, index):
+        stashed = self._stash.pop(index, None)
+        if stashed is not None:
+            jids = []
+            data = {}
+            # Same order as add_data creates them, to hand back the journal ids
+            for section in map_chunks.CHUNKED_SECTIONS:
+                for jid, (kind, record) in stashed.items():
+                    if kind == section:
+                        data.setdefault(section, []).append(record)
+                        jids.append(jid)
+        else:
+            data = self.map.chunk(index)
+
+        created = []
+        self.scene.itemAdded.connect(created.append)
+        try:
+            with self.journal.suspended():
+                self.add_data(data)
+        finally:
+            self.scene.itemAdded.disconnect(created.append)
+
+        if stashed is not None:
+            for item, jid in zip(created, jids):
+                item._journal_id = jid
+            self._edited.add(index)
+        else:
+            self.journal.adopt_chunk(index, created)
+        self._loaded[index] = self._records(created)
+
+        decoder = TextureDecoder.instance()
+        for item in created:
+            texture_path = getattr(item, "texture_path", None)
+            if texture_path:
+                decoder.attach(item, self.resolve(texture_path), texture_path)
+
+    def page_out(self, index):
+        items = self._items_of(index)
+        records = self._records(items)
+        if index in self._edited or records != self._loaded[index]:
+            # Kept until paged in again, the journal still has these items
+            self._stash[index] = records
+            bounds = None
+            for kind, record in records.values():
+                bounds = map_chunks.unite_bounds(bounds, map_chunks.entry_bounds(kind, record))
+            if bounds is None:
+                self._bounds.pop(index, None)
+            else:
+                self._bounds[index] = bounds
+        else:
+            self.journal.release_chunk(index, items)
+
+        with self.journal.suspended():
+            for item in items:
+                self.scene.removeItem(item)
+        del self._loaded[index]
+        self._edited.discard(index)
+
+    def _items_of(self, index):
+        """Scene items whose left edge lies in the chunk"""
+        left = index * self.chunk_width
+        strip = QRectF(left, -1e7, self.chunk_width, 2e7)
+        items = []
+        for item in self.scene.items(strip):
+            record = item_record(item)
+            if record is None or record[0] not in map_chunks.CHUNKED_SECTIONS:
+                continue
+            if map_chunks.chunk_index(map_chunks.entry_bounds(*record)[0], self.chunk_width) == index:
+                items.append(item)
+        return items
+
+    @staticmethod
+    def _records(items):
+        records = {}
+        for item in items:
+            record = item_record(item)
+            if record is not None:
+                records[journal_id(item)] = record
+        return records
@@ -92,16 +92,8 @@ class DraggableListWidget(QListWidget):
                     # Copy the file to the textures folder
                     dest_path = os.path.join(textures_folder, os.path.basename(file_path))
                     shutil.copy2(file_path, dest_path)
-                    
-                    # Add the new texture to the list
-                    pixmap = QPixmap(dest_path)
-                    if not pixmap.isNull():
-                        thumb = pixmap.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                        item = QListWidgetItem(QIcon(thumb), os.path.basename(dest_path))
-                        item.setData(Qt.UserRole, dest_path)
-                        self.addItem(item)
             
-            # Signal that textures have been added
+            # Signal that textures have been added, the panel lists them with background thumbnails
             self.textureAdded.emit()
         else:
             super().dropEvent(event)
@@ -0,0 +1,75 @@
+from PyQt5.QtWidgets import QGraphicsItem, QGraphicsPolygonItem
+from PyQt5.QtGui import QPolygonF, QPen
+from PyQt5.QtCore import Qt, QRectF
+
+
+class DuplicateGhost(QGraphicsItem):
+    """Semi-transparent preview of the shapes being Shift-drag duplicated.
+
+    The outlines and brushes of all dragged shapes are captured once and drawn
+    by this single item. Device coordinate caching turns it into one pixmap, so
+    moving the preview is a blit no matter how many shapes are selected. The
+    real copies are only created in commit().
+    """
+
+    def __init__(self, items, parent=None):
+        super().__init__(parent)
+
+        # Only shapes that know how to copy themselves can be duplicated
+        self._sources = [item for item in items if hasattr(item, "duplicate")]
+        self._shapes = []
+        self._bounds = QRectF()
+
+        for item in self._sources:
+            if isinstance(item, QGraphicsPolygonItem):
+                outline = QPolygonF(item.polygon())
+            else:
+                outline = QPolygonF(item.rect())
+            outline = item.mapToScene(outline)
+
+            if item.texture_pixmap and not item.texture_pixmap.isNull():
+                # Move the brush from item to scene coordinates
+                brush = item.texture_brush()
+                brush.setTransform(brush.transform() * item.sceneTransform())
+                pen = QPen(Qt.NoPen)
+            else:
+                brush = item.brush()
+                pen = item.pen()
+
+            self._shapes.append((outline, brush, pen))
+            self._bounds = self._bounds.united(outline.boundingRect())
+
+        if self._sources:
+            self.setZValue(max(item.zValue() for item in self._sources) + 1)
+
+        self.setOpacity(0.5)
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+
+    def boundingRect(self):
+        return self._bounds
+
+    def paint(self, painter, option, widget=None):
+        for outline, brush, pen in self._shapes:
+            painter.setPen(pen)
+            painter.setBrush(brush)
+            painter.drawPolygon(outline)
+
+    def commit(self):
+        """Replace the preview with real copies at the current offset and select them"""
+        scene = self.scene()
+        offset = self.pos()
+        if scene is None:
+            return []
+
+        scene.removeItem(self)
+
+        copies = [item.duplicate(offset) for item in self._sources]
+        for copy in copies:
+            scene.addItem(copy)
+
+        scene.clearSelection()
+        for copy in copies:
+            copy.setSelected(True)
+
+        return copies
@@ -0,0 +1,102 @@
+from PyQt5.QtWidgets import QDialog, QFormLayout, QCheckBox, QComboBox, QSpinBox, QDialogButtonBox, QVBoxLayout
+
+from exporter import DEFAULT_EXPORT_OPTIONS
+
+
+class ExportDialog(QDialog):
+    """Options for exporting a map for the game"""
+
+    ATLAS_SIZES = [512, 1024, 2048, 4096, 8192]
+    CELL_SIZES = [128, 256, 512, 1024]
+
+    def __init__(self, options=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export Map")
+
+        opts = dict(DEFAULT_EXPORT_OPTIONS)
+        if options:
+            opts.update(options)
+
+        self.main_layout = QVBoxLayout()
+        self.setLayout(self.main_layout)
+        self.layout = QFormLayout()
+        self.main_layout.addLayout(self.layout)
+
+        self.merge_check = QCheckBox("Merge adjacent rectangles of the same type and texture")
+        self.merge_check.setChecked(opts["merge_rects"])
+        self.merge_check.toggled.connect(self._on_merge_toggled)
+        self.layout.addRow(self.merge_check)
+
+        self.merge_scene_check = QCheckBox("Also merge them in the editor")
+        self.merge_scene_check.setChecked(opts["merge_in_scene"])
+        self.layout.addRow(self.merge_scene_check)
+
+        self.hidden_check = QCheckBox("Leave out shapes hidden behind opaque rectangles")
+        self.hidden_check.setChecked(opts["drop_hidden"])
+        self.layout.addRow(self.hidden_check)
+
+        self.atlas_check = QCheckBox("Pack textures into atlases")
+        self.atlas_check.setChecked(opts["atlas"])
+        self.atlas_check.toggled.connect(self._on_atlas_toggled)
+        self.layout.addRow(self.atlas_check)
+
+        self.atlas_size_combo = QComboBox()
+        for size in self.ATLAS_SIZES:
+            self.atlas_size_combo.addItem(f"{size} x {size}", size)
+        index = self.atlas_size_combo.findData(opts["atlas_size"])
+        self.atlas_size_combo.setCurrentIndex(index if index >= 0 else self.ATLAS_SIZES.index(2048))
+        self.layout.addRow("Atlas size:", self.atlas_size_combo)
+
+        self.atlas_padding_spin = QSpinBox()
+        self.atlas_padding_spin.setRange(0, 16)
+        self.atlas_padding_spin.setValue(opts["atlas_padding"])
+        self.layout.addRow("Padding:", self.atlas_padding_spin)
+
+        self.atlas_tiled_check = QCheckBox("Keep repeat-tiled textures separate")
+        self.atlas_tiled_check.setChecked(opts["atlas_exclude_tiled"])
+        self.layout.addRow(self.atlas_tiled_check)
+
+        self.broadphase_check = QCheckBox("Precompute the collision grid")
+        self.broadphase_check.setChecked(opts["broadphase"])
+        self.broadphase_check.toggled.connect(self._on_broadphase_toggled)
+        self.layout.addRow(self.broadphase_check)
+
+        self.cell_size_combo = QComboBox()
+        for size in self.CELL_SIZES:
+            self.cell_size_combo.addItem(f"{size} x {size}", size)
+        index = self.cell_size_combo.findData(opts["broadphase_cell_size"])
+        self.cell_size_combo.setCurrentIndex(index if index >= 0 else self.CELL_SIZES.index(256))
+        self.layout.addRow("Grid cell size:", self.cell_size_combo)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        self.main_layout.addWidget(buttons)
+
+        self._on_merge_toggled(self.merge_check.isChecked())
+        self._on_atlas_toggled(self.atlas_check.isChecked())
+        self._on_broadphase_toggled(self.broadphase_check.isChecked())
+
+    def _on_merge_toggled(self, checked):
+        self.merge_scene_check.setEnabled(checked)
+
+    def _on_atlas_toggled(self, checked):
+        self.atlas_size_combo.setEnabled(checked)
+        self.atlas_padding_spin.setEnabled(checked)
+        self.atlas_tiled_check.setEnabled(checked)
+
+    def _on_broadphase_toggled(self, checked):
+        self.cell_size_combo.setEnabled(checked)
+
+    def options(self):
+        return {
+            "merge_rects": self.merge_check.isChecked(),
+            "merge_in_scene": self.merge_check.isChecked() and self.merge_scene_check.isChecked(),
+            "drop_hidden": self.hidden_check.isChecked(),
+            "atlas": self.atlas_check.isChecked(),
+            "atlas_size": self.atlas_size_combo.currentData(),
+            "atlas_padding": self.atlas_padding_spin.value(),
+            "atlas_exclude_tiled": self.atlas_tiled_check.isChecked(),
+            "broadphase": self.broadphase_check.isChecked(),
+            "broadphase_cell_size": self.cell_size_combo.currentData(),
+        }
@@ -4,6 +4,8 @@ from PyQt5.QtCore import Qt, QPointF, pyqtSignal, QObject
 
 from config import GRID_SIZE
 from utils import snap_value
+import map_model
+from map_records import mark_edited
 
 class PlayerSpawnpointSignals(QObject):
     finishLineChanged = pyqtSignal(object)
@@ -26,6 +28,20 @@ class FinishLine(QGraphicsPixmapItem):
         # Center the pixmap at the position
         #self.setOffset(-pixmap.width() / 2, -pixmap.height() / 2)
         
+    @classmethod
+    def from_record(cls, record):
+        """Create the finish line for a map_model.Finish"""
+        return cls(QPointF(record.x, record.y))
+
+    def to_record(self):
+        """Describe this finish line as a map_model.Finish"""
+        return map_model.Finish(x=self.pos().x(), y=self.pos().y())
+
+    def notify_changed(self):
+        """Tell the properties panel and the scene, e.g. the journal, that the item was edited"""
+        self.signals.finishLineChanged.emit(self)
+        mark_edited(self)
+
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemPositionChange and self.scene():
             grid_size = GRID_SIZE
@@ -42,7 +58,7 @@ class FinishLine(QGraphicsPixmapItem):
             return snapped_pos
             
         if change == QGraphicsItem.ItemPositionHasChanged:
-            self.signals.finishLineChanged.emit(self)
+            self.notify_changed()
             
         return super().itemChange(change, value)
     
@@ -1,13 +1,21 @@
-from PyQt5.QtCore import Qt, QPoint, QRectF, QEvent
+from PyQt5.QtCore import Qt, QPoint, QRectF, QEvent, pyqtSignal
 from PyQt5.QtWidgets import QGraphicsView
 from PyQt5.QtGui import QPixmap, QBrush
 
+from TextureDecoder import TextureDecoder
+
 class GraphicsView(QGraphicsView):
+    # The visible part of the scene moved, was zoomed or resized
+    viewportChanged = pyqtSignal()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._panning = False
         self._pan_start_pos = QPoint()
 
+        # Area the scene rect always covers, e.g. geometry of chunks not loaded
+        self.content_rect = QRectF()
+
         self._sky_image_path = None
         self._sky_pixmap = None
         self._has_sky = False
@@ -23,6 +31,8 @@ class GraphicsView(QGraphicsView):
         # Connect directly to scrollbar valueChanged signals
         self.horizontalScrollBar().valueChanged.connect(self._on_scrollbar_value_changed)
         self.verticalScrollBar().valueChanged.connect(self._on_scrollbar_value_changed)
+        self.horizontalScrollBar().rangeChanged.connect(self.viewportChanged)
+        self.verticalScrollBar().rangeChanged.connect(self.viewportChanged)
         
     def keyPressEvent(self, event):
         # Check for Ctrl+A
@@ -152,6 +162,8 @@ class GraphicsView(QGraphicsView):
             
             # Make sure the visible area is included
             min_rect = min_rect.united(visible_rect)
+            if not self.content_rect.isEmpty():
+                min_rect = min_rect.united(self.content_rect)
             
             # Update scene rect if it's different
             if min_rect != scene_rect:
@@ -171,6 +183,10 @@ class GraphicsView(QGraphicsView):
         # Ensure we don't go smaller than the initial scene size (1024x768)
         min_rect = QRectF(0, 0, 1024, 768)
         new_rect = new_rect.united(min_rect)
+
+        # Keep room for geometry that is not in the scene right now
+        if not self.content_rect.isEmpty():
+            new_rect = new_rect.united(self.content_rect)
         
         # Update scene rect if it's different
         if new_rect != scene_rect:
@@ -193,9 +209,10 @@ class GraphicsView(QGraphicsView):
     def set_sky_image(self, image_path=None):
         """Set a fixed sky image that doesn't move when scrolling or zooming"""
         if image_path:
-            self._sky_pixmap = QPixmap(image_path)
+            self._sky_pixmap = None
             self._sky_image_path = image_path  # Store the original file path
             self._has_sky = True
+            TextureDecoder.instance().request(image_path, self._on_sky_decoded)
         else:
             self._sky_pixmap = None
             self._sky_image_path = None
@@ -205,21 +222,34 @@ class GraphicsView(QGraphicsView):
     def set_overlay_image(self, image_path=None):
         """Set a fixed background image that doesn't move when scrolling or zooming"""
         if image_path:
-            self._overlay_pixmap = QPixmap(image_path)
+            self._overlay_pixmap = None
             self._overlay_image_path = image_path  # Store the original file path
             self._has_overlay = True
+            TextureDecoder.instance().request(image_path, self._on_overlay_decoded)
         else:
             self._overlay_pixmap = None
             self._overlay_image_path = None
             self._has_overlay = False
         self.viewport().update()
         
+    def _on_sky_decoded(self, image_path, pixmap):
+        # The sky may have been changed or removed while decoding
+        if image_path == self._sky_image_path:
+            self._sky_pixmap = pixmap
+            self.viewport().update()
+
+    def _on_overlay_decoded(self, image_path, pixmap):
+        if image_path == self._overlay_image_path:
+            self._overlay_pixmap = pixmap
+            self.viewport().update()
+
     def resizeEvent(self, event):
         """Handle resize events to ensure the sky stays fixed"""
         super().resizeEvent(event)
         # Force viewport update when the view is resized
         if self._has_sky:
             self.viewport().update()
+        self.viewportChanged.emit()
             
     def eventFilter(self, obj, event):
         """Filter events for scrollbars to update the sky when scrolling"""
@@ -236,6 +266,7 @@ class GraphicsView(QGraphicsView):
         if self._has_sky:
             # Force a complete viewport update to redraw the fixed background
             self.viewport().update()
+        self.viewportChanged.emit()
         
     def drawBackground(self, painter, rect):
         """Override to draw the fixed background image"""
@@ -1,5 +1,6 @@
 from PyQt5.QtCore import QPointF
 from PyQt5.QtWidgets import QWidget, QFormLayout, QDoubleSpinBox, QComboBox, QVBoxLayout, QSpinBox, QCheckBox
+from map_records import mark_edited
 
 
 class ItemPropertyPanel(QWidget):
@@ -52,6 +53,7 @@ class ItemPropertyPanel(QWidget):
         if self._item is not None and hasattr(self._item, 'item_type'):
             self._item.item_type = new_type
             self._item.update()
+            mark_edited(self._item)
 
     def _on_edit(self, value):
         """Handle property value changes"""
@@ -77,6 +79,7 @@ class ItemPropertyPanel(QWidget):
 
         # Update item appearance
         self._item.update()
+        mark_edited(self._item)
 
     def set_item(self, item):
         """Set the item to be edited"""
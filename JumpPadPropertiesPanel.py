@@ -2,6 +2,7 @@ from PyQt5.QtCore import QPointF
 from PyQt5.QtWidgets import QWidget, QFormLayout, QDoubleSpinBox, QComboBox, QVBoxLayout, QSpinBox
 
 import MapJumpPad
+from map_records import mark_edited
 
 
 class JumpPadPropertiesPanel(QWidget):
@@ -72,6 +73,7 @@ class JumpPadPropertiesPanel(QWidget):
 
         # Update item appearance
         self._jump_pad.update()
+        mark_edited(self._jump_pad)
 
     def set_jump_pad(self, jump_pad: MapJumpPad):
         """Set the item to be edited"""
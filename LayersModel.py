@@ -0,0 +1,244 @@
+from bisect import bisect_left
+from itertools import count
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+
+from DuplicateGhost import DuplicateGhost
+
+
+class LayersModel(QAbstractListModel):
+    """List model over the scene items in z-order, topmost item first.
+
+    The model follows the scene through the MapScene signals instead of being
+    rebuilt, so adding, removing or restacking one item costs a single row
+    insert/remove/move notification. Additions are collected until the event
+    loop runs again, so loading a map or committing a duplication is applied
+    as one reset instead of thousands of inserts.
+    """
+
+    ItemRole = Qt.UserRole
+
+    # Above this many queued additions a full re-sort is cheaper than inserting
+    BATCH_RESET_THRESHOLD = 64
+
+    LAYER_NAMES = {
+        "MapRect": "Rectangle",
+        "MapTriangle": "Triangle",
+        "MapItem": "Item",
+        "MapPortal": "Portal",
+        "MapJumpPad": "Jump Pad",
+        "PlayerSpawnpoint": "Player Spawnpoint",
+        "StartLine": "Start Line",
+        "FinishLine": "Finish Line",
+    }
+
+    def __init__(self, scene, parent=None):
+        super().__init__(parent)
+        self.scene = scene
+
+        # Rows are kept sorted by (-z, -insertion order), which matches the
+        # stacking order Qt uses for items with equal z values
+        self._items = []
+        self._keys = []
+        self._key_of = {}
+        self._pending = []
+        self._counter = count()
+        self._writing_z = False
+
+        for item in scene.items(Qt.AscendingOrder):
+            if self._accepts(item):
+                self._key_of[item] = (-item.zValue(), -next(self._counter))
+        self._rebuild()
+
+        scene.itemAdded.connect(self._on_item_added)
+        scene.itemRemoved.connect(self._on_item_removed)
+        scene.itemZChanged.connect(self._on_item_z_changed)
+        scene.aboutToClear.connect(self._on_about_to_clear)
+
+    def _accepts(self, item):
+        return item.parentItem() is None and not isinstance(item, DuplicateGhost)
+
+    def _rebuild(self):
+        self._items = sorted(self._key_of, key=self._key_of.__getitem__)
+        self._keys = [self._key_of[item] for item in self._items]
+
+    def _row_of(self, item):
+        return bisect_left(self._keys, self._key_of[item])
+
+    # --- Qt model interface ---
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._items):
+            return None
+        item = self._items[index.row()]
+        if role == Qt.DisplayRole:
+            name = self.LAYER_NAMES.get(type(item).__name__, type(item).__name__)
+            detail = getattr(item, "stype", None) or getattr(item, "item_type", None)
+            if detail:
+                return f"{name} ({detail})"
+            return name
+        if role == self.ItemRole:
+            return item
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            # Dropping between rows
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def item_at(self, row):
+        self._flush()
+        return self._items[row]
+
+    def row_of(self, item):
+        """Row of a scene item, or -1 if it is not listed"""
+        self._flush()
+        if item not in self._key_of:
+            return -1
+        return self._row_of(item)
+
+    # --- Scene notifications ---
+
+    def _on_item_added(self, item):
+        if not self._accepts(item) or item in self._key_of:
+            return
+        if not self._pending:
+            QTimer.singleShot(0, self._flush)
+        self._pending.append(item)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+
+        if len(pending) > self.BATCH_RESET_THRESHOLD:
+            self.beginResetModel()
+            for item in pending:
+                self._key_of[item] = (-item.zValue(), -next(self._counter))
+            self._rebuild()
+            self.endResetModel()
+            return
+
+        for item in pending:
+            key = (-item.zValue(), -next(self._counter))
+            row = bisect_left(self._keys, key)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._key_of[item] = key
+            self._keys.insert(row, key)
+            self._items.insert(row, item)
+            self.endInsertRows()
+
+    def _on_item_removed(self, item):
+        if item in self._pending:
+            self._pending.remove(item)
+            return
+        if item not in self._key_of:
+            return
+        self._flush()
+        row = self._row_of(item)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._keys[row]
+        del self._items[row]
+        del self._key_of[item]
+        self.endRemoveRows()
+
+    def _on_item_z_changed(self, item):
+        if self._writing_z or item not in self._key_of:
+            return
+        self._flush()
+        self._reposition(item)
+
+    def _on_about_to_clear(self):
+        self.beginResetModel()
+        self._items = []
+        self._keys = []
+        self._key_of = {}
+        self._pending = []
+        self.endResetModel()
+
+    def _reposition(self, item):
+        """Move the row of an item whose z value changed to its new place"""
+        old_row = self._row_of(item)
+        new_key = (-item.zValue(), self._key_of[item][1])
+        if new_key == self._keys[old_row]:
+            return
+
+        pos = bisect_left(self._keys, new_key)
+        # Index of the new row once the old one has been taken out
+        target = pos - 1 if pos > old_row else pos
+        if target == old_row:
+            self._keys[old_row] = new_key
+            self._key_of[item] = new_key
+            return
+
+        destination = target + 1 if target > old_row else target
+        self.beginMoveRows(QModelIndex(), old_row, old_row, QModelIndex(), destination)
+        del self._keys[old_row]
+        del self._items[old_row]
+        self._keys.insert(target, new_key)
+        self._items.insert(target, item)
+        self._key_of[item] = new_key
+        self.endMoveRows()
+
+    # --- Reordering ---
+
+    def move_layer(self, source_row, destination_row):
+        """Move a layer so it ends up before destination_row and write the z values back
+
+        Only the moved item gets a new z value when there is room between its
+        new neighbours; otherwise all layers are renumbered in their new order.
+        """
+        self._flush()
+        if destination_row in (source_row, source_row + 1):
+            return
+
+        item = self._items[source_row]
+        others = self._items[:source_row] + self._items[source_row + 1:]
+        target = destination_row - 1 if destination_row > source_row else destination_row
+        above = others[target - 1] if target > 0 else None
+        below = others[target] if target < len(others) else None
+
+        z = None
+        if above is None and below is not None:
+            z = below.zValue() + 1
+        elif below is None and above is not None:
+            z = above.zValue() - 1
+        elif above is not None and below is not None:
+            high, low = above.zValue(), below.zValue()
+            if high - low > 1:
+                z = low + 1
+            elif low < (high + low) / 2 < high:
+                z = (high + low) / 2
+
+        if z is not None:
+            self._writing_z = True
+            try:
+                item.setZValue(z)
+            finally:
+                self._writing_z = False
+            self._reposition(item)
+            return
+
+        # No gap between the neighbours: renumber every layer
+        self.beginMoveRows(QModelIndex(), source_row, source_row, QModelIndex(), destination_row)
+        others.insert(target, item)
+        self._writing_z = True
+        try:
+            top = len(others) - 1
+            for row, layer in enumerate(others):
+                layer.setZValue(top - row)
+                self._key_of[layer] = (-layer.zValue(), self._key_of[layer][1])
+        finally:
+            self._writing_z = False
+        self._items = others
+        self._keys = [self._key_of[layer] for layer in others]
+        self.endMoveRows()
@@ -1,23 +1,87 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QListWidget, QListWidgetItem
-from DraggableListWidget import DraggableListWidget
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QListView, QAbstractItemView
+from PyQt5.QtCore import Qt, QItemSelection, QItemSelectionModel
+from LayersModel import LayersModel
 from MapScene import MapScene
 
 
+class LayersView(QListView):
+    """List view that reorders layers through the model instead of copying rows"""
+
+    def dropEvent(self, event):
+        if event.source() is not self:
+            event.ignore()
+            return
+
+        rows = sorted(index.row() for index in self.selectedIndexes())
+        if len(rows) != 1:
+            event.ignore()
+            return
+
+        # Work out the row the layer is dropped in front of
+        target = self.indexAt(event.pos())
+        if not target.isValid():
+            destination = self.model().rowCount()
+        else:
+            destination = target.row()
+            if self.dropIndicatorPosition() == QAbstractItemView.BelowItem:
+                destination += 1
+
+        self.model().move_layer(rows[0], destination)
+
+        # Report a copy so the view does not remove the dragged row afterwards
+        event.setDropAction(Qt.CopyAction)
+        event.accept()
+
+
 class LayersPanel(QWidget):
 
     def __init__(self, scene: MapScene, parent=None):
         super().__init__(parent)
         self.scene = scene
+        self._syncing_selection = False
+
+        self.model = LayersModel(scene, self)
 
-        self.list_widget = DraggableListWidget()
-        self.list_widget.setViewMode(QListWidget.ListMode)
-        self.list_widget.setDragEnabled(True)  # Enable dragging
+        self.list_view = LayersView()
+        self.list_view.setModel(self.model)
+        # Uniform rows let the view lay out and paint only the visible rows
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setLayoutMode(QListView.Batched)
+        self.list_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.list_view.setDragEnabled(True)  # Enable dragging
+        self.list_view.setAcceptDrops(True)
+        self.list_view.setDropIndicatorShown(True)
+        self.list_view.setDragDropMode(QAbstractItemView.InternalMove)
+
+        self.list_view.selectionModel().selectionChanged.connect(self._on_layers_selection_changed)
+        self.scene.selectionChanged.connect(self._on_scene_selection_changed)
 
         layout = QVBoxLayout(self)
-        layout.addWidget(self.list_widget)
+        layout.addWidget(self.list_view)
+
+    def _on_layers_selection_changed(self, selected, deselected):
+        if self._syncing_selection:
+            return
+        self._syncing_selection = True
+        try:
+            for index in deselected.indexes():
+                self.model.item_at(index.row()).setSelected(False)
+            for index in selected.indexes():
+                self.model.item_at(index.row()).setSelected(True)
+        finally:
+            self._syncing_selection = False
 
-    def update(self):
-        self.list_widget.clear()
-        for item in self.scene.items():
-            layer = QListWidgetItem(f"layer {item.type()}")
-            self.list_widget.addItem(layer)
\ No newline at end of file
+    def _on_scene_selection_changed(self):
+        if self._syncing_selection:
+            return
+        self._syncing_selection = True
+        try:
+            selection = QItemSelection()
+            for item in self.scene.selectedItems():
+                row = self.model.row_of(item)
+                if row >= 0:
+                    index = self.model.index(row)
+                    selection.select(index, index)
+            self.list_view.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+        finally:
+            self._syncing_selection = False
@@ -7,6 +7,8 @@ from PyQt5.QtCore import Qt, QRectF, QPointF, QTimer, pyqtSignal, QObject
 
 from config import GRID_SIZE
 from utils import snap_value
+import map_model
+from map_records import mark_edited
 
 class MapItemSignals(QObject):
     itemChanged = pyqtSignal(object)
@@ -30,6 +32,30 @@ class MapItem(QGraphicsRectItem):
         self.ammo: int = 10  # Default ammo count
         self.stay: bool = stay
 
+    @classmethod
+    def from_record(cls, record):
+        """Create the item for a map_model.Item"""
+        item = cls(stay=record.stay)
+        item.setPos(record.x, record.y)
+        item.item_type = record.type
+        item.ammo = record.ammo
+        return item
+
+    def to_record(self):
+        """Describe this item as a map_model.Item"""
+        return map_model.Item(
+            x=self.pos().x() + self.rect().x(),
+            y=self.pos().y() + self.rect().y(),
+            type=self.item_type,
+            ammo=self.ammo,
+            stay=self.stay,
+        )
+
+    def notify_changed(self):
+        """Tell the properties panel and the scene, e.g. the journal, that the item was edited"""
+        self.signals.itemChanged.emit(self)
+        mark_edited(self)
+
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemPositionChange:
             # Snap to grid when moving
@@ -38,15 +64,16 @@ class MapItem(QGraphicsRectItem):
             new_x = snap_value(new_pos.x(), grid_size)
             new_y = snap_value(new_pos.y(), grid_size)
             new_pos = QPointF(new_x, new_y)
-            
-            # Emit signal that item has changed
-            self.signals.itemChanged.emit(self)
             return new_pos
+
+        elif change == QGraphicsItem.ItemPositionHasChanged:
+            # The position is only applied after ItemPositionChange
+            self.notify_changed()
             
         elif change == QGraphicsItem.ItemSelectedChange:
             # Emit signal when selection changes
             if value:
-                self.signals.itemChanged.emit(self)
+                self.notify_changed()
                 
         return super().itemChange(change, value)
     
@@ -0,0 +1,306 @@
+import os
+import json
+import glob
+import itertools
+from contextlib import contextmanager
+
+from PyQt5.QtCore import QObject, QRunnable, QTimer
+
+import map_chunks
+from map_io import read_map, write_map
+from map_records import item_record
+
+_journal_ids = itertools.count(1)
+
+
+def journal_id(item):
+    """Stable id of a scene item within the journal"""
+    jid = getattr(item, "_journal_id", None)
+    if jid is None:
+        jid = item._journal_id = next(_journal_ids)
+    return jid
+
+
+class JournalCompactTask(QRunnable):
+    """Writes a journal snapshot and removes the segments it replaces"""
+
+    def __init__(self, base, snapshot, obsolete_segments):
+        super().__init__()
+        self.base = base
+        self.snapshot = snapshot
+        self.obsolete_segments = obsolete_segments
+
+    def run(self):
+        try:
+            os.makedirs(os.path.dirname(self.base), exist_ok=True)
+            write_map(MapJournal.snapshot_path(self.base), self.snapshot)
+        except OSError as e:
+            print(f"Error writing journal snapshot: {e}")
+            return
+        for segment in self.obsolete_segments:
+            try:
+                os.remove(MapJournal.segment_path(self.base, segment))
+            except OSError:
+                pass
+
+
+class MapJournal(QObject):
+    """Append-only log of item-level edits, used to recover from crashes.
+
+    Every added, removed or changed item is written as one JSON line to the
+    current journal segment, which only costs serializing that one item.
+    Changes are reported by the edits themselves through the scene's
+    itemEdited signal, repaints cost the journal nothing.
+
+    Every compact_interval ms the records are folded into a snapshot YAML on
+    the save thread and a new segment is started. The snapshot names the
+    first segment that applies on top of it, older segments are deleted once
+    it is written, so a crash at any point leaves a snapshot and segments
+    that replay to the latest state.
+
+    For chunked maps only the chunks paged into the editor are journaled.
+    adopt_chunk() logs the items of a chunk when it is paged in for the first
+    time, release_chunk() forgets an unchanged chunk paged out again. On
+    replay the chunks never journaled are read from the map file.
+    """
+
+    def __init__(self, scene, pool, compact_interval=30000, parent=None):
+        super().__init__(parent)
+        self.scene = scene
+        self.pool = pool
+        self.base = None
+        self.map_filename = None
+        self._records = {}  # journal id -> (kind, data)
+        self._sky = None
+        self._overlay = None
+        self._chunks = None  # journaled chunk indices of a chunked map
+        self._segment = 0
+        self._file = None
+        self._dirty = False
+        self._suspended = 0
+
+        self.scene.itemAdded.connect(self.record_item)
+        self.scene.itemRemoved.connect(self.record_removed)
+        self.scene.itemZChanged.connect(self.record_item)
+        self.scene.aboutToClear.connect(self.record_clear)
+        self.scene.itemEdited.connect(self.record_item)
+
+        self._compact_timer = QTimer(self)
+        self._compact_timer.timeout.connect(self.compact)
+        self._compact_timer.start(compact_interval)
+
+    @staticmethod
+    def snapshot_path(base):
+        return base + ".snapshot.yaml"
+
+    @staticmethod
+    def segment_path(base, segment):
+        return f"{base}.{segment}.jsonl"
+
+    @staticmethod
+    def _segments(base):
+        segments = []
+        for path in glob.glob(glob.escape(base) + ".*.jsonl"):
+            number = path[len(base) + 1:-len(".jsonl")]
+            if number.isdigit():
+                segments.append(int(number))
+        return sorted(segments)
+
+    @contextmanager
+    def suspended(self):
+        """Do not log the edits made inside the block, e.g. while loading a map"""
+        self._suspended += 1
+        try:
+            yield
+        finally:
+            self._suspended -= 1
+
+    def start(self, base, map_filename, sky=None, overlay=None, chunks=None, paged_out=()):
+        """Start a new journal at base from the items in the scene.
+
+        For a chunked map chunks holds the indices of the chunks whose items
+        are in the scene or, as (journal id, record) pairs, in paged_out.
+        """
+        self.discard()
+        self.base = base
+        self.map_filename = map_filename
+        self._sky = sky
+        self._overlay = overlay
+        self._chunks = set(chunks) if chunks is not None else None
+        self._records = dict(paged_out)
+        for item in self.scene.items():
+            record = item_record(item)
+            if record is not None:
+                self._records[journal_id(item)] = record
+        self._segment = 0
+        self._dirty = True
+        self.compact()
+
+    def discard(self):
+        """Close the journal and remove its files, after a clean exit"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.base is None:
+            return
+        # Queued behind any snapshot still being written
+        self.pool.waitForDone()
+        self.remove_files(self.base)
+        self.base = None
+
+    @classmethod
+    def remove_files(cls, base):
+        for segment in cls._segments(base):
+            try:
+                os.remove(cls.segment_path(base, segment))
+            except OSError:
+                pass
+        try:
+            os.remove(cls.snapshot_path(base))
+        except OSError:
+            pass
+
+    def compact(self):
+        """Fold the journal into a new snapshot and continue in a new segment"""
+        if self.base is None or not self._dirty:
+            return
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        obsolete = [s for s in self._segments(self.base) if s <= self._segment]
+        self._segment += 1
+        self._dirty = False
+
+        snapshot = {
+            "map": self.map_filename,
+            "segment": self._segment,
+            "sky": self._sky,
+            "parallax_1": self._overlay,
+            "chunks": sorted(self._chunks) if self._chunks is not None else None,
+            "items": [{"id": jid, "kind": kind, "data": data} for jid, (kind, data) in self._records.items()],
+        }
+        self.pool.start(JournalCompactTask(self.base, snapshot, obsolete))
+
+    def _append(self, op):
+        if self.base is None or self._suspended:
+            return
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.base), exist_ok=True)
+            self._file = open(self.segment_path(self.base, self._segment), "a")
+        self._file.write(json.dumps(op) + "\n")
+        # Reach the OS right away so a crash of the editor loses nothing
+        self._file.flush()
+        self._dirty = True
+
+    def record_item(self, item):
+        if self._suspended:
+            return
+        record = item_record(item)
+        if record is None:
+            return
+        jid = journal_id(item)
+        if self._records.get(jid) == record:
+            return
+        self._records[jid] = record
+        self._append({"op": "put", "id": jid, "kind": record[0], "data": record[1]})
+
+    def record_removed(self, item):
+        if self._suspended:
+            return
+        jid = getattr(item, "_journal_id", None)
+        if jid is None or self._records.pop(jid, None) is None:
+            return
+        self._append({"op": "del", "id": jid})
+
+    def record_clear(self):
+        if self._suspended or not self._records:
+            return
+        self._records = {}
+        self._append({"op": "clear"})
+
+    def adopt_chunk(self, index, items):
+        """Journal the items of a chunk paged in from the map file"""
+        if self._chunks is None or index in self._chunks:
+            return
+        self._chunks.add(index)
+        entries = []
+        for item in items:
+            record = item_record(item)
+            if record is not None:
+                jid = journal_id(item)
+                self._records[jid] = record
+                entries.append([jid, record[0], record[1]])
+        self._append({"op": "adopt", "chunk": index, "items": entries})
+
+    def release_chunk(self, index, items):
+        """Stop journaling a chunk paged out unchanged, the map file has its items"""
+        if self._chunks is None or index not in self._chunks:
+            return
+        self._chunks.discard(index)
+        ids = []
+        for item in items:
+            jid = getattr(item, "_journal_id", None)
+            if jid is not None and self._records.pop(jid, None) is not None:
+                ids.append(jid)
+        self._append({"op": "release", "chunk": index, "ids": ids})
+
+    def record_sky(self, path):
+        if path != self._sky:
+            self._sky = path
+            self._append({"op": "sky", "path": path})
+
+    def record_overlay(self, path):
+        if path != self._overlay:
+            self._overlay = path
+            self._append({"op": "overlay", "path": path})
+
+    @classmethod
+    def replay(cls, base):
+        """Rebuild the journal's state, returns (map filename, sky, overlay, [(kind, data)])"""
+        snapshot = read_map(cls.snapshot_path(base))
+        records = {entry["id"]: (entry["kind"], entry["data"]) for entry in snapshot["items"]}
+        sky = snapshot.get("sky")
+        overlay = snapshot.get("parallax_1")
+        chunks = snapshot.get("chunks")
+        chunks = set(chunks) if chunks is not None else None
+
+        for segment in cls._segments(base):
+            if segment < snapshot["segment"]:
+                continue
+            with open(cls.segment_path(base, segment)) as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        # The last line may be cut off by the crash
+                        break
+                    if op["op"] == "put":
+                        records[op["id"]] = (op["kind"], op["data"])
+                    elif op["op"] == "del":
+                        records.pop(op["id"], None)
+                    elif op["op"] == "clear":
+                        records = {}
+                    elif op["op"] == "sky":
+                        sky = op["path"]
+                    elif op["op"] == "overlay":
+                        overlay = op["path"]
+                    elif op["op"] == "adopt":
+                        chunks.add(op["chunk"])
+                        for jid, kind, data in op["items"]:
+                            records[jid] = (kind, data)
+                    elif op["op"] == "release":
+                        chunks.discard(op["chunk"])
+                        for jid in op["ids"]:
+                            records.pop(jid, None)
+
+        records = list(records.values())
+        filename = snapshot.get("map")
+        if chunks is not None and filename and map_chunks.is_chunked_map(filename):
+            # Chunks that were never edited come from the map file itself
+            chunked_map = map_chunks.ChunkedMap.open(filename)
+            for index in chunked_map.chunks:
+                if index not in chunks:
+                    for kind, entries in chunked_map.chunk(index).items():
+                        records.extend((kind, entry) for entry in entries)
+
+        return filename, sky, overlay, records
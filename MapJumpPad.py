@@ -4,6 +4,8 @@ from PyQt5.QtCore import Qt, QRectF, QPointF, pyqtSignal, QObject
 
 from config import GRID_SIZE
 from utils import snap_value
+import map_model
+from map_records import mark_edited
 
 class MapJumpPadSignals(QObject):
     jumpPadChanged = pyqtSignal(object)
@@ -30,6 +32,25 @@ class MapJumpPad(QGraphicsRectItem):
         self.setTransformOriginPoint(self.rect().center())
         
 
+    @classmethod
+    def from_record(cls, record):
+        """Create the jump pad for a map_model.JumpPad"""
+        return cls(QPointF(record.x, record.y), record.vel, record.rotation)
+
+    def to_record(self):
+        """Describe this jump pad as a map_model.JumpPad"""
+        return map_model.JumpPad(
+            x=self.pos().x() + self.rect().x(),
+            y=self.pos().y() + self.rect().y(),
+            vel=self.velocity,
+            rotation=self.rotation(),
+        )
+
+    def notify_changed(self):
+        """Tell the properties panel and the scene, e.g. the journal, that the item was edited"""
+        self.signals.jumpPadChanged.emit(self)
+        mark_edited(self)
+
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemPositionChange:
             # Snap to grid when moving
@@ -38,18 +59,19 @@ class MapJumpPad(QGraphicsRectItem):
             new_x = snap_value(new_pos.x(), grid_size)
             new_y = snap_value(new_pos.y(), grid_size)
             new_pos = QPointF(new_x, new_y)
-
-            # Emit signal that item has changed
-            self.signals.jumpPadChanged.emit(self)
             return new_pos
+
+        elif change == QGraphicsItem.ItemPositionHasChanged:
+            # The position is only applied after ItemPositionChange
+            self.notify_changed()
             
         elif change == QGraphicsItem.ItemSelectedChange:
             # Emit signal when selection changes
             if value:
-                self.signals.jumpPadChanged.emit(self)
+                self.notify_changed()
         elif change == QGraphicsItem.ItemRotationChange or change == QGraphicsItem.ItemRotationHasChanged:
             # Emit when rotation is about to change/has changed
-            self.signals.jumpPadChanged.emit(self)
+            self.notify_changed()
                 
         return super().itemChange(change, value)
     
@@ -96,7 +118,7 @@ class MapJumpPad(QGraphicsRectItem):
                 new_rotation = ((new_rotation + 360) % 720) - 360
             self.setRotation(new_rotation)
             self.update()
-            self.signals.jumpPadChanged.emit(self)
+            self.notify_changed()
             event.accept()
         else:
             super().wheelEvent(event)
@@ -7,6 +7,8 @@ from PyQt5.QtCore import Qt, QRectF, QPointF, QTimer, pyqtSignal, QObject
 
 from config import GRID_SIZE
 from utils import snap_value
+import map_model
+from map_records import mark_edited
 
 class MapPortalSignals(QObject):
     portalChanged = pyqtSignal(object)
@@ -32,6 +34,28 @@ class MapPortal(QGraphicsRectItem):
         self.flipped = flipped
         self.ID = 0
 
+    @classmethod
+    def from_record(cls, record):
+        """Create one side of a portal for a map_model.PortalEnd"""
+        portal = cls(QPointF(record.x, record.y), record.type, record.flipped)
+        portal.ID = record.ID
+        return portal
+
+    def to_record(self):
+        """Describe this side of a portal as a map_model.PortalEnd"""
+        return map_model.PortalEnd(
+            x=self.pos().x() + self.rect().x(),
+            y=self.pos().y() + self.rect().y(),
+            flipped=self.flipped,
+            type=self.item_type,
+            ID=self.ID,
+        )
+
+    def notify_changed(self):
+        """Tell the properties panel and the scene, e.g. the journal, that the item was edited"""
+        self.signals.portalChanged.emit(self)
+        mark_edited(self)
+
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemPositionChange:
             # Snap to grid when moving
@@ -40,15 +64,16 @@ class MapPortal(QGraphicsRectItem):
             new_x = snap_value(new_pos.x(), grid_size)
             new_y = snap_value(new_pos.y(), grid_size)
             new_pos = QPointF(new_x, new_y)
-            
-            # Emit signal that item has changed
-            self.signals.portalChanged.emit(self)
             return new_pos
+
+        elif change == QGraphicsItem.ItemPositionHasChanged:
+            # The position is only applied after ItemPositionChange
+            self.notify_changed()
             
         elif change == QGraphicsItem.ItemSelectedChange:
             # Emit signal when selection changes
             if value:
-                self.signals.portalChanged.emit(self)
+                self.notify_changed()
                 
         return super().itemChange(change, value)
     
@@ -82,7 +107,7 @@ class MapPortal(QGraphicsRectItem):
                 del self
         elif action == flip_act:
             self.flipped = not self.flipped
-            self.signals.portalChanged.emit(self)
+            self.notify_changed()
     
     def paint(self, painter, option, widget=None):
         # Save the original state of the option
@@ -8,6 +8,10 @@ import math
 
 from config import GRID_SIZE
 from utils import snap_value
+from DuplicateGhost import DuplicateGhost
+from TextureDecoder import TextureDecoder
+import map_model
+from map_records import mark_edited
 
 class MapRectSignals(QObject):
     rectChanged = pyqtSignal(object)
@@ -25,49 +29,13 @@ class MapRect(QGraphicsRectItem):
 
         if self.texture_pixmap and not self.texture_pixmap.isNull():
 
-            t = QTransform()
-
-            # Get the center of the rectangle for rotation
-            rect_center_x = self.rect().center().x()
-            rect_center_y = self.rect().center().y()
-
-            # Apply translation to center for rotation
-            t.translate(rect_center_x, rect_center_y)
-
-            # Apply rotation
-            t.rotate(self.texture_rotation)
-
-            # Translate back
-            t.translate(-rect_center_x, -rect_center_y)
-
-            # Apply offset in the item's local coordinate system
-            t.translate(self.texture_offset_x, self.texture_offset_y)
-
-            # Create the brush with the texture
-            brush = QBrush(self.texture_pixmap)
-
-            # Get the top-left point of the rectangle
-            top_left_point = self.rect().topLeft()
-
-            # Create a QTransform and translate it to the top-left of your rect.
-            # This aligns the texture's origin with the top-left corner of the shape you are about to draw.
-            t.translate(top_left_point.x(), top_left_point.y())
-
-            # Apply scale last
-            t.scale(self.texture_scale, self.texture_scale)
-
-            # Apply the transform to the brush
-            brush.setTransform(t)
-
             # Set the brush on the painter
-            painter.setBrush(brush)
+            painter.setBrush(self.texture_brush())
             painter.setPen(Qt.NoPen)  # don't draw an outline
 
             # Draw the shape
             painter.drawRect(self.rect())
 
-            painter.restore()
-
             if getattr(self, "_show_scale_overlay", False):
                 rect = self.rect()
                 overlay_text = f"Scale: {self.texture_scale}x"
@@ -106,6 +74,44 @@ class MapRect(QGraphicsRectItem):
 
 
 
+    def texture_brush(self):
+        """Build the textured brush for this rect in item coordinates"""
+        t = QTransform()
+
+        # Get the center of the rectangle for rotation
+        rect_center_x = self.rect().center().x()
+        rect_center_y = self.rect().center().y()
+
+        # Apply translation to center for rotation
+        t.translate(rect_center_x, rect_center_y)
+
+        # Apply rotation
+        t.rotate(self.texture_rotation)
+
+        # Translate back
+        t.translate(-rect_center_x, -rect_center_y)
+
+        # Apply offset in the item's local coordinate system
+        t.translate(self.texture_offset_x, self.texture_offset_y)
+
+        # Create the brush with the texture
+        brush = QBrush(self.texture_pixmap)
+
+        # Get the top-left point of the rectangle
+        top_left_point = self.rect().topLeft()
+
+        # Create a QTransform and translate it to the top-left of your rect.
+        # This aligns the texture's origin with the top-left corner of the shape you are about to draw.
+        t.translate(top_left_point.x(), top_left_point.y())
+
+        # Apply scale last
+        t.scale(self.texture_scale, self.texture_scale)
+
+        # Apply the transform to the brush
+        brush.setTransform(t)
+
+        return brush
+
     EDGE_MARGIN = 8  # pixels for "hot area" to resize
     def __init__(self, rect, parent=None):
         super().__init__()
@@ -152,12 +158,62 @@ class MapRect(QGraphicsRectItem):
         self.mouse_press_pos = None
         self.orig_rect = None
 
+    @classmethod
+    def from_record(cls, record):
+        """Create the rect for a map_model.Rect"""
+        rect = cls(QRectF(record.x, record.y, record.w, record.h))
+        rect.stype = record.wall_type
+        rect.texture_scale = record.texture_scale
+        rect.texture_rotation = record.texture_rotation
+        rect.texture_offset_x = record.texture_offset_x
+        rect.texture_offset_y = record.texture_offset_y
+        rect.setZValue(record.z_index)
+        # The pixmap is attached later by the texture loader
+        rect.texture_path = record.texture or None
+        return rect
+
+    def to_record(self):
+        """Describe this rect as a map_model.Rect"""
+        return map_model.Rect(
+            x=self.pos().x() + self.rect().x(),
+            y=self.pos().y() + self.rect().y(),
+            w=self.rect().width(),
+            h=self.rect().height(),
+            wall_type=self.stype,
+            texture=self.texture_path,
+            texture_scale=self.texture_scale,
+            texture_rotation=self.texture_rotation,
+            texture_offset_x=self.texture_offset_x,
+            texture_offset_y=self.texture_offset_y,
+            z_index=self.zValue(),
+        )
+
+    def duplicate(self, offset=QPointF(0, 0)):
+        """Create a copy of this rect moved by offset"""
+        copy = MapRect(self.rect())
+        copy.setPos(self.pos() + offset)
+        copy.setZValue(self.zValue())
+        copy.setBrush(self.brush())
+        copy.stype = self.stype
+        copy.texture_path = self.texture_path
+        copy.texture_pixmap = self.texture_pixmap
+        copy.texture_scale = self.texture_scale
+        copy.texture_offset_x = self.texture_offset_x
+        copy.texture_offset_y = self.texture_offset_y
+        copy.texture_rotation = self.texture_rotation
+        return copy
+
     def _hide_overlays(self):
         self._show_texture_offset_overlay = False
         self._show_scale_overlay = False
         self._show_rotation_overlay = False
         self.update()
 
+    def notify_changed(self):
+        """Tell the properties panel and the scene, e.g. the journal, that the item was edited"""
+        self.signals.rectChanged.emit(self)
+        mark_edited(self)
+
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemPositionChange and self.scene():
             grid_size = GRID_SIZE
@@ -180,7 +236,12 @@ class MapRect(QGraphicsRectItem):
             return snapped_item_pos
 
         if change == QGraphicsItem.ItemPositionHasChanged:
-            self.signals.rectChanged.emit(self)
+            self.notify_changed()
+
+        if change == QGraphicsItem.ItemZValueHasChanged and self.scene():
+            # Let the layers view follow Move to Front / Move to Back
+            if hasattr(self.scene(), 'itemZChanged'):
+                self.scene().itemZChanged.emit(self)
 
         return super().itemChange(change, value)
 
@@ -253,7 +314,7 @@ class MapRect(QGraphicsRectItem):
             # Shift+Left click for duplication
             self._is_duplicating = True
             self._drag_start_pos = event.scenePos()
-            self._ghost_items = []  # Store multiple ghost items for all selected shapes
+            self._ghost_item = None  # Single preview for all selected shapes
             event.accept()
         elif event.modifiers() & Qt.AltModifier and event.button() == Qt.LeftButton:
             # Alt+Left click for rotation
@@ -321,83 +382,17 @@ class MapRect(QGraphicsRectItem):
             # Snap to grid
             snapped_dx = round(delta.x() / GRID_SIZE) * GRID_SIZE
             snapped_dy = round(delta.y() / GRID_SIZE) * GRID_SIZE
-            
-            # Get all selected items
-            selected_items = self.scene().selectedItems()
-
-            # Create or update ghost items for all selected items
-            if not self._ghost_items:
-                # First time - create ghost items for all selected shapes
-                for item in selected_items:
-                    # Create ghosts for all selected items except self
-                    if item != self:
-                        # Handle MapRect items
-                        if isinstance(item, (MapRect, QGraphicsRectItem)):
-                            # Create a new ghost rect
-                            ghost = MapRect(item.rect())
-                            ghost.setPos(item.pos())
-                            if hasattr(item, 'texture_path'):
-                                ghost.texture_path = item.texture_path
-                                ghost.texture_pixmap = item.texture_pixmap
-                                ghost.texture_scale = item.texture_scale
-                                ghost.texture_offset_x = item.texture_offset_x
-                                ghost.texture_offset_y = item.texture_offset_y
-                                ghost.texture_rotation = item.texture_rotation
-                                ghost.stype = item.stype
-                            
-                            # Make it semi-transparent
-                            ghost.setOpacity(0.5)
-                            
-                            # Add it to the scene and our list
-                            self.scene().addItem(ghost)
-                            self._ghost_items.append((item, ghost))
-                        
-                        # Handle MapTriangle items
-                        elif hasattr(item, 'polygon') and callable(getattr(item, 'polygon')):
-                            from MapTriangle import MapTriangle
-                            # Create a new ghost triangle with the same points
-                            points = [pt for pt in item.polygon()]
-                            ghost = MapTriangle(points[0], points[1], points[2])
-                            ghost.setPos(item.pos())
-                            if hasattr(item, 'texture_path'):
-                                ghost.texture_path = item.texture_path
-                                ghost.texture_pixmap = item.texture_pixmap
-                                ghost.texture_scale = item.texture_scale
-                                ghost.texture_offset_x = item.texture_offset_x
-                                ghost.texture_offset_y = item.texture_offset_y
-                                ghost.texture_rotation = item.texture_rotation
-                                ghost.stype = item.stype
-                            
-                            # Make it semi-transparent
-                            ghost.setOpacity(0.5)
-                            
-                            # Add it to the scene and our list
-                            self.scene().addItem(ghost)
-                            self._ghost_items.append((item, ghost))
-
-                # Add a ghost for the current item if it's not already included
-                if not any(original == self for original, _ in self._ghost_items):
-                    ghost = MapRect(self.rect())
-                    ghost.setPos(self.pos())
-                    ghost.texture_path = self.texture_path
-                    ghost.texture_pixmap = self.texture_pixmap
-                    ghost.texture_scale = self.texture_scale
-                    ghost.texture_offset_x = self.texture_offset_x
-                    ghost.texture_offset_y = self.texture_offset_y
-                    ghost.texture_rotation = self.texture_rotation
-                    ghost.stype = self.stype
-
-                    # Make it semi-transparent
-                    ghost.setOpacity(0.5)
-
-                    # Add it to the scene and our list
-                    self.scene().addItem(ghost)
-                    self._ghost_items.append((self, ghost))
-
-            # Update all ghost items' positions
-            for original, ghost in self._ghost_items:
-                ghost_pos = original.pos() + QPointF(snapped_dx, snapped_dy)
-                ghost.setPos(ghost_pos)
+
+            # First time - capture all selected shapes (and this one) in a single preview
+            if self._ghost_item is None:
+                items = self.scene().selectedItems()
+                if self not in items:
+                    items.append(self)
+                self._ghost_item = DuplicateGhost(items)
+                self.scene().addItem(self._ghost_item)
+
+            # Moving the preview only translates its cached pixmap
+            self._ghost_item.setPos(snapped_dx, snapped_dy)
             
             event.accept()
         elif self._is_dragging_texture:
@@ -455,25 +450,20 @@ class MapRect(QGraphicsRectItem):
             self.resize_edge = None
             self.mouse_press_pos = None
             self.orig_rect = None
-            self.signals.rectChanged.emit(self)
+            self.notify_changed()
             event.accept()
         elif self._is_duplicating:
             self._is_duplicating = False
             
-            # If we have ghost items, make them permanent
-            if self._ghost_items:
+            # If we have a preview, replace it with the real copies
+            if self._ghost_item is not None:
                 # Store a reference to the scene
                 scene = self.scene()
 
-                scene.clearSelection()
+                self._ghost_item.commit()
 
-                # Make all ghost items fully opaque
-                for _, ghost in self._ghost_items:
-                    ghost.setOpacity(1.0)
-                    ghost.setSelected(True)
-
-                # Reset the ghost items reference
-                self._ghost_items = []
+                # Reset the ghost item reference
+                self._ghost_item = None
 
                 # Emit signal that new items were created
                 if scene:
@@ -481,7 +471,7 @@ class MapRect(QGraphicsRectItem):
                         # Check if scene has isDeleted method (our MapScene)
                         if hasattr(scene, 'isDeleted') and scene.isDeleted():
                             return
-                        self.signals.rectChanged.emit(self)
+                        self.notify_changed()
                     except RuntimeError:
                         # Scene was deleted
                         pass
@@ -490,7 +480,7 @@ class MapRect(QGraphicsRectItem):
         elif self._is_dragging_texture:
             self._is_dragging_texture = False
             self._show_texture_offset_overlay = False
-            self.signals.rectChanged.emit(self)
+            self.notify_changed()
             event.accept()
         elif self._is_rotating:
             self._is_rotating = False
@@ -498,7 +488,7 @@ class MapRect(QGraphicsRectItem):
             self._rotation_start_pos = None
             self._rotation_center = None
             self._show_rotation_overlay = False
-            self.signals.rectChanged.emit(self)
+            self.notify_changed()
             event.accept()
         else:
             super().mouseReleaseEvent(event)
@@ -532,9 +522,10 @@ class MapRect(QGraphicsRectItem):
         self.texture_scale = 1.0
         self.texture_offset_x = 0.0
         self.texture_offset_y = 0.0
-        self.texture_pixmap = QPixmap(image_path)
+        self.texture_pixmap = None
+        TextureDecoder.instance().attach(self, image_path)
         self.update()  # This triggers paint
-        self.signals.rectChanged.emit(self)
+        self.notify_changed()
         event.accept()
 
     def contextMenuEvent(self, event):
@@ -552,7 +543,7 @@ class MapRect(QGraphicsRectItem):
                 self.stype = "wall"
             else:
                 self.stype = "static"
-            self.signals.rectChanged.emit(self)
+            self.notify_changed()
         elif action == front_act:
             # Get all items in the scene
             all_items = self.scene().items()
@@ -561,7 +552,7 @@ class MapRect(QGraphicsRectItem):
                 max_z = max(item.zValue() for item in all_items)
                 # Set this item's z-value to be higher than the highest
                 self.setZValue(max_z + 1)
-                self.signals.rectChanged.emit(self)
+                self.notify_changed()
         elif action == back_act:
             # Get all items in the scene
             all_items = self.scene().items()
@@ -570,7 +561,7 @@ class MapRect(QGraphicsRectItem):
                 min_z = min(item.zValue() for item in all_items)
                 # Set this item's z-value to be lower than the lowest
                 self.setZValue(min_z - 1)
-                self.signals.rectChanged.emit(self)
+                self.notify_changed()
         elif action == del_act:
             scene = self.scene()
             if self.isSelected():
@@ -605,7 +596,7 @@ class MapRect(QGraphicsRectItem):
             # Restart timer for overlay (e.g. show for 1 second after each scale)
             self._overlay_timer.start(1000)
             event.accept()
-            self.signals.rectChanged.emit(self)
+            self.notify_changed()
         else:
             super().wheelEvent(event)
 
@@ -0,0 +1,97 @@
+import os
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from map_io import write_map
+from texture_store import TextureStore
+
+
+def store_textures(data, sources, store, base_dir, progress=None):
+    """Copy the textures of the map data into store and point the data at the copies.
+
+    data holds the original texture paths as collected from the scene and
+    sources maps each of them to the file it resolves to. Textures whose file
+    is missing keep a reference to textures/<name>. Returns
+    {original path: stored path} for the files that were copied or reused.
+    """
+    stored = store.add_many((src for src in sources.values() if os.path.exists(src)), progress)
+
+    texture_map = {}  # original_path -> relative path in textures/
+    stored_paths = {}
+    for texture_path, src_path in sources.items():
+        if src_path in stored:
+            stored_paths[texture_path] = stored[src_path]
+        texture_dst = stored.get(src_path, os.path.join(store.textures_dir, os.path.basename(texture_path)))
+        texture_map[texture_path] = os.path.relpath(texture_dst, base_dir)
+
+    for kind in ("rectangles", "triangles"):
+        for shape in data.get(kind, []):
+            texture = shape.get("texture")
+            shape["texture"] = texture_map.get(texture, None) if texture else None
+
+    # Sky and overlay are only written when their file exists
+    for key in ("sky", "parallax_1"):
+        if key in data:
+            if data[key] in stored_paths:
+                data[key] = texture_map[data[key]]
+            else:
+                del data[key]
+
+    return stored_paths
+
+
+class MapSaverSignals(QObject):
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class MapSaveTask(QRunnable):
+    """Copies the textures and writes a map snapshot on a worker thread.
+
+    The snapshot is plain data collected on the GUI thread, the task never
+    touches the scene. temp_files are textures added before the project had
+    a folder, they are moved into its textures/ folder as well. finished
+    delivers a dict with the data written, the stored paths of all textures
+    and the amount of data copied.
+    """
+
+    def __init__(self, filename, data, sources, temp_files=()):
+        super().__init__()
+        self.filename = filename
+        self.data = data
+        self.sources = sources
+        self.temp_files = list(temp_files)
+        self.signals = MapSaverSignals()
+
+    def _on_copied(self, copied, total):
+        self.signals.progress.emit(1, 3, f"Copying textures {copied}/{total}")
+
+    def run(self):
+        try:
+            base_dir = os.path.dirname(self.filename)
+            textures_dir = os.path.join(base_dir, "textures")
+            os.makedirs(textures_dir, exist_ok=True)
+
+            self.signals.progress.emit(0, 3, "Scanning textures")
+            store = TextureStore(textures_dir)
+
+            self.signals.progress.emit(1, 3, "Copying textures")
+            migrated = store.add_many(self.temp_files)
+            stored = store_textures(self.data, self.sources, store, base_dir, self._on_copied)
+
+            self.signals.progress.emit(2, 3, "Writing map")
+            write_map(self.filename, self.data)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+
+        self.signals.progress.emit(3, 3, "Saved")
+        self.signals.finished.emit({
+            "filename": self.filename,
+            "data": self.data,
+            "textures_dir": textures_dir,
+            "migrated": migrated,
+            "stored": stored,
+            "copied_files": store.copied_files,
+            "copied_bytes": store.copied_bytes,
+        })
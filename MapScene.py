@@ -1,9 +1,16 @@
 from PyQt5.QtWidgets import QGraphicsScene
 from PyQt5.QtGui import QPen, QColor
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 from config import GRID_SIZE
 
 class MapScene(QGraphicsScene):
+    itemAdded = pyqtSignal(object)
+    itemRemoved = pyqtSignal(object)
+    itemZChanged = pyqtSignal(object)
+    # The saved properties of an item changed, see map_records.mark_edited()
+    itemEdited = pyqtSignal(object)
+    aboutToClear = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setSceneRect(0, 0, 1024, 768)
@@ -16,6 +23,19 @@ class MapScene(QGraphicsScene):
         self._is_deleted = True
         super().deleteLater()
 
+    def addItem(self, item):
+        super().addItem(item)
+        self.itemAdded.emit(item)
+
+    def removeItem(self, item):
+        super().removeItem(item)
+        self.itemRemoved.emit(item)
+
+    def clear(self):
+        # Listeners must drop their references before the items are deleted
+        self.aboutToClear.emit()
+        super().clear()
+
     def drawBackground(self, painter, rect):
         pen = QPen(QColor(200, 200, 200), 1, Qt.DashLine)  # Light gray, dashed
         painter.setPen(pen)
@@ -4,6 +4,10 @@ from PyQt5.QtCore import Qt, QPointF, QObject, pyqtSignal, QRectF, QTimer
 from PyQt5.QtWidgets import QGraphicsPolygonItem
 import math
 from config import GRID_SIZE
+from DuplicateGhost import DuplicateGhost
+from TextureDecoder import TextureDecoder
+import map_model
+from map_records import mark_edited
 
 class MapTriangleSignals(QObject):
     triChanged = pyqtSignal(object)
@@ -54,12 +58,60 @@ class MapTriangle(QGraphicsPolygonItem):
         self.setAcceptDrops(True)
         self.dragging_point = None  # which point index, if any, is being dragged
 
+    @classmethod
+    def from_record(cls, record):
+        """Create the triangle for a map_model.Triangle"""
+        triangle = cls(*(QPointF(x, y) for x, y in record.points))
+        triangle.stype = record.wall_type
+        triangle.texture_scale = record.texture_scale
+        triangle.texture_rotation = record.texture_rotation
+        triangle.texture_offset_x = record.texture_offset_x
+        triangle.texture_offset_y = record.texture_offset_y
+        triangle.setZValue(record.z_index)
+        # The pixmap is attached later by the texture loader
+        triangle.texture_path = record.texture or None
+        return triangle
+
+    def to_record(self):
+        """Describe this triangle as a map_model.Triangle"""
+        item_pos = self.pos()
+        return map_model.Triangle(
+            points=tuple(((p + item_pos).x(), (p + item_pos).y()) for p in self.polygon()),
+            wall_type=self.stype,
+            texture=self.texture_path,
+            texture_scale=self.texture_scale,
+            texture_rotation=self.texture_rotation,
+            texture_offset_x=self.texture_offset_x,
+            texture_offset_y=self.texture_offset_y,
+            z_index=self.zValue(),
+        )
+
+    def duplicate(self, offset=QPointF(0, 0)):
+        """Create a copy of this triangle moved by offset"""
+        copy = MapTriangle(*self.polygon())
+        copy.setPos(self.pos() + offset)
+        copy.setZValue(self.zValue())
+        copy.setBrush(self.brush())
+        copy.stype = self.stype
+        copy.texture_path = self.texture_path
+        copy.texture_pixmap = self.texture_pixmap
+        copy.texture_scale = self.texture_scale
+        copy.texture_offset_x = self.texture_offset_x
+        copy.texture_offset_y = self.texture_offset_y
+        copy.texture_rotation = self.texture_rotation
+        return copy
+
     def _hide_overlays(self):
         self._show_scale_overlay = False
         self._show_texture_offset_overlay = False
         self._show_rotation_overlay = False
         self.update()
 
+    def notify_changed(self):
+        """Tell the properties panel and the scene, e.g. the journal, that the item was edited"""
+        self.signals.triChanged.emit(self)
+        mark_edited(self)
+
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemPositionChange and self.scene():
             # Snap the new top-left position to the grid
@@ -70,7 +122,12 @@ class MapTriangle(QGraphicsPolygonItem):
             return snapped_pos
 
         if change == QGraphicsItem.ItemPositionHasChanged:
-            self.signals.triChanged.emit(self)
+            self.notify_changed()
+
+        if change == QGraphicsItem.ItemZValueHasChanged and self.scene():
+            # Let the layers view follow Move to Front / Move to Back
+            if hasattr(self.scene(), 'itemZChanged'):
+                self.scene().itemZChanged.emit(self)
 
         return super().itemChange(change, value)
 
@@ -93,9 +150,10 @@ class MapTriangle(QGraphicsPolygonItem):
         self.texture_scale = 1.0
         self.texture_offset_x = 0.0
         self.texture_offset_y = 0.0
-        self.texture_pixmap = QPixmap(image_path)
+        self.texture_pixmap = None
+        TextureDecoder.instance().attach(self, image_path)
         self.update()  # This triggers paint
-        self.signals.triChanged.emit(self)
+        self.notify_changed()
         event.accept()
 
     def hoverMoveEvent(self, event):
@@ -126,7 +184,7 @@ class MapTriangle(QGraphicsPolygonItem):
             # Shift+Left click for duplication
             self._is_duplicating = True
             self._drag_start_pos = event.scenePos()
-            self._ghost_items = []  # Store multiple ghost items for all selected shapes
+            self._ghost_item = None  # Single preview for all selected shapes
             event.accept()
         elif event.modifiers() & Qt.AltModifier and event.button() == Qt.LeftButton:
             # Alt+Left click for rotation
@@ -164,83 +222,16 @@ class MapTriangle(QGraphicsPolygonItem):
             snapped_dx = round(delta.x() / GRID_SIZE) * GRID_SIZE
             snapped_dy = round(delta.y() / GRID_SIZE) * GRID_SIZE
             
-            # Get all selected items
-            selected_items = self.scene().selectedItems()
-            
-            # Create or update ghost items for all selected items
-            if not self._ghost_items:
-                # First time - create ghost items for all selected shapes
-                for item in selected_items:
-                    # Create ghosts for all selected items except self
-                    if item != self:
-                        # Handle different types of items
-                        if isinstance(item, MapTriangle):
-                            # Create a new ghost triangle with the same points
-                            points = [pt for pt in item.polygon()]
-                            ghost = MapTriangle(points[0], points[1], points[2])
-                            ghost.setPos(item.pos())
-                            if hasattr(item, 'texture_path'):
-                                ghost.texture_path = item.texture_path
-                                ghost.texture_pixmap = item.texture_pixmap
-                                ghost.texture_scale = item.texture_scale
-                                ghost.texture_offset_x = item.texture_offset_x
-                                ghost.texture_offset_y = item.texture_offset_y
-                                ghost.texture_rotation = item.texture_rotation
-                                ghost.stype = item.stype
-                            
-                            # Make it semi-transparent
-                            ghost.setOpacity(0.5)
-                            
-                            # Add it to the scene and our list
-                            self.scene().addItem(ghost)
-                            self._ghost_items.append((item, ghost))
-                        
-                        # Handle MapRect items
-                        elif hasattr(item, 'rect') and callable(getattr(item, 'rect')):
-                            from MapRect import MapRect
-                            # Create a new ghost rect
-                            ghost = MapRect(item.rect())
-                            ghost.setPos(item.pos())
-                            if hasattr(item, 'texture_path'):
-                                ghost.texture_path = item.texture_path
-                                ghost.texture_pixmap = item.texture_pixmap
-                                ghost.texture_scale = item.texture_scale
-                                ghost.texture_offset_x = item.texture_offset_x
-                                ghost.texture_offset_y = item.texture_offset_y
-                                ghost.texture_rotation = item.texture_rotation
-                                ghost.stype = item.stype
-                            
-                            # Make it semi-transparent
-                            ghost.setOpacity(0.5)
-                            
-                            # Add it to the scene and our list
-                            self.scene().addItem(ghost)
-                            self._ghost_items.append((item, ghost))
-                
-                # Add a ghost for the current item if it's not already included
-                if not any(original == self for original, _ in self._ghost_items):
-                    points = [pt for pt in self.polygon()]
-                    ghost = MapTriangle(points[0], points[1], points[2])
-                    ghost.setPos(self.pos())
-                    ghost.texture_path = self.texture_path
-                    ghost.texture_pixmap = self.texture_pixmap
-                    ghost.texture_scale = self.texture_scale
-                    ghost.texture_offset_x = self.texture_offset_x
-                    ghost.texture_offset_y = self.texture_offset_y
-                    ghost.texture_rotation = self.texture_rotation
-                    ghost.stype = self.stype
-                    
-                    # Make it semi-transparent
-                    ghost.setOpacity(0.5)
-                    
-                    # Add it to the scene and our list
-                    self.scene().addItem(ghost)
-                    self._ghost_items.append((self, ghost))
-            
-            # Update all ghost items' positions
-            for original, ghost in self._ghost_items:
-                ghost_pos = original.pos() + QPointF(snapped_dx, snapped_dy)
-                ghost.setPos(ghost_pos)
+            # First time - capture all selected shapes (and this one) in a single preview
+            if self._ghost_item is None:
+                items = self.scene().selectedItems()
+                if self not in items:
+                    items.append(self)
+                self._ghost_item = DuplicateGhost(items)
+                self.scene().addItem(self._ghost_item)
+
+            # Moving the preview only translates its cached pixmap
+            self._ghost_item.setPos(snapped_dx, snapped_dy)
             
             event.accept()
         elif self._is_dragging_texture:
@@ -300,22 +291,20 @@ class MapTriangle(QGraphicsPolygonItem):
                 snapped_points.append(snapped_pt)
             self.setPolygon(QPolygonF(snapped_points))
             self.dragging_point = None
-            self.signals.triChanged.emit(self)
+            self.notify_changed()
             event.accept()
         elif self._is_duplicating:
             self._is_duplicating = False
             
-            # If we have ghost items, make them permanent
-            if self._ghost_items:
+            # If we have a preview, replace it with the real copies
+            if self._ghost_item is not None:
                 # Store a reference to the scene
                 scene = self.scene()
                 
-                # Make all ghost items fully opaque
-                for _, ghost in self._ghost_items:
-                    ghost.setOpacity(1.0)
+                self._ghost_item.commit()
                 
-                # Reset the ghost items reference
-                self._ghost_items = []
+                # Reset the ghost item reference
+                self._ghost_item = None
                 
                 # Emit signal that new items were created
                 if scene:
@@ -323,7 +312,7 @@ class MapTriangle(QGraphicsPolygonItem):
                         # Check if scene has isDeleted method (our MapScene)
                         if hasattr(scene, 'isDeleted') and scene.isDeleted():
                             return
-                        self.signals.triChanged.emit(self)
+                        self.notify_changed()
                     except RuntimeError:
                         # Scene was deleted
                         pass
@@ -332,7 +321,7 @@ class MapTriangle(QGraphicsPolygonItem):
         elif self._is_dragging_texture:
             self._is_dragging_texture = False
             self._show_texture_offset_overlay = False
-            self.signals.triChanged.emit(self)
+            self.notify_changed()
             event.accept()
         elif self._is_rotating:
             self._is_rotating = False
@@ -340,7 +329,7 @@ class MapTriangle(QGraphicsPolygonItem):
             self._rotation_start_pos = None
             self._rotation_center = None
             self._show_rotation_overlay = False
-            self.signals.triChanged.emit(self)
+            self.notify_changed()
             event.accept()
         else:
             super().mouseReleaseEvent(event)
@@ -368,7 +357,7 @@ class MapTriangle(QGraphicsPolygonItem):
             # Restart timer for overlay (e.g. show for 1 second after each scale)
             self._overlay_timer.start(1000)
             event.accept()
-            self.signals.triChanged.emit(self)
+            self.notify_changed()
         else:
             super().wheelEvent(event)
 
@@ -404,7 +393,7 @@ class MapTriangle(QGraphicsPolygonItem):
                 max_z = max(item.zValue() for item in all_items)
                 # Set this item's z-value to be higher than the highest
                 self.setZValue(max_z + 1)
-                self.signals.triChanged.emit(self)
+                self.notify_changed()
         elif action == back_act:
             # Get all items in the scene
             all_items = self.scene().items()
@@ -413,7 +402,7 @@ class MapTriangle(QGraphicsPolygonItem):
                 min_z = min(item.zValue() for item in all_items)
                 # Set this item's z-value to be lower than the lowest
                 self.setZValue(min_z - 1)
-                self.signals.triChanged.emit(self)
+                self.notify_changed()
         elif action == del_act:
             scene = self.scene()
             if self.isSelected():
@@ -427,6 +416,42 @@ class MapTriangle(QGraphicsPolygonItem):
                 scene.removeItem(self)
                 del self
 
+    def texture_brush(self):
+        """Build the textured brush for this triangle in item coordinates"""
+        # Create a texture brush with the pixmap directly
+        brush = QBrush(self.texture_pixmap)
+
+        # Apply optional scaling, offset, and rotation using transform
+        transform = QTransform()
+        
+        # Calculate the center of the triangle for rotation
+        points = self.polygon()
+        center_x = (points[0].x() + points[1].x() + points[2].x()) / 3
+        center_y = (points[0].y() + points[1].y() + points[2].y()) / 3
+        
+        # Get the bounding rectangle of the triangle
+        bounding_rect = self.boundingRect()
+        top_left = bounding_rect.topLeft()
+        
+        # Apply translation to center for rotation
+        transform.translate(center_x, center_y)
+        
+        # Apply rotation
+        transform.rotate(self.texture_rotation)
+        
+        # Translate back
+        transform.translate(-center_x, -center_y)
+        
+        # Apply translation to the top-left corner of the bounding rectangle
+        transform.translate(top_left.x() + self.texture_offset_x, top_left.y() + self.texture_offset_y)
+        
+        # Apply scale last
+        transform.scale(self.texture_scale, self.texture_scale)
+        
+        brush.setTransform(transform)
+
+        return brush
+
     def paint(self, painter, option, widget):
         # Save the original state of the option
         original_option = option
@@ -441,40 +466,8 @@ class MapTriangle(QGraphicsPolygonItem):
             path.addPolygon(self.polygon())
             painter.setClipPath(path)
 
-            # Create a texture brush with the pixmap directly
-            brush = QBrush(self.texture_pixmap)
-
-            # Apply optional scaling, offset, and rotation using transform
-            transform = QTransform()
-            
-            # Calculate the center of the triangle for rotation
-            points = self.polygon()
-            center_x = (points[0].x() + points[1].x() + points[2].x()) / 3
-            center_y = (points[0].y() + points[1].y() + points[2].y()) / 3
-            
-            # Get the bounding rectangle of the triangle
-            bounding_rect = self.boundingRect()
-            top_left = bounding_rect.topLeft()
-            
-            # Apply translation to center for rotation
-            transform.translate(center_x, center_y)
-            
-            # Apply rotation
-            transform.rotate(self.texture_rotation)
-            
-            # Translate back
-            transform.translate(-center_x, -center_y)
-            
-            # Apply translation to the top-left corner of the bounding rectangle
-            transform.translate(top_left.x() + self.texture_offset_x, top_left.y() + self.texture_offset_y)
-            
-            # Apply scale last
-            transform.scale(self.texture_scale, self.texture_scale)
-            
-            brush.setTransform(transform)
-
             # Set brush and draw the triangle
-            painter.setBrush(brush)
+            painter.setBrush(self.texture_brush())
             painter.setPen(Qt.black)  # Optional: triangle border
             painter.drawPolygon(self.polygon())
 
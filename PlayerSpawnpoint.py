@@ -6,11 +6,16 @@ from PyQt6.QtCore import QRect
 
 from config import GRID_SIZE
 from utils import snap_value
+import map_model
+from map_records import mark_edited
 
 class PlayerSpawnpointSignals(QObject):
     spawnpointChanged = pyqtSignal(object)
 
 class PlayerSpawnpoint(QGraphicsPixmapItem):
+    # The pixmap is drawn left of the position the game uses
+    SPAWN_OFFSET_X = 32
+
     def __init__(self, position, parent=None):
         # Load the player texture
         pixmap = QPixmap("assets/player.png")
@@ -38,6 +43,20 @@ class PlayerSpawnpoint(QGraphicsPixmapItem):
         # Center the pixmap at the position
         #self.setOffset(-pixmap.width() / 2, -pixmap.height() / 2)
         
+    @classmethod
+    def from_record(cls, record):
+        """Create the spawnpoint for a map_model.Spawnpoint"""
+        return cls(QPointF(record.x - cls.SPAWN_OFFSET_X, record.y))
+
+    def to_record(self):
+        """Describe this spawnpoint as a map_model.Spawnpoint"""
+        return map_model.Spawnpoint(x=self.pos().x() + self.SPAWN_OFFSET_X, y=self.pos().y())
+
+    def notify_changed(self):
+        """Tell the properties panel and the scene, e.g. the journal, that the item was edited"""
+        self.signals.spawnpointChanged.emit(self)
+        mark_edited(self)
+
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemPositionChange and self.scene():
             grid_size = GRID_SIZE
@@ -54,7 +73,7 @@ class PlayerSpawnpoint(QGraphicsPixmapItem):
             return snapped_pos
             
         if change == QGraphicsItem.ItemPositionHasChanged:
-            self.signals.spawnpointChanged.emit(self)
+            self.notify_changed()
             
         return super().itemChange(change, value)
     
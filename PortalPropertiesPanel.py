@@ -1,5 +1,6 @@
 from PyQt5.QtCore import QPointF
 from PyQt5.QtWidgets import QWidget, QFormLayout, QDoubleSpinBox, QComboBox, QVBoxLayout, QSpinBox, QCheckBox
+from map_records import mark_edited
 
 
 class PortalPropertiesPanel(QWidget):
@@ -52,6 +53,7 @@ class PortalPropertiesPanel(QWidget):
         if self._portal is not None and hasattr(self._portal, 'item_type'):
             self._portal.item_type = new_type
             self._portal.update()
+            mark_edited(self._portal)
 
     def _on_edit(self, value):
         """Handle property value changes"""
@@ -76,6 +78,7 @@ class PortalPropertiesPanel(QWidget):
 
         # Update item appearance
         self._portal.update()
+        mark_edited(self._portal)
 
     def set_portal(self, portal):
         """Set the item to be edited"""
@@ -1,10 +1,11 @@
-import sys, os, yaml, shutil, tempfile
+import sys, os, time, yaml, shutil, tempfile
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QGraphicsView, QFileDialog, QToolBar,
-    QAction,  QSplitter, QDockWidget, QMessageBox
+    QAction,  QSplitter, QDockWidget, QMessageBox, QDialog, QProgressBar
 )
 from PyQt5.QtGui import QPixmap, QIcon, QPainter, QColor, QBrush
-from PyQt5.QtCore import Qt, QRectF, QPointF, QSizeF, QSettings, QSize
+from PyQt5.QtCore import Qt, QRectF, QPointF, QSizeF, QSettings, QSize, QThreadPool, QTimer, QStandardPaths
+from PyQt5 import sip
 
 import utils
 from FinishLine import FinishLine
@@ -24,6 +25,27 @@ from SpawnpointPropertyPanel import SpawnpointPropertyPanel
 from ItemPropertyPanel import ItemPropertyPanel
 from utils import snap, resolve_texture_path
 from MapRect import MapRect
+from TextureCache import TextureCache
+from TextureLoader import TextureLoader
+from TextureDecoder import TextureDecoder
+from texture_store import TextureStore
+from ExportDialog import ExportDialog
+from MapSaver import MapSaveTask, store_textures
+from map_io import read_map, write_map, BINARY_EXTENSION, CHUNKED_EXTENSION, is_chunked_path
+import map_chunks
+from MapJournal import MapJournal
+from ChunkPager import ChunkPager
+import map_records
+import map_model
+import map_validation
+from map_records import item_model
+from config import GRID_SIZE
+from ValidationPanel import ValidationPanel
+import exporter
+import rect_merge
+import occlusion
+import texture_usage
+from TextureUsageDialog import TextureUsageDialog
 from MapItem import MapItem
 from MapPortal import MapPortal
 from MapJumpPad import MapJumpPad
@@ -31,15 +53,32 @@ from PlayerSpawnpoint import PlayerSpawnpoint
 
 class MapDesigner(QMainWindow):
 
-    SPAWN_OFFSET_X = 32
+    # Graphics item showing each kind of map_model record
+    ITEM_VIEWS = {
+        map_model.Spawnpoint: PlayerSpawnpoint,
+        map_model.Start: StartLine,
+        map_model.Finish: FinishLine,
+        map_model.Rect: MapRect,
+        map_model.Triangle: MapTriangle,
+        map_model.Item: MapItem,
+        map_model.JumpPad: MapJumpPad,
+    }
 
     def __init__(self):
         super().__init__()
 
         self.setWindowTitle("Map Designer")
         self.filename = None
+        self.export_options = None
+        self._save_task = None
+        self._save_pending = None  # Filename to save to once the running save is done
         self.settings = QSettings("Racesow", "MapDesigner/App")
 
+        # Texture decoding threads shared by the whole editor, 0 uses every core
+        decoder = TextureDecoder.instance()
+        decoder.set_thread_count(self.settings.value("textures/decode_threads", 0, type=int))
+        decoder.profile = self.settings.value("textures/profile_decoding", False, type=bool)
+
         # Create a temporary directory for textures when no project is saved
         self.temp_textures_dir = tempfile.mkdtemp(prefix="mapdesigner_textures_")
 
@@ -54,6 +93,8 @@ class MapDesigner(QMainWindow):
         self.textures_panel.setSkyRequested.connect(self.set_sky)
         self.textures_panel.setOverlayRequested.connect(self.set_overlay)
         self.textures_panel.textureRemoveRequested.connect(self.remove_texture)
+        self.textures_panel.textureModified.connect(TextureCache.instance().invalidate)
+        TextureCache.instance().textureChanged.connect(self.on_texture_changed)
         self.textures_panel.set_textures_folder(self.temp_textures_dir, True)
 
         # --- MAIN LAYOUT ---
@@ -80,6 +121,23 @@ class MapDesigner(QMainWindow):
         self.right_bottom_dock.setWidget(self.layers_panel)
         self.right_dock_splitter.addWidget(self.right_bottom_dock)
 
+        # --- VALIDATION DOCK ---
+        self.validation_panel = ValidationPanel()
+        self.validation_panel.validateRequested.connect(self.validate_map)
+        self.validation_panel.findingActivated.connect(self.select_finding)
+        self.validation_dock = QDockWidget("Validation", self)
+        self.validation_dock.setObjectName("validation_dock")
+        self.validation_dock.setWidget(self.validation_panel)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.validation_dock)
+        self.validation_dock.hide()
+        # (model, portal ends, {kind: items}) the findings shown refer to
+        self._validated = None
+
+        # Created when first opened from the menu
+        self.texture_usage_dialog = None
+        # Unused textures to delete after the next save, see prune_textures()
+        self._textures_to_prune = set()
+
         # --- Property Panels ---
         self.rect_properties_panel = RectPropertiesPanel()
         self.triangle_properties_panel = TrianglePropertiesPanel()
@@ -95,6 +153,39 @@ class MapDesigner(QMainWindow):
         self.create_actions()
         self.create_toolbar()
         self.statusBar()
+
+        # Saves run one at a time on their own thread, progress shows in the status bar
+        self.save_pool = QThreadPool(self)
+        self.save_pool.setMaxThreadCount(1)
+        self.save_progress = QProgressBar()
+        self.save_progress.setMaximumWidth(160)
+        self.save_progress.setTextVisible(False)
+        self.save_progress.hide()
+        self.statusBar().addPermanentWidget(self.save_progress)
+
+        # Textures of loaded maps decode in the background
+        self.texture_loader = TextureLoader(self)
+        self.texture_progress = QProgressBar()
+        self.texture_progress.setMaximumWidth(160)
+        self.texture_progress.setTextVisible(False)
+        self.texture_progress.hide()
+        self.statusBar().addPermanentWidget(self.texture_progress)
+        self.texture_loader.progress.connect(self._on_texture_progress)
+
+        # Edits are journaled as they happen so they survive a crash
+        self.journal = MapJournal(self.scene, self.save_pool, parent=self)
+        QTimer.singleShot(0, self._offer_recovery)
+
+        # Chunked maps keep only the part around the view in the scene
+        self.chunk_pager = ChunkPager(
+            self.scene, self.journal, self._add_map_data,
+            lambda path: resolve_texture_path(path, self.filename), self)
+        self._page_timer = QTimer(self)
+        self._page_timer.setSingleShot(True)
+        self._page_timer.setInterval(50)
+        self._page_timer.timeout.connect(self._update_chunks)
+        self.view.viewportChanged.connect(self._page_timer.start)
+
         self._init_ui()
 
     def properties_panel_for(self, item):
@@ -137,6 +228,15 @@ class MapDesigner(QMainWindow):
 
         # Sync settings to ensure they're written to disk
         self.settings.sync()
+
+        self.texture_loader.cancel()
+
+        # Let a running save finish before its textures are removed
+        self.save_pool.waitForDone()
+
+        # A clean exit leaves nothing to recover
+        self.journal.discard()
+        self.settings.remove("recovery/journal")
         
         # Clean up temporary textures directory
         if hasattr(self, 'temp_textures_dir') and os.path.exists(self.temp_textures_dir):
@@ -148,52 +248,46 @@ class MapDesigner(QMainWindow):
         # Accept the close event
         event.accept()
         
-    def _migrate_textures_from_temp(self, project_textures_dir):
+    def _temp_texture_files(self):
+        """Textures in the temporary folder used before the project was saved"""
+        if not hasattr(self, 'temp_textures_dir') or not os.path.exists(self.temp_textures_dir):
+            return []
+        return [os.path.join(self.temp_textures_dir, f) for f in os.listdir(self.temp_textures_dir)
+                if os.path.isfile(os.path.join(self.temp_textures_dir, f)) and
+                f.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".gif"))]
+
+    def _apply_stored_textures(self, stored, filename):
+        """Point items at the copies of their textures in the project of filename.
+
+        stored maps the texture paths of the items to the stored files, the
+        items get the same paths relative to filename as the saved map.
+        """
+        base_dir = os.path.dirname(filename)
+        for item in self.scene.items():
+            texture_path = getattr(item, "texture_path", None)
+            if texture_path in stored:
+                relative = os.path.relpath(stored[texture_path], base_dir)
+                if relative != texture_path:
+                    item.texture_path = relative
+                    map_records.mark_edited(item)
+
+    def _apply_migrated_textures(self, texture_map):
         """
-        Migrate textures from temporary folder to project folder
+        Point items at the project copies of textures migrated from the temporary folder
         
         Args:
-            project_textures_dir: Path to the textures directory in the project folder
+            texture_map: maps paths in the temporary folder to their copies in the project
         """
-        if not hasattr(self, 'temp_textures_dir') or not os.path.exists(self.temp_textures_dir):
+        if not texture_map:
             return
-            
-        print(f"Migrating textures from {self.temp_textures_dir} to {project_textures_dir}")
-            
-        # Ensure project textures directory exists
-        os.makedirs(project_textures_dir, exist_ok=True)
-        
-        # Get list of texture files in temporary directory
-        temp_files = []
-        if os.path.exists(self.temp_textures_dir):
-            temp_files = [f for f in os.listdir(self.temp_textures_dir) 
-                         if os.path.isfile(os.path.join(self.temp_textures_dir, f)) and 
-                         f.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".gif"))]
-        
-        # Copy files from temporary directory to project directory
-        texture_map = {}  # Maps old paths to new paths
-        for filename in temp_files:
-            src_path = os.path.join(self.temp_textures_dir, filename)
-            dst_path = os.path.join(project_textures_dir, filename)
-            
-            # Handle filename conflicts by adding a suffix if needed
-            if os.path.exists(dst_path):
-                base, ext = os.path.splitext(filename)
-                counter = 1
-                while os.path.exists(dst_path):
-                    new_filename = f"{base}_{counter}{ext}"
-                    dst_path = os.path.join(project_textures_dir, new_filename)
-                    counter += 1
-            
-            # Copy the file
-            shutil.copy2(src_path, dst_path)
-            texture_map[src_path] = dst_path
-            
+        print(f"Migrated {len(texture_map)} textures from {self.temp_textures_dir}")
+
         # Update texture paths in scene items
         for item in self.scene.items():
             texture_path = getattr(item, "texture_path", None)
             if texture_path and texture_path in texture_map:
                 item.texture_path = texture_map[texture_path]
+                map_records.mark_edited(item)
                 
         # Update sky if it's from the temporary folder
         if hasattr(self.view, '_background_image_path') and self.view._has_sky:
@@ -445,22 +539,26 @@ class MapDesigner(QMainWindow):
         """Set the selected texture as a fixed sky behind the grid"""
         if texture_path and os.path.exists(texture_path):
             self.view.set_sky_image(texture_path)
+            self.journal.record_sky(texture_path)
             self.statusBar().showMessage(f"Sky set to: {os.path.basename(texture_path)}", 3000)
 
     def set_overlay(self, texture_path):
         """Set the selected texture as a fixed sky behind the grid"""
         if texture_path and os.path.exists(texture_path):
             self.view.set_overlay_image(texture_path)
+            self.journal.record_overlay(texture_path)
             self.statusBar().showMessage(f"Overlay set to: {os.path.basename(texture_path)}", 3000)
             
     def remove_sky(self):
         """Remove the current sky image"""
         self.view.set_sky_image(None)
+        self.journal.record_sky(None)
         self.statusBar().showMessage("Sky removed", 3000)
 
     def remove_overlay(self):
         """Remove the current overlay image"""
         self.view.set_overlay_image(None)
+        self.journal.record_overlay(None)
         self.statusBar().showMessage("Overlay removed", 3000)
         
     def remove_texture(self, texture_path):
@@ -537,12 +635,32 @@ class MapDesigner(QMainWindow):
             item.texture_path = None
             item.texture_pixmap = None
             item.update()
+            map_records.mark_edited(item)
             
-        # Reload textures panel to reflect the changes
-        self.textures_panel.load_textures_folder()
+        # Update textures panel to reflect the changes
+        self.textures_panel.refresh_textures_folder()
         
         self.statusBar().showMessage(f"Texture removed: {os.path.basename(texture_path)}", 3000)
 
+    def on_texture_changed(self, texture_key):
+        """Refresh the sky, overlay and items showing a texture that changed on disk"""
+        cache = TextureCache.instance()
+
+        if self.view._has_sky and cache.key(self.view._sky_image_path) == texture_key:
+            self.view.set_sky_image(self.view._sky_image_path)
+
+        if self.view._has_overlay and cache.key(self.view._overlay_image_path) == texture_key:
+            self.view.set_overlay_image(self.view._overlay_image_path)
+
+        for item in self.scene.items():
+            texture_path = getattr(item, "texture_path", None)
+            if not texture_path:
+                continue
+            if self.filename:
+                texture_path = resolve_texture_path(texture_path, self.filename)
+            if cache.key(texture_path) == texture_key:
+                TextureDecoder.instance().attach(item, texture_path, item.texture_path)
+
     def create_actions(self):
         self.menuBar().clear()
         if self.filename is not None:
@@ -557,6 +675,18 @@ class MapDesigner(QMainWindow):
         load_act = QAction("Load", self, triggered=self.load)
         self.menuBar().addAction(load_act)
 
+        export_act = QAction("Export", self, triggered=self.export)
+        self.menuBar().addAction(export_act)
+
+        validate_act = QAction("Validate", self, triggered=self.validate_map)
+        self.menuBar().addAction(validate_act)
+
+        hidden_act = QAction("Find Hidden Shapes", self, triggered=self.find_hidden_shapes)
+        self.menuBar().addAction(hidden_act)
+
+        usage_act = QAction("Texture Usage", self, triggered=self.show_texture_usage)
+        self.menuBar().addAction(usage_act)
+
     def on_selection_changed(self):
         items = self.scene.selectedItems()
         if items:
@@ -598,8 +728,15 @@ class MapDesigner(QMainWindow):
 
     def save_as(self):
         last_folder = self.settings.value("map/last_folder", "")
-        self.filename, _ = QFileDialog.getSaveFileName(self, "Save Map", last_folder, "YAML Files (*.yaml)")
-        self.save()
+        binary_filter = f"Binary Maps (*{BINARY_EXTENSION})"
+        chunked_filter = f"Chunked Maps (*{CHUNKED_EXTENSION})"
+        filename, selected_filter = QFileDialog.getSaveFileName(
+            self, "Save Map", last_folder, f"YAML Files (*.yaml);;{binary_filter};;{chunked_filter}")
+        if filename and not os.path.splitext(filename)[1]:
+            extensions = {binary_filter: BINARY_EXTENSION, chunked_filter: CHUNKED_EXTENSION}
+            filename += extensions.get(selected_filter, ".yaml")
+        if filename:
+            self.save(filename)
 
     def show_error(self, title: str, message: str):
         QMessageBox.critical(
@@ -609,372 +746,528 @@ class MapDesigner(QMainWindow):
             QMessageBox.StandardButton.Ok
         )
 
-    def save(self):
-        if self.filename:
-            self.setWindowTitle(f"Map Designer: {self.filename}")
-            base_dir = os.path.dirname(self.filename)
+    def save(self, filename=None):
+        """Save the map to filename, by default the file it was loaded from or last saved to.
+
+        The texture paths of the scene are relative to self.filename, which
+        only becomes filename once the save succeeded.
+        """
+        # Actions pass their checked state
+        filename = filename or self.filename
+        if filename:
+            if self._save_task is not None:
+                # Save again with the latest changes once the running save is done
+                self._save_pending = filename
+                return
+
+            base_dir = os.path.dirname(filename)
             self.settings.setValue("map/last_folder", base_dir)
-            textures_dir = os.path.join(base_dir, "textures")
-            os.makedirs(textures_dir, exist_ok=True)
-            
-            # Migrate textures from temporary folder to project folder
-            self._migrate_textures_from_temp(textures_dir)
-            
-            # Update textures panel with the new textures folder
-            self.textures_panel.set_textures_folder(textures_dir, True)
-            
-            texture_map = {}  # original_path -> relative path in textures/
-            
-            # Get sky image path if it exists
-            sky_path = None
-            if self.view._has_sky:
-                sky_path = self.view._sky_image_path
-
-            # Step 1: Collect textures and copy them if needed
-
-            # Add sky to texture_map if it exists
-            if sky_path and os.path.exists(sky_path):
-                sky_basename = os.path.basename(sky_path)
-                sky_dst = os.path.join(textures_dir, sky_basename)
-                if not os.path.exists(sky_dst):
-                    shutil.copy(sky_path, sky_dst)
-                texture_map[sky_path] = os.path.relpath(sky_dst, base_dir)
-
-            # Get overlay image path if it exists
-            overlay_path = None
-            if self.view._has_overlay:
-                overlay_path = self.view._overlay_image_path
-
-            # Add overlay to texture_map if it exists
-            if overlay_path and os.path.exists(overlay_path):
-                overlay_basename = os.path.basename(overlay_path)
-                overlay_dst = os.path.join(textures_dir, overlay_basename)
-                if not os.path.exists(overlay_dst):
-                    shutil.copy(overlay_path, overlay_dst)
-                texture_map[overlay_path] = os.path.relpath(overlay_dst, base_dir)
-                
-            for item in self.scene.items():
-                texture_path = getattr(item, "texture_path", None)
-                if texture_path:
-                    texture_basename = os.path.basename(texture_path)
-                    texture_dst = os.path.join(textures_dir, texture_basename)
-                    if not os.path.exists(texture_dst) and os.path.exists(texture_path):
-                        shutil.copy(texture_path, texture_dst)
-                    texture_map[texture_path] = os.path.relpath(texture_dst, base_dir)
-
-            # Step 2: Save items with relative texture paths
-            data = {}
-            rectangles = []
-            triangles = []
-            items = []
-            portals = []
-            jump_pads = []
-
-            for item in self.scene.items():
-                if isinstance(item, PlayerSpawnpoint):
-                    # Save player spawnpoint position at the root level
-                    data["player_spawnpoint"] = {
-                        "x": item.pos().x() + MapDesigner.SPAWN_OFFSET_X,
-                        "y": item.pos().y()
-                    }
-                elif isinstance(item, StartLine):
-                    data["start_line"] = {
-                        "x": item.pos().x(),
-                        "y": item.pos().y()
-                    }
-                elif isinstance(item, FinishLine):
-                    data["finish_line"] = {
-                        "x": item.pos().x(),
-                        "y": item.pos().y()
-                    }
-                elif isinstance(item, MapRect):
-                    texture = getattr(item, "texture_path", None)
-                    d = {
-                        "x": item.pos().x() + item.rect().x(),
-                        "y": item.pos().y() + item.rect().y(),
-                        "w": item.rect().width(),
-                        "h": item.rect().height(),
-                        "wall_type": getattr(item, "stype", "static"),
-                        "texture": texture_map.get(texture, None) if texture else None,
-                        "texture_scale": getattr(item, "texture_scale", 1.0),
-                        "texture_rotation": getattr(item, "texture_rotation", 0.0),
-                        "texture_offset_x": getattr(item, "texture_offset_x", 0.0),
-                        "texture_offset_y": getattr(item, "texture_offset_y", 0.0),
-                        "z_index": item.zValue(),
-                    }
-                    rectangles.append(d)
-                elif isinstance(item, MapTriangle):
-                    texture = getattr(item, "texture_path", None)
-                    item_pos = item.pos()
-                    d = {
-                         "points": [{'x': (p + item_pos).x(), 'y': (p + item_pos).y()} for p in item.polygon()],
-                        "wall_type": getattr(item, "stype", "ramp"),
-                        "texture": texture_map.get(texture, None) if texture else None,
-                        "texture_scale": getattr(item, "texture_scale", 1.0),
-                        "texture_rotation": getattr(item, "texture_rotation", 0.0),
-                        "texture_offset_x": getattr(item, "texture_offset_x", 0.0),
-                        "texture_offset_y": getattr(item, "texture_offset_y", 0.0),
-                        "z_index": item.zValue(),
-                    }
-                    triangles.append(d)
-                elif isinstance(item, MapItem):
-                    d = {
-                        "x": item.pos().x() + item.rect().x(),
-                        "y": item.pos().y() + item.rect().y(),
-                        "type": getattr(item, "item_type", "plasma"),
-                        "ammo": getattr(item, "ammo", 10),
-                        "stay": getattr(item, "stay", False),
-                    }
-                    items.append(d)
-                elif isinstance(item, MapJumpPad):
-                    d = {
-                        "x": item.pos().x() + item.rect().x(),
-                        "y": item.pos().y() + item.rect().y(),
-                        "vel": getattr(item, 'velocity', 0.3),
-                        "rotation": item.rotation(),
-                    }
-                    jump_pads.append(d)
-                elif isinstance(item, MapPortal) and item.item_type == "entry":
-
-                    exit = None
-                    num = 0
-                    for portal in self.scene.items():
-                        if isinstance(portal, MapPortal) and portal.item_type == "exit" and item.ID == portal.ID:
-                            num += 1
-                            exit = portal
-
-                    if exit is None:
-                        self.show_error("Missing Portal", f"The Portal Entry with ID {item.ID} has no Portal Exit.")
-                        return
-
-                    if num > 1:
-                        self.show_error("Wrong Portal", f"The Portal Entry with ID {item.ID} has more than one Exit.")
-                        return
-
-                    d = {
-                        "entry_x": item.pos().x() + item.rect().x(),
-                        "entry_y": item.pos().y() + item.rect().y(),
-                        "entry_flipped": item.flipped,
-                        "exit_x": exit.pos().x() + exit.rect().x(),
-                        "exit_y": exit.pos().y() + exit.rect().y(),
-                        "exit_flipped": exit.flipped,
-                    }
-                    portals.append(d)
-
-                elif isinstance(item, MapPortal) and item.item_type == "exit":
-                    entry = None
-                    num = 0
-                    for portal in self.scene.items():
-                        if isinstance(portal, MapPortal) and portal.item_type == "entry" and item.ID == portal.ID:
-                            num += 1
-                            entry = portal
-
-                    if entry is None:
-                        self.show_error("Missing Portal", f"The Portal Exit with ID {item.ID} has no Portal Entry.")
-                        return
-
-                    if num > 1:
-                        self.show_error("Wrong Portal", f"The Portal Exit with ID {item.ID} has more than one Entry.")
-                        return
-            
-            # Sort rectangles and triangles by z-index in ascending order
-            rectangles.sort(key=lambda x: x["z_index"])
-            triangles.sort(key=lambda x: x["z_index"])
-            
-            # Add rectangles, triangles, and items to data if they exist
-            if rectangles:
-                data["rectangles"] = rectangles
-            if triangles:
-                data["triangles"] = triangles
-            if items:
-                data["items"] = items
-            if portals:
-                data["portals"] = portals
-            if jump_pads:
-                data["jump_pads"] = jump_pads
-
-            # Add sky to data if it exists
-            if sky_path and sky_path in texture_map:
-                data["sky"] = texture_map[sky_path]
-
-            # Add sky to data if it exists
-            if overlay_path and overlay_path in texture_map:
-                data["parallax_1"] = texture_map[overlay_path]
-
-            with open(self.filename, "w") as f:
-                yaml.dump(data, f)
+
+            # Only the chunked format with the default chunk width can be written
+            # from the chunks as they are, otherwise the whole map is loaded
+            if self.chunk_pager.is_active() and (
+                    not is_chunked_path(filename) or
+                    self.chunk_pager.chunk_width != map_chunks.DEFAULT_CHUNK_WIDTH):
+                self.chunk_pager.load_all()
+                self.view.content_rect = QRectF()
+
+            # Snapshot the scene on the GUI thread, copying textures and writing
+            # the file happen on the save thread
+            data = self._collect_map_data()
+            if data is None:
+                return
+
+            # Chunks are read from the map file until the new one is written
+            self.chunk_pager.frozen = self.chunk_pager.is_active()
+
+            task = MapSaveTask(filename, data, self._texture_sources(data), self._temp_texture_files())
+            task.signals.progress.connect(self._on_save_progress)
+            task.signals.finished.connect(self._on_save_finished)
+            task.signals.failed.connect(self._on_save_failed)
+            self._save_task = task
+            self.save_progress.setValue(0)
+            self.save_progress.show()
+            self.save_pool.start(task)
+
+    def _on_save_progress(self, step, steps, message):
+        self.save_progress.setMaximum(steps)
+        self.save_progress.setValue(step)
+        self.statusBar().showMessage(message)
+
+    def _on_save_finished(self, result):
+        self._save_task = None
+        self.save_progress.hide()
+
+        # Saved under a new name, the scene's texture paths follow the map
+        if result["filename"] != self.filename:
+            self._apply_stored_textures(result["stored"], result["filename"])
+            self.filename = result["filename"]
+        self.setWindowTitle(f"Map Designer: {self.filename}")
+
+        # Saved under a new name, keep the journal next to it
+        if self.journal.map_filename != self.filename:
+            self._start_journal()
+
+        # Textures added before the project had a folder now live in it
+        self._apply_migrated_textures(result["migrated"])
+
+        # The saved map no longer needs the pruned textures
+        pruned = self._prune_saved_textures(result) if self._textures_to_prune else 0
+
+        # Update textures panel with the new textures folder
+        self.textures_panel.set_textures_folder(result["textures_dir"], True)
+
+        # Page chunks from the file just written
+        if self.chunk_pager.is_active():
+            self.chunk_pager.reopen(result["filename"])
+            self.chunk_pager.frozen = False
+            self._update_chunks()
+
+        print(f"Saved {result['filename']}: copied {result['copied_files']} textures ({result['copied_bytes']} bytes)")
+        message = (f"Saved {os.path.basename(result['filename'])}, copied {result['copied_files']} textures "
+                   f"({utils.format_bytes(result['copied_bytes'])})")
+        if pruned:
+            print(f"Removed {pruned} unused textures")
+            message += f", removed {pruned} unused textures"
+        self.statusBar().showMessage(message, 3000)
+        self._save_next()
+
+    def _on_save_failed(self, message):
+        self._save_task = None
+        self.save_progress.hide()
+        self.chunk_pager.frozen = False
+        self.statusBar().clearMessage()
+        self.show_error("Save failed", message)
+        self._save_next()
+
+    def _save_next(self):
+        if self._save_pending:
+            filename, self._save_pending = self._save_pending, None
+            self.save(filename)
+
+    def _texture_sources(self, data):
+        """Map the sky, overlay and shape texture paths of the map data to the files they resolve to"""
+        texture_paths = []
+
+        # Add sky and overlay if they exist
+        for key in ("sky", "parallax_1"):
+            path = data.get(key)
+            if path and os.path.exists(path):
+                texture_paths.append(path)
+
+        # Includes the shapes of chunks that are not loaded
+        for kind in ("rectangles", "triangles"):
+            for shape in data.get(kind, []):
+                if shape.get("texture"):
+                    texture_paths.append(shape["texture"])
+
+        return {texture_path: resolve_texture_path(texture_path, self.filename) for texture_path in texture_paths}
+
+    def _collect_map_data(self):
+        """Build the map data written to YAML, or None if the map is not valid.
+
+        Texture entries hold the paths used in the editor, store_textures()
+        turns them into paths relative to the saved map. Portals without a
+        partner keep the map from being saved, they are listed in the
+        Validation dock. The other checks are left to Validate Map.
+        """
+        model, ends, sources = self._scene_model()
+        start = time.perf_counter()
+        findings = map_validation.check_portals(ends)
+        if findings:
+            self._validated = (model, ends, sources)
+            self.validation_panel.show_findings(findings, (time.perf_counter() - start) * 1000)
+            self.validation_dock.show()
+            self.statusBar().showMessage("Not saved: some portals have no partner, see Validation")
+            return None
+        model.portals, _ = map_model.pair_portals(ends)
+        return model.to_dict()
+
+    def _scene_model(self):
+        """The map in the scene as (model, portal ends, {kind: items}).
+
+        The item lists run parallel to the model's lists and to the portal
+        ends, with None for the entries of chunks that are paged out.
+        """
+        sky_path = self.view._sky_image_path if self.view._has_sky else None
+        overlay_path = self.view._overlay_image_path if self.view._has_overlay else None
+
+        model = map_model.MapModel()
+        model.sky = sky_path
+        model.overlay = overlay_path
+        ends = []
+        sources = {}
+
+        def add(record, item):
+            if isinstance(record, map_model.PortalEnd):
+                ends.append(record)
+            else:
+                model.add(record)
+            sources.setdefault(record.KIND, []).append(item)
+
+        for item in self.scene.items():
+            record = item_model(item)
+            if record is not None:
+                add(record, item)
+
+        # Geometry of the chunks of a chunked map that are not in the scene
+        if self.chunk_pager.is_active():
+            for kind, d in self.chunk_pager.paged_out_records():
+                add(map_model.record_class(kind).from_dict(d), None)
+        return model, ends, sources
+
+    def _resolve_texture(self, path):
+        # Textures of a map not saved yet have absolute paths
+        if self.filename is None:
+            return path
+        return resolve_texture_path(path, self.filename)
+
+    def validate_map(self, show=True):
+        """Run every check over the map and list the findings in the Validation dock"""
+        model, ends, sources = self._scene_model()
+        findings, ms = map_validation.timed_validate(model, ends, resolve=self._resolve_texture, grid_size=GRID_SIZE)
+        self._validated = (model, ends, sources)
+        self.validation_panel.show_findings(findings, ms)
+        if show:
+            self.validation_dock.show()
+            self.statusBar().showMessage(f"Validated in {ms:.0f} ms, {len(findings)} findings")
+        print(f"Validated {sum(len(items) for items in sources.values())} entries in {ms:.1f} ms, "
+              f"{len(findings)} findings")
+        return findings
+
+    def find_hidden_shapes(self):
+        """List the shapes covered by opaque rectangles above them in the Validation dock"""
+        model, ends, sources = self._scene_model()
+        start = time.perf_counter()
+        hidden = occlusion.find_hidden(model.rectangles, model.triangles,
+                                       occlusion.opaque_textures(self._resolve_texture))
+        ms = (time.perf_counter() - start) * 1000
+
+        findings = []
+        for kind, index, droppable in hidden:
+            shape = "Rectangle" if kind == "rectangles" else "Triangle"
+            if droppable:
+                message = f"{shape} is hidden by opaque rectangles, left out on export"
+            else:
+                message = f"{shape} is hidden by opaque rectangles, kept on export for its collision"
+            findings.append(map_validation.Finding(map_validation.WARNING, "hidden", message, [(kind, index)]))
+        self._validated = (model, ends, sources)
+        self.validation_panel.show_findings(findings, ms)
+        self.validation_dock.show()
+        self.statusBar().showMessage(f"{len(findings)} hidden shapes")
+        return findings
+
+    def show_texture_usage(self):
+        """Open the list of the project's textures with their references and sizes"""
+        if self.texture_usage_dialog is None:
+            self.texture_usage_dialog = TextureUsageDialog(self)
+            self.texture_usage_dialog.pruneRequested.connect(self.prune_textures)
+            self.texture_usage_dialog.downscaleRequested.connect(self.downscale_textures)
+            self.texture_usage_dialog.refreshRequested.connect(self.show_texture_usage)
+        self.texture_usage_dialog.show_usages(self._texture_usage())
+        self.texture_usage_dialog.show()
+        self.texture_usage_dialog.raise_()
+
+    def _texture_usage(self):
+        # Counts the shapes of paged out chunks too
+        model, _, _ = self._scene_model()
+        return texture_usage.scan(self.textures_panel.textures_folder, model, self._resolve_texture)
+
+    def prune_textures(self, usages):
+        """Delete the texture files of usages that nothing uses, once the map is saved"""
+        # The map may have changed since the list was shown
+        unused = {usage.path: usage for usage in self._texture_usage() if usage.unused}
+        paths = [usage.path for usage in usages if usage.path in unused]
+        if not paths:
+            return
+
+        # The textures folder is shared by every map next to this one
+        kept = texture_usage.other_map_references(self.filename, paths) if self.filename else {}
+        paths = [path for path in paths if path not in kept]
+        kept_note = ""
+        if kept:
+            kept_note = f"\n\n{len(kept)} are kept, other maps in the folder use them: " + ", ".join(
+                f"{os.path.basename(path)} ({', '.join(maps)})" for path, maps in sorted(kept.items()))
+        if not paths:
+            QMessageBox.information(self, "Prune Unused Textures", "Nothing to delete." + kept_note)
+            return
+
+        size = sum(unused[path].file_size for path in paths)
+        if self.filename is None:
+            # The temporary folder belongs to this editor alone
+            question = f"Delete {len(paths)} unused texture(s) ({utils.format_bytes(size)}) from the textures folder?"
+        else:
+            # The saved map may still use them until it is saved again
+            question = (f"Delete {len(paths)} unused texture(s) ({utils.format_bytes(size)}) from the textures "
+                        "folder when the map is saved?")
+        reply = QMessageBox.question(
+            self,
+            "Prune Unused Textures",
+            question + kept_note,
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        if self.filename is None:
+            removed = self._delete_textures(paths)
+            self.textures_panel.refresh_textures_folder()
+            self.show_texture_usage()
+            self.statusBar().showMessage(f"Removed {removed} unused textures", 3000)
+        else:
+            self._textures_to_prune = set(paths)
+            self.statusBar().showMessage(f"{len(paths)} unused textures will be removed on the next save", 3000)
+
+    def _prune_saved_textures(self, result):
+        """Delete the textures prune_textures() marked that neither the saved map nor the other maps use"""
+        paths, self._textures_to_prune = self._textures_to_prune, set()
+        # Saved somewhere else meanwhile, the marked files belong to another project
+        folder = os.path.normcase(os.path.abspath(result["textures_dir"]))
+        paths = [path for path in paths
+                 if os.path.normcase(os.path.dirname(os.path.abspath(path))) == folder and os.path.exists(path)]
+        if not paths:
+            return 0
+
+        used = texture_usage.referenced_files(result["data"], result["filename"])
+        # Edits made while the save was running may use them again
+        used.update(TextureCache.key(usage.path) for usage in self._texture_usage() if not usage.unused)
+        paths = [path for path in paths if TextureCache.key(path) not in used]
+        kept = texture_usage.other_map_references(result["filename"], paths)
+        return self._delete_textures([path for path in paths if path not in kept])
+
+    def _delete_textures(self, paths):
+        failed = []
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Error removing texture {path}: {e}")
+                failed.append(os.path.basename(path))
+        if failed:
+            QMessageBox.warning(self, "Error Removing Textures", "Could not delete " + ", ".join(failed))
+        return len(paths) - len(failed)
+
+    def downscale_textures(self, usages):
+        """Point shapes at smaller copies of textures only drawn much smaller than their size"""
+        # Factors from the map as it is now
+        factors = {usage.path: usage.downscale_factor for usage in self._texture_usage()}
+        factors = {usage.path: factors[usage.path] for usage in usages if factors.get(usage.path, 1) > 1}
+        if not factors:
+            return
+        reply = QMessageBox.question(
+            self,
+            "Downscale Textures",
+            f"Make smaller copies of {len(factors)} texture(s) and point the shapes of this map at them, with "
+            "their texture scale raised to match? The map looks the same afterwards. The copies go into the "
+            "textures folder when the map is saved, the original files stay as they are.",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        # Every shape using a texture has to be in the scene to get its new scale
+        if self.chunk_pager.is_active():
+            self.chunk_pager.load_all()
+
+        # The copies wait in the temporary folder, saving stores them in the project
+        copies = {}
+        for path, factor in factors.items():
+            copy = texture_usage.downscale(path, factor, self.temp_textures_dir)
+            if copy:
+                copies[TextureCache.key(path)] = (copy, factor)
+            else:
+                print(f"Could not downscale texture {path}")
+
+        shapes = 0
+        decoder = TextureDecoder.instance()
+        for item in self.scene.items():
+            texture_path = getattr(item, "texture_path", None)
+            if not texture_path:
+                continue
+            copy = copies.get(TextureCache.key(self._resolve_texture(texture_path)))
+            if copy:
+                item.texture_path = copy[0]
+                item.texture_scale *= copy[1]
+                decoder.attach(item, item.texture_path)
+                item.update()
+                map_records.mark_edited(item)
+                shapes += 1
+
+        if self.filename is None:
+            self.textures_panel.refresh_textures_folder()
+        self.on_selection_changed()
+        self.show_texture_usage()
+        self.statusBar().showMessage(f"Downscaled {len(copies)} textures used by {shapes} shapes", 3000)
+
+    def select_finding(self, finding):
+        """Select and show the items a finding is about"""
+        if self._validated is None:
+            return
+        model, ends, sources = self._validated
+        items = []
+        for kind, index in finding.entries:
+            if kind not in sources:
+                continue  # The sky and overlay
+            item = sources[kind][index]
+            if item is None or sip.isdeleted(item) or item.scene() is not self.scene:
+                # Paged out or recreated since, look it up by its record
+                item = self._find_item(map_validation.entry_record(model, ends, kind, index), items)
+            if item is not None:
+                items.append(item)
+
+        self.scene.clearSelection()
+        if not items:
+            self.statusBar().showMessage("The entries of this finding are no longer in the map")
+            return
+        bounds = QRectF()
+        for item in items:
+            item.setSelected(True)
+            bounds = bounds.united(item.sceneBoundingRect())
+        self.view.centerOn(bounds.center())
+
+    def _find_item(self, record, taken=()):
+        """The scene item showing record, paging in its chunk if needed.
+
+        Items in taken are skipped, for findings about identical entries.
+        """
+        left, top, right, bottom = record.bounds()
+        area = QRectF(left, top, right - left, bottom - top).adjusted(-1, -1, 1, 1)
+        if self.chunk_pager.is_active():
+            self.view.centerOn(area.center())
+            self._update_chunks()
+        for item in self.scene.items(area):
+            if item not in taken and item_model(item) == record:
+                return item
+        return None
+
+    def export(self):
+        """Write the map for the game, running the export passes such as texture atlases"""
+        dialog = ExportDialog(self.export_options, self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        self.export_options = dialog.options()
+
+        last_folder = self.settings.value("map/last_export_folder", self.settings.value("map/last_folder", ""))
+        export_filename, _ = QFileDialog.getSaveFileName(self, "Export Map", last_folder, "YAML Files (*.yaml)")
+        if not export_filename:
+            return
+        base_dir = os.path.dirname(export_filename)
+        self.settings.setValue("map/last_export_folder", base_dir)
+
+        data = self._collect_map_data()
+        if data is None:
+            return
+
+        try:
+            store = TextureStore(os.path.join(base_dir, "textures"))
+            store_textures(data, self._texture_sources(data), store, base_dir)
+            report = exporter.export_map_data(data, export_filename, self.export_options)
+            write_map(export_filename, data)
+        except OSError as e:
+            self.show_error("Export failed", str(e))
+            return
+
+        if self.export_options.get("merge_in_scene"):
+            self.merge_rects_in_scene()
+
+        summary = exporter.summarize_report(report)
+        print(f"Exported {export_filename}: {summary}")
+        self.statusBar().showMessage(f"Exported {os.path.basename(export_filename)}" + (f": {summary}" if summary else ""), 5000)
+
+    def merge_rects_in_scene(self):
+        """Replace abutting rectangles of the same look with merged ones, as the export does.
+
+        Only the rectangles in the scene are merged, for a chunked map those
+        of the chunks paged in. Returns the number of rectangles removed.
+        """
+        items = [item for item in self.scene.items() if isinstance(item, MapRect) and item_model(item) is not None]
+        # Bottom to top, so the merged rects keep the stacking of the map data
+        items.sort(key=lambda item: item.zValue())
+        merged, sources = rect_merge.merge_rects(
+            [item.to_record() for item in items], rect_merge.texture_sizes(self._resolve_texture))
+
+        removed = 0
+        for record, group in zip(merged, sources):
+            if len(group) == 1:
+                continue
+            rect = MapRect.from_record(record)
+            rect.texture_pixmap = items[group[0]].texture_pixmap
+            for index in group:
+                self.scene.removeItem(items[index])
+            self.scene.addItem(rect)
+            removed += len(group) - 1
+        print(f"Merged rectangles in the scene: {len(items)} -> {len(items) - removed}")
+        return removed
+
+    def _journal_base(self):
+        if self.filename:
+            folder, name = os.path.split(self.filename)
+            return os.path.join(folder, f".{name}.journal")
+        folder = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+        return os.path.join(folder, "recovery", "untitled.journal")
+
+    def _start_journal(self):
+        sky = self.view._sky_image_path if self.view._has_sky else None
+        overlay = self.view._overlay_image_path if self.view._has_overlay else None
+        if self.chunk_pager.is_active():
+            self.journal.start(self._journal_base(), self.filename, sky, overlay,
+                               self.chunk_pager.journaled_chunks(), self.chunk_pager.stashed_records())
+        else:
+            self.journal.start(self._journal_base(), self.filename, sky, overlay)
+        self.settings.setValue("recovery/journal", self.journal.base)
+
+    def _offer_recovery(self):
+        """Offer to restore the edits journaled by a session that did not exit cleanly"""
+        base = self.settings.value("recovery/journal", "")
+        if base and os.path.exists(MapJournal.snapshot_path(base)):
+            answer = QMessageBox.question(
+                self,
+                "Recover Map",
+                "The editor did not shut down cleanly. Restore the unsaved changes?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if answer == QMessageBox.Yes:
+                try:
+                    filename, sky, overlay, records = MapJournal.replay(base)
+                except (OSError, ValueError, KeyError, yaml.YAMLError) as e:
+                    self.show_error("Recovery failed", str(e))
+                else:
+                    data, problems = map_records.records_to_map_data(records, sky, overlay)
+                    for problem in problems:
+                        print(f"Recovery dropped a portal: {problem}")
+                    self.filename = filename
+                    # Recovered maps are edited as a whole, chunked or not
+                    self.chunk_pager.close()
+                    self.load_map_data(data)
+                    if self.filename:
+                        self.setWindowTitle(f"Map Designer: {self.filename}")
+                        textures_path = os.path.join(os.path.dirname(self.filename), 'textures')
+                        self.textures_panel.set_textures_folder(textures_path, True)
+                    self.create_actions()
+                    self.statusBar().showMessage(f"Recovered {len(records)} items", 3000)
+                    return
+            MapJournal.remove_files(base)
+        self._start_journal()
 
     def load(self):
         last_folder = self.settings.value("map/last_folder", "")
-        self.filename, _ = QFileDialog.getOpenFileName(self, "Load Map", last_folder, "YAML Files (*.yaml)")
+        self.filename, _ = QFileDialog.getOpenFileName(
+            self, "Load Map", last_folder,
+            f"Map Files (*.yaml *{BINARY_EXTENSION} *{CHUNKED_EXTENSION});;YAML Files (*.yaml);;"
+            f"Binary Maps (*{BINARY_EXTENSION});;Chunked Maps (*{CHUNKED_EXTENSION})")
         self.setWindowTitle(f"Map Designer: {self.filename}")
         if self.filename:
             folder = os.path.dirname(self.filename)
             self.settings.setValue("map/last_folder", folder)
-            self.scene.clear()
-            with open(self.filename) as f:
-                data = yaml.safe_load(f)
-                
-                # Handle sky entry
-                if "sky" in data:
-                    sky_path = resolve_texture_path(data["sky"], self.filename)
-                    if os.path.exists(sky_path):
-                        self.set_sky(sky_path)
-
-                # Handle overlay entry
-                if "parallax_1" in data:
-                    overlay_path = resolve_texture_path(data["parallax_1"], self.filename)
-                    if os.path.exists(overlay_path):
-                        self.set_overlay(overlay_path)
-
-                # Handle player spawnpoint
-                if "player_spawnpoint" in data:
-                    spawnpoint_data = data["player_spawnpoint"]
-                    position = QPointF(spawnpoint_data["x"] - MapDesigner.SPAWN_OFFSET_X, spawnpoint_data["y"])
-                    spawnpoint = PlayerSpawnpoint(position)
-                    self.scene.addItem(spawnpoint)
-
-                # Handle start line
-                if "start_line" in data:
-                    start_line_data = data["start_line"]
-                    position = QPointF(start_line_data["x"], start_line_data["y"])
-                    start_line = StartLine(position)
-                    self.scene.addItem(start_line)
-
-                # Handle finish line
-                if "finish_line" in data:
-                    finish_line_data = data["finish_line"]
-                    position = QPointF(finish_line_data["x"], finish_line_data["y"])
-                    finish_line = FinishLine(position)
-                    self.scene.addItem(finish_line)
-
-                # Handle rectangles
-                if "rectangles" in data:
-                    for it in data["rectangles"]:
-                        rect = MapRect(QRectF(it["x"], it["y"], it["w"], it["h"]))
-                        # Load position separately
-                        rect.setPos(it.get("pos_x", 0.0), it.get("pos_y", 0.0))
-                        rect.stype = it.get("wall_type", "static")
-                        rect.texture_scale = it.get("texture_scale", 1.0)
-                        rect.texture_rotation = it.get("texture_rotation", 0.0)
-                        rect.texture_offset_x = it.get("texture_offset_x", 0.0)
-                        rect.texture_offset_y = it.get("texture_offset_y", 0.0)
-                        # Set z-index if available
-                        if "z_index" in it:
-                            rect.setZValue(it["z_index"])
-                        tex = it.get("texture")
-                        if tex:
-                            rect.texture_path = tex
-                            rect.texture_pixmap = QPixmap(resolve_texture_path(tex, self.filename))
-                        self.scene.addItem(rect)
-                
-                # Handle triangles
-                if "triangles" in data:
-                    for it in data["triangles"]:
-                        pts = [QPointF(xy["x"], xy["y"]) for xy in it["points"]]
-                        if len(pts) == 3:
-                            triangle = MapTriangle(*pts)
-                            triangle.stype = it.get("wall_type", False)
-                            triangle.texture_scale = it.get("texture_scale", 1.0)
-                            triangle.texture_rotation = it.get("texture_rotation", 0.0)
-                            triangle.texture_offset_x = it.get("texture_offset_x", 0.0)
-                            triangle.texture_offset_y = it.get("texture_offset_y", 0.0)
-                            # Set z-index if available
-                            if "z_index" in it:
-                                triangle.setZValue(it["z_index"])
-                            tex = it.get("texture")
-                            if tex:
-                                triangle.texture_path = tex
-                                triangle.texture_pixmap = QPixmap(resolve_texture_path(tex, self.filename))
-                            self.scene.addItem(triangle)
-
-                # Handle items
-                if "items" in data:
-                    for it in data["items"]:
-                        #try:
-                        # Create item with proper error checking
-                        if "x" not in it or "y" not in it:
-                            self.statusBar().showMessage(f"Warning: Skipping item with missing position/size data",3000)
-                            continue
-
-                        # Create item at origin first, then we'll set position
-                        item = MapItem()
-                        item.stay = it.get("stay", False)
-
-                        # Set position separately to match how rectangles are handled
-                        item.setPos(it["x"], it["y"])
-
-                        # Set item properties with defaults if missing
-                        item.item_type = it.get("type", "plasma")
-                        if item.item_type not in ["plasma", "rocket"]:
-                            self.statusBar().showMessage(f"Warning: Unknown item type '{item.item_type}', defaulting to 'plasma'", 3000)
-                            item.item_type = "plasma"
-
-                        item.ammo = int(it.get("ammo", 10))
-
-                        self.scene.addItem(item)
-                        #except Exception as e:
-                        #    self.statusBar().showMessage(f"Error loading item: {str(e)}", 3000)
-
-                # Handle portals
-                if "portals" in data:
-                    for index, pt in enumerate(data["portals"]):
-                        try:
-                            # Create item with proper error checking
-                            if "entry_x" not in pt or "entry_y" not in pt or "exit_x" not in pt or "exit_y" not in pt:
-                                self.statusBar().showMessage(f"Warning: Skipping item with missing portal data",3000)
-                                continue
-
-                            # Create entry portal
-                            entry_portal = MapPortal(QPointF(pt["entry_x"], pt["entry_y"]), "entry", pt.get("entry_flipped", False))
-                            entry_portal.ID = index
-                            self.scene.addItem(entry_portal)
-
-                            exit_portal  = MapPortal(QPointF(pt["exit_x"], pt["exit_y"]), "exit", pt.get("exit_flipped", False))
-                            exit_portal.ID = index
-                            self.scene.addItem(exit_portal)
-                        except Exception as e:
-                            self.statusBar().showMessage(f"Error loading Portal: {str(e)}", 3000)
-
-                # Handle Jump Pads
-                if "jump_pads" in data:
-                    for jp in data["jump_pads"]:
-                        try:
-                            if "x" not in jp or "y" not in jp:
-                                self.statusBar().showMessage(
-                                    f"Warning: Skipping Jump Pad with missing position", 3000)
-                                continue
-
-                            pos = QPointF(jp["x"], jp["y"])
-
-                            # New format: single velocity and rotation
-                            if "vel" in jp:
-                                item = MapJumpPad(pos, jp.get("vel", 0.3))
-                                if "rotation" in jp:
-                                    try:
-                                        item.setRotation(float(jp["rotation"]))
-                                    except Exception:
-                                        pass
-                            # Legacy format: vel_x, vel_y → compute magnitude and rotation
-                            elif "vel_x" in jp and "vel_y" in jp:
-                                vx = float(jp.get("vel_x", 0.0))
-                                vy = float(jp.get("vel_y", 0.0))
-                                # Compute speed magnitude
-                                speed = (vx ** 2 + vy ** 2) ** 0.5
-                                item = MapJumpPad(pos, speed)
-                                # Compute rotation in degrees from vector, atan2 returns radians
-                                import math
-                                angle_rad = math.atan2(vy, vx)
-                                angle_deg = math.degrees(angle_rad)
-                                item.setRotation(angle_deg)
-                            else:
-                                self.statusBar().showMessage(
-                                    f"Warning: Skipping Jump Pad with missing velocity", 3000)
-                                continue
-
-                            self.scene.addItem(item)
-                        except Exception as e:
-                            self.statusBar().showMessage(f"Error loading Jump Pad: {str(e)}", 3000)
+            if map_chunks.is_chunked_map(self.filename):
+                # Only the global data now, the geometry is paged in around the view
+                data = self.chunk_pager.open(self.filename)
+            else:
+                self.chunk_pager.close()
+                data = read_map(self.filename)
+            self.load_map_data(data)
 
             # Set the textures folder to be next to the YAML file
             textures_path = os.path.join(os.path.dirname(self.filename), 'textures')
@@ -982,6 +1275,77 @@ class MapDesigner(QMainWindow):
 
             self.create_actions()
 
+    def load_map_data(self, data):
+        """Replace the scene with the map data, texture paths are resolved against self.filename"""
+        # The journal starts over from the loaded map instead of logging every item
+        # Textures still decoding for the previous map are no longer needed
+        self.texture_loader.cancel()
+        with self.journal.suspended():
+            self.scene.clear()
+            self._add_map_data(data)
+        self._start_journal()
+        self._validated = None
+        self.validation_panel.clear()
+        self._textures_to_prune = set()
+
+        # The geometry is usable right away, textures stream in visible area first
+        visible_rect = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        self.texture_loader.load(
+            self.scene.items(), lambda path: resolve_texture_path(path, self.filename), visible_rect)
+
+        # Scroll room for the whole length of a chunked map
+        self.view.content_rect = self.chunk_pager.bounds() if self.chunk_pager.is_active() else QRectF()
+        if not self.view.content_rect.isEmpty():
+            self.scene.setSceneRect(self.scene.sceneRect().united(self.view.content_rect))
+        self._update_chunks()
+
+    def _update_chunks(self):
+        if self.chunk_pager.is_active():
+            self.chunk_pager.update(self.view.mapToScene(self.view.viewport().rect()).boundingRect())
+
+    def _on_texture_progress(self, done, total):
+        if done < total:
+            self.texture_progress.setMaximum(total)
+            self.texture_progress.setValue(done)
+            self.texture_progress.show()
+            self.statusBar().showMessage(f"Loading textures {done}/{total}")
+        else:
+            self.texture_progress.hide()
+            if total:
+                self.statusBar().showMessage(f"Loaded {total} textures", 3000)
+
+    def _add_map_data(self, data):
+        model = map_model.MapModel.from_dict(data)
+        for warning in model.warnings:
+            print(f"Warning: {warning}")
+        if model.warnings:
+            self.statusBar().showMessage(f"Warning: {model.warnings[0]}", 3000)
+
+        # Handle sky entry
+        if model.sky:
+            sky_path = resolve_texture_path(model.sky, self.filename)
+            if os.path.exists(sky_path):
+                self.set_sky(sky_path)
+
+        # Handle overlay entry
+        if model.overlay:
+            overlay_path = resolve_texture_path(model.overlay, self.filename)
+            if os.path.exists(overlay_path):
+                self.set_overlay(overlay_path)
+
+        # Markers, rectangles, triangles, items and jump pads, in this order
+        for record in model.records():
+            if isinstance(record, map_model.Portal):
+                continue
+            if isinstance(record, map_model.Triangle) and len(record.points) != 3:
+                continue
+            self.scene.addItem(self.ITEM_VIEWS[type(record)].from_record(record))
+
+        # Both sides of a portal share its index as ID
+        for index, portal in enumerate(model.portals):
+            for end in portal.ends(index):
+                self.scene.addItem(MapPortal.from_record(end))
+
 
 # Only include QApplication/main loop if running as main script
 if __name__ == "__main__":
@@ -3,6 +3,9 @@ from PyQt5.QtGui import QColor
 from PyQt5.QtWidgets import QWidget, QFormLayout, QLabel, QDoubleSpinBox, QHBoxLayout, QLineEdit, QPushButton, \
     QFileDialog, QComboBox, QVBoxLayout
 
+from TextureDecoder import TextureDecoder
+from map_records import mark_edited
+
 
 class RectPropertiesPanel(QWidget):
     def __init__(self, parent=None):
@@ -92,10 +95,11 @@ class RectPropertiesPanel(QWidget):
         filename, _ = QFileDialog.getOpenFileName(self, "Select Texture", "", "Image Files (*.png *.jpg *.bmp)")
         if filename:
             self._rect_item.texture_path = filename
-            from PyQt5.QtGui import QPixmap
-            self._rect_item.texture_pixmap = QPixmap(filename)
+            self._rect_item.texture_pixmap = None
+            TextureDecoder.instance().attach(self._rect_item, filename)
             self.texture_edit.setText(filename)
             self._rect_item.update()
+            mark_edited(self._rect_item)
 
     def _on_edit(self, value):
         if self._disable_update or self._rect_item is None:
@@ -127,6 +131,7 @@ class RectPropertiesPanel(QWidget):
         self._on_stype_changed(self.stype_combo.currentText())
 
         self._rect_item.update()
+        mark_edited(self._rect_item)
 
     def _on_stype_changed(self, new_stype):
         if self._rect_item is not None and hasattr(self._rect_item, 'stype'):
@@ -140,6 +145,7 @@ class RectPropertiesPanel(QWidget):
             brush_color = color_map.get(new_stype)
             self._rect_item.setBrush(brush_color)
             self._rect_item.update()
+            mark_edited(self._rect_item)
 
     def set_rect(self, rect_item):
         # Disconnect previous signal if needed
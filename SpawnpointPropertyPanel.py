@@ -45,7 +45,7 @@ class SpawnpointPropertyPanel(QWidget):
         self._spawnpoint.setPos(QPointF(new_x, new_y))
         
         # Emit the spawnpoint changed signal
-        self._spawnpoint.signals.spawnpointChanged.emit(self._spawnpoint)
+        self._spawnpoint.notify_changed()
 
     def set_spawnpoint(self, spawnpoint):
         # Disconnect previous signal if needed
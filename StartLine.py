@@ -4,6 +4,8 @@ from PyQt5.QtCore import Qt, QPointF, pyqtSignal, QObject
 
 from config import GRID_SIZE
 from utils import snap_value
+import map_model
+from map_records import mark_edited
 
 class PlayerSpawnpointSignals(QObject):
     startLineChanged = pyqtSignal(object)
@@ -26,6 +28,20 @@ class StartLine(QGraphicsPixmapItem):
         # Center the pixmap at the position
         #self.setOffset(-pixmap.width() / 2, -pixmap.height() / 2)
         
+    @classmethod
+    def from_record(cls, record):
+        """Create the start line for a map_model.Start"""
+        return cls(QPointF(record.x, record.y))
+
+    def to_record(self):
+        """Describe this start line as a map_model.Start"""
+        return map_model.Start(x=self.pos().x(), y=self.pos().y())
+
+    def notify_changed(self):
+        """Tell the properties panel and the scene, e.g. the journal, that the item was edited"""
+        self.signals.startLineChanged.emit(self)
+        mark_edited(self)
+
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemPositionChange and self.scene():
             grid_size = GRID_SIZE
@@ -42,7 +58,7 @@ class StartLine(QGraphicsPixmapItem):
             return snapped_pos
             
         if change == QGraphicsItem.ItemPositionHasChanged:
-            self.signals.startLineChanged.emit(self)
+            self.notify_changed()
             
         return super().itemChange(change, value)
     
@@ -0,0 +1,43 @@
+import os
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class TextureCache(QObject):
+    """Shared QPixmaps for the textures placed on map items.
+
+    Items using the same file share one decoded pixmap. The pixmaps are
+    decoded on worker threads by TextureDecoder, which adds them with
+    insert(). When a texture file changes on disk, invalidate() drops its
+    pixmap and emits textureChanged so the items using it can fetch the new
+    version.
+    """
+    textureChanged = pyqtSignal(str)
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = TextureCache()
+        return cls._instance
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pixmaps = {}
+
+    @staticmethod
+    def key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def cached(self, path):
+        """The pixmap for path if it was decoded already, else None"""
+        return self._pixmaps.get(self.key(path))
+
+    def insert(self, path, pixmap):
+        """Add a pixmap decoded elsewhere, e.g. by TextureDecoder"""
+        self._pixmaps[self.key(path)] = pixmap
+
+    def invalidate(self, path):
+        key = self.key(path)
+        self._pixmaps.pop(key, None)
+        self.textureChanged.emit(key)
@@ -0,0 +1,118 @@
+import time
+from PyQt5 import sip
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from TextureCache import TextureCache
+
+
+class TextureDecodeSignals(QObject):
+    finished = pyqtSignal(str, QImage, float)
+
+
+class TextureDecodeTask(QRunnable):
+    """Decode one texture file on a worker thread and time it"""
+
+    def __init__(self, path, signals):
+        super().__init__()
+        # The decoder keeps the task until it reports back
+        self.setAutoDelete(False)
+        self.path = path
+        self.signals = signals
+
+    def run(self):
+        start = time.perf_counter()
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+        image = reader.read()
+        self.signals.finished.emit(self.path, image, (time.perf_counter() - start) * 1000)
+
+
+class TextureDecoder(QObject):
+    """Decodes texture files for the whole editor on a shared thread pool.
+
+    request() calls back with the QPixmap of a file, right away when
+    TextureCache has it, otherwise once a worker decoded the QImage; the
+    conversion to QPixmap and all callbacks happen on the GUI thread.
+    Requests for a file that is already being decoded wait for that decode
+    instead of starting another one. Decode times per file are kept in
+    timings for profiling, and printed as they come in when profile is set.
+    """
+    decoded = pyqtSignal(str, QPixmap)
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = TextureDecoder()
+        return cls._instance
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.profile = False
+        self.timings = {}  # cache key -> decode time in ms
+        self._callbacks = {}  # cache key -> [(callback, path as requested)]
+        self._tasks = {}  # cache key -> TextureDecodeTask
+        self._signals = TextureDecodeSignals()
+        self._signals.finished.connect(self._on_finished)
+
+    def set_thread_count(self, count):
+        """Number of decoding threads, 0 for one per core"""
+        self.pool.setMaxThreadCount(count if count > 0 else QThreadPool.globalInstance().maxThreadCount())
+
+    def request(self, path, callback, priority=0):
+        """Call callback(path, pixmap) with the decoded texture at path"""
+        cache = TextureCache.instance()
+        pixmap = cache.cached(path)
+        if pixmap is not None:
+            callback(path, pixmap)
+            return
+
+        key = cache.key(path)
+        if key in self._callbacks:
+            self._callbacks[key].append((callback, path))
+            return
+        self._callbacks[key] = [(callback, path)]
+        task = TextureDecodeTask(path, self._signals)
+        self._tasks[key] = task
+        self.pool.start(task, priority)
+
+    def cancel(self, path, callback):
+        """Withdraw a request, the decode is dropped if nobody else waits for it"""
+        key = TextureCache.key(path)
+        callbacks = self._callbacks.get(key)
+        if not callbacks or (callback, path) not in callbacks:
+            return
+        callbacks.remove((callback, path))
+        if not callbacks and self.pool.tryTake(self._tasks[key]):
+            del self._callbacks[key]
+            del self._tasks[key]
+
+    def attach(self, item, path, texture_path=None):
+        """Give item the pixmap of path, unless its texture_path changed meanwhile"""
+        expected = texture_path if texture_path is not None else path
+
+        def set_pixmap(_, pixmap):
+            if sip.isdeleted(item) or getattr(item, "texture_path", None) != expected:
+                return
+            item.texture_pixmap = pixmap
+            item.update()
+
+        self.request(path, set_pixmap)
+
+    def _on_finished(self, path, image, ms):
+        cache = TextureCache.instance()
+        key = cache.key(path)
+        self._tasks.pop(key, None)
+        self.timings[key] = ms
+        if self.profile:
+            print(f"Decoded {path} in {ms:.1f} ms")
+
+        pixmap = QPixmap.fromImage(image)
+        if not pixmap.isNull():
+            cache.insert(path, pixmap)
+        for callback, requested_path in self._callbacks.pop(key, []):
+            callback(requested_path, pixmap)
+        self.decoded.emit(path, pixmap)
@@ -0,0 +1,71 @@
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, QRectF, pyqtSignal
+
+from TextureDecoder import TextureDecoder
+
+
+class TextureLoader(QObject):
+    """Attaches textures to map items after the geometry is already in the scene.
+
+    load() groups the items by texture file and requests every file once
+    from the TextureDecoder, handing the pixmap to all items using it as
+    soon as it is ready. Files used by items in the visible area are decoded
+    first. Items keep their flat colour until then. cancel() withdraws all
+    outstanding requests, e.g. when another map is opened.
+    """
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.decoder = TextureDecoder.instance()
+        self._pending = {}  # path -> [(item, texture_path)]
+        self._total = 0
+
+    def is_loading(self):
+        return bool(self._pending)
+
+    def load(self, items, resolve, visible_rect=QRectF()):
+        """Load the textures of items, resolve maps an item's texture_path to a file"""
+        self.cancel()
+        visible = set()
+
+        for item in items:
+            texture_path = getattr(item, "texture_path", None)
+            if not texture_path:
+                continue
+            path = resolve(texture_path)
+            self._pending.setdefault(path, []).append((item, texture_path))
+            if visible_rect.isValid() and item.sceneBoundingRect().intersects(visible_rect):
+                visible.add(path)
+
+        self._total = len(self._pending)
+        self.progress.emit(0, self._total)
+        if not self._pending:
+            self.finished.emit()
+            return
+
+        # Textures decoded before, e.g. shared with the previous map, are
+        # attached during request()
+        for path in list(self._pending):
+            self.decoder.request(path, self._on_decoded, 1 if path in visible else 0)
+
+    def cancel(self):
+        pending, self._pending = self._pending, {}
+        for path in pending:
+            self.decoder.cancel(path, self._on_decoded)
+
+    def _on_decoded(self, path, pixmap):
+        users = self._pending.pop(path, None)
+        if users is None:
+            return
+        for item, texture_path in users:
+            # Skip items deleted or retextured while the file was decoding
+            if sip.isdeleted(item) or item.scene() is None or getattr(item, "texture_path", None) != texture_path:
+                continue
+            item.texture_pixmap = pixmap
+            item.update()
+
+        self.progress.emit(self._total - len(self._pending), self._total)
+        if not self._pending:
+            self.finished.emit()
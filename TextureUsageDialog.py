@@ -0,0 +1,122 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTreeWidget,
+                             QTreeWidgetItem, QDialogButtonBox)
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor
+
+from utils import format_bytes
+
+
+class _UsageRow(QTreeWidgetItem):
+    """Row that sorts the number and size columns by value instead of text"""
+
+    def __init__(self, texts, keys):
+        super().__init__(texts)
+        self.keys = keys
+
+    def __lt__(self, other):
+        column = self.treeWidget().sortColumn()
+        return self.keys[column] < other.keys[column]
+
+
+class TextureUsageDialog(QDialog):
+    """References, size and resolution of every texture of the project"""
+
+    pruneRequested = pyqtSignal(list)
+    downscaleRequested = pyqtSignal(list)
+    refreshRequested = pyqtSignal()
+
+    COLUMNS = ["Texture", "References", "Used by", "Resolution", "On disk", "Decoded", "Largest scale"]
+
+    UNUSED_COLOR = QColor(150, 150, 150)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Texture Usage")
+        self.resize(800, 500)
+        self._usages = []
+
+        self.summary_label = QLabel()
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(self.COLUMNS)
+        self.tree.setRootIsDecorated(False)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setSortingEnabled(True)
+
+        self.prune_button = QPushButton("Prune Unused")
+        self.prune_button.setToolTip("Delete the textures no shape, sky or overlay uses, other maps in the folder "
+                                     "included, when the map is saved")
+        self.prune_button.clicked.connect(self._on_prune)
+        self.downscale_button = QPushButton("Downscale")
+        self.downscale_button.setToolTip("Use smaller copies of the textures only drawn much smaller than their size")
+        self.downscale_button.clicked.connect(self._on_downscale)
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refreshRequested)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        buttons.rejected.connect(self.reject)
+
+        actions = QHBoxLayout()
+        actions.addWidget(self.prune_button)
+        actions.addWidget(self.downscale_button)
+        actions.addWidget(refresh_button)
+        actions.addStretch(1)
+        actions.addWidget(buttons)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.tree)
+        layout.addLayout(actions)
+
+    def show_usages(self, usages):
+        self._usages = usages
+        unused = [usage for usage in usages if usage.unused]
+        oversized = [usage for usage in usages if usage.downscale_factor > 1]
+
+        self.summary_label.setText(
+            f"{len(usages)} textures, {format_bytes(sum(u.file_size for u in usages))} on disk, "
+            f"{format_bytes(sum(u.decoded_size for u in usages if not u.unused))} decoded when in use. "
+            f"{len(unused)} unused ({format_bytes(sum(u.file_size for u in unused))}), "
+            f"{len(oversized)} drawn much smaller than their size.")
+        self.prune_button.setText(f"Prune Unused ({len(unused)})")
+        self.prune_button.setEnabled(bool(unused))
+        self.downscale_button.setText(f"Downscale ({len(oversized)})")
+        self.downscale_button.setEnabled(bool(oversized))
+
+        self.tree.setSortingEnabled(False)
+        self.tree.clear()
+        rows = []
+        for usage in usages:
+            users = []
+            if usage.shapes:
+                users.append(f"{usage.shapes} shapes")
+            if usage.sky:
+                users.append("sky")
+            if usage.overlay:
+                users.append("parallax_1")
+            resolution = f"{usage.width} x {usage.height}"
+            factor = usage.downscale_factor
+            if factor > 1:
+                resolution += f" (1/{factor} is enough)"
+            scale = "" if usage.max_scale is None else f"{usage.max_scale:g}"
+            row = _UsageRow(
+                [usage.name, str(usage.references), ", ".join(users) or "unused", resolution,
+                 format_bytes(usage.file_size), format_bytes(usage.decoded_size), scale],
+                [usage.name.lower(), usage.references, usage.shapes, usage.width * usage.height,
+                 usage.file_size, usage.decoded_size, -1 if usage.max_scale is None else usage.max_scale])
+            if usage.unused:
+                for column in range(len(self.COLUMNS)):
+                    row.setForeground(column, QBrush(self.UNUSED_COLOR))
+            row.setData(0, Qt.UserRole, usage.path)
+            rows.append(row)
+        self.tree.addTopLevelItems(rows)
+        self.tree.setSortingEnabled(True)
+        self.tree.sortByColumn(5, Qt.DescendingOrder)
+        for column in range(len(self.COLUMNS)):
+            self.tree.resizeColumnToContents(column)
+
+    def _on_prune(self):
+        self.pruneRequested.emit([usage for usage in self._usages if usage.unused])
+
+    def _on_downscale(self):
+        self.downscaleRequested.emit([usage for usage in self._usages if usage.downscale_factor > 1])
@@ -1,15 +1,18 @@
 import os
 import shutil
 from PyQt5.QtWidgets import QFileDialog, QWidget, QVBoxLayout, QPushButton, QListWidget, QListWidgetItem, QMessageBox
-from PyQt5.QtGui import QPixmap, QIcon
-from PyQt5.QtCore import Qt, QSize, QSettings, pyqtSignal
+from PyQt5.QtGui import QPixmap, QIcon, QColor
+from PyQt5.QtCore import Qt, QSize, QSettings, QFileSystemWatcher, QTimer, pyqtSignal
 from DraggableListWidget import DraggableListWidget
+from ThumbnailLoader import ThumbnailLoader, THUMBNAIL_SIZE
+from ThumbnailCache import ThumbnailCache
 
 
 class TexturesPanel(QWidget):
     setSkyRequested = pyqtSignal(str)
     setOverlayRequested = pyqtSignal(str)
     textureRemoveRequested = pyqtSignal(str)
+    textureModified = pyqtSignal(str)
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -33,8 +36,8 @@ class TexturesPanel(QWidget):
         # Connect the textureRemoveRequested signal from the list widget to our own signal
         self.list_widget.textureRemoveRequested.connect(self.textureRemoveRequested.emit)
         
-        # Connect the textureAdded signal to reload the textures folder
-        self.list_widget.textureAdded.connect(self.load_textures_folder)
+        # Connect the textureAdded signal to pick up the new files
+        self.list_widget.textureAdded.connect(self.refresh_textures_folder)
         
         layout.addWidget(self.list_widget)
         layout.addWidget(self.add_texture_btn)
@@ -43,12 +46,30 @@ class TexturesPanel(QWidget):
         # Default textures folder (will be updated when project is loaded/saved)
         self.textures_folder = None
         self.project_saved = False
+
+        # Thumbnails are decoded in the background, items show a placeholder until then
+        self._items_by_path = {}
+        self._file_stats = {}  # path -> (size, mtime) of the listed files
+        self._placeholder_icon = self._create_placeholder_icon()
+        self.thumbnail_loader = ThumbnailLoader(ThumbnailCache(), self)
+        self.thumbnail_loader.thumbnailReady.connect(self._on_thumbnail_ready)
+
+        # Watch the folder so files changed by other programs show up.
+        # Changes are collected briefly since editors often write in several steps.
+        self.watcher = QFileSystemWatcher(self)
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(200)
+        self._refresh_timer.timeout.connect(self.refresh_textures_folder)
+        self.watcher.directoryChanged.connect(self._refresh_timer.start)
+        self.watcher.fileChanged.connect(self._refresh_timer.start)
         
         # Disable add button initially since no project is saved
         self.add_texture_btn.setEnabled(False)
 
     def set_textures_folder(self, folder_path, project_saved=True):
         """Set the textures folder path and update UI state"""
+        folder_changed = folder_path != self.textures_folder
         self.textures_folder = folder_path
         self.project_saved = project_saved
         
@@ -64,26 +85,105 @@ class TexturesPanel(QWidget):
             # Always enable drag and drop
             self.list_widget.setAcceptDrops(True)
         
-        # Load textures from the folder
-        self.load_textures_folder()
+        # Load textures from the folder, or only apply changes if it is the same one
+        if folder_changed:
+            self.load_textures_folder()
+        else:
+            self.refresh_textures_folder()
     
     def load_textures_folder(self):
         """Load all textures from the textures folder"""
+        self.thumbnail_loader.cancel()
+        self._items_by_path = {}
+        self._file_stats = {}
         self.list_widget.clear()
-        
-        if not self.textures_folder or not os.path.isdir(self.textures_folder):
+
+        if self.watcher.files() or self.watcher.directories():
+            self.watcher.removePaths(self.watcher.files() + self.watcher.directories())
+        if self.textures_folder and os.path.isdir(self.textures_folder):
+            self.watcher.addPath(self.textures_folder)
+
+        self.refresh_textures_folder()
+
+    def refresh_textures_folder(self):
+        """Apply files added, removed or modified in the textures folder to the list"""
+        current = {}
+        if self.textures_folder and os.path.isdir(self.textures_folder):
+            if self.textures_folder not in self.watcher.directories():
+                self.watcher.addPath(self.textures_folder)
+            for file in os.listdir(self.textures_folder):
+                if file.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".gif")):
+                    path = os.path.join(self.textures_folder, file)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    current[path] = (stat.st_size, stat.st_mtime_ns)
+
+        for path in list(self._file_stats):
+            if path not in current:
+                self._remove_texture_item(path)
+
+        for path, stat in current.items():
+            old_stat = self._file_stats.get(path)
+            if old_stat is None:
+                self._add_texture_item(path)
+            elif old_stat != stat:
+                self._update_texture_item(path)
+
+        self._file_stats = current
+
+    def _add_texture_item(self, path):
+        item = QListWidgetItem(os.path.basename(path))
+        item.setData(Qt.UserRole, path)
+        self.list_widget.addItem(item)
+        self._items_by_path[path] = item
+        self._watch_file(path)
+
+        thumb = self.thumbnail_loader.cached(path)
+        if not thumb.isNull():
+            item.setIcon(QIcon(QPixmap.fromImage(thumb)))
+        else:
+            item.setIcon(self._placeholder_icon)
+            self.thumbnail_loader.request(path)
+
+    def _remove_texture_item(self, path):
+        item = self._items_by_path.pop(path, None)
+        if item is not None:
+            self.list_widget.takeItem(self.list_widget.row(item))
+        if path in self.watcher.files():
+            self.watcher.removePath(path)
+
+    def _update_texture_item(self, path):
+        if path not in self._items_by_path:
+            # Was not readable before, maybe it is now
+            self._add_texture_item(path)
+        else:
+            # Saving by replacing the file drops it from the watcher
+            self._watch_file(path)
+            self.thumbnail_loader.request(path)
+        self.textureModified.emit(path)
+
+    def _watch_file(self, path):
+        if path not in self.watcher.files():
+            self.watcher.addPath(path)
+
+    def _create_placeholder_icon(self):
+        pixmap = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        pixmap.fill(QColor(200, 200, 200))
+        return QIcon(pixmap)
+
+    def _on_thumbnail_ready(self, path, image):
+        item = self._items_by_path.get(path)
+        if item is None:
             return
-            
-        for file in os.listdir(self.textures_folder):
-            if file.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".gif")):
-                path = os.path.join(self.textures_folder, file)
-                pixmap = QPixmap(path)
-                if not pixmap.isNull():
-                    thumb = pixmap.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    item = QListWidgetItem(QIcon(thumb), os.path.basename(path))
-                    item.setData(Qt.UserRole, path)
-                    self.list_widget.addItem(item)
-    
+        if image.isNull():
+            # Not a readable image, don't offer it as a texture
+            del self._items_by_path[path]
+            self.list_widget.takeItem(self.list_widget.row(item))
+            return
+        item.setIcon(QIcon(QPixmap.fromImage(image)))
+
     def add_texture(self):
         """Open file dialog to select and add textures to the textures folder"""
         # Only allow adding textures if textures folder exists
@@ -111,6 +211,6 @@ class TexturesPanel(QWidget):
                     dest_path = os.path.join(self.textures_folder, os.path.basename(file_path))
                     shutil.copy2(file_path, dest_path)
             
-            # Reload the textures folder to show the new files
-            self.load_textures_folder()
+            # Show the new files
+            self.refresh_textures_folder()
 
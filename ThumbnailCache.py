@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import threading
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import QStandardPaths
+
+from texture_store import file_digest
+
+
+class ThumbnailCache:
+    """Per-user on-disk cache of texture thumbnails.
+
+    Thumbnails are stored as PNG files named after the content hash, size and
+    mtime of their source image, so a texture copied into another project
+    reuses the thumbnail while an edited texture gets a new one. The index
+    remembers the hash of every source path for its current size and mtime,
+    which lets lookup() find a thumbnail with a single stat() instead of
+    reading the file. Entries are evicted least recently used first once the
+    cache grows beyond max_bytes.
+
+    The cache is used from the thumbnail worker threads, all index access is
+    guarded by a lock.
+    """
+
+    DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        if directory is None:
+            base = QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation)
+            directory = os.path.join(base, "Racesow", "MapDesigner", "thumbnails")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        # key -> {"bytes": size of the thumbnail file, "used": last access time}
+        self._entries = {}
+        # source path -> [size, mtime_ns, digest]
+        self._sources = {}
+        self._load_index()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+            self._entries = index.get("entries", {})
+            self._sources = index.get("sources", {})
+        except (OSError, ValueError):
+            self._entries = {}
+            self._sources = {}
+
+    def save(self):
+        """Write the index to disk if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            index = {"entries": dict(self._entries), "sources": dict(self._sources)}
+            self._dirty = False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Error writing thumbnail cache index: {e}")
+
+    def _key(self, path, hash_contents):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            source = self._sources.get(path)
+        if source and source[0] == stat.st_size and source[1] == stat.st_mtime_ns:
+            digest = source[2]
+        elif hash_contents:
+            try:
+                digest = file_digest(path)
+            except OSError:
+                return None
+            with self._lock:
+                self._sources[path] = [stat.st_size, stat.st_mtime_ns, digest]
+                self._dirty = True
+        else:
+            return None
+        return f"{digest}-{stat.st_size}-{stat.st_mtime_ns}"
+
+    def _file_for(self, key):
+        return os.path.join(self.directory, key + ".png")
+
+    def lookup(self, path, hash_contents=False):
+        """Return the cached thumbnail for path or a null QImage.
+
+        Without hash_contents only sources already in the index are found,
+        which keeps the lookup cheap enough for the GUI thread.
+        """
+        key = self._key(path, hash_contents)
+        if key is None:
+            return QImage()
+        with self._lock:
+            if key not in self._entries:
+                return QImage()
+        image = QImage(self._file_for(key))
+        with self._lock:
+            if image.isNull():
+                self._entries.pop(key, None)
+            elif key in self._entries:
+                self._entries[key]["used"] = time.time()
+            self._dirty = True
+        return image
+
+    def store(self, path, image):
+        """Add the thumbnail of path to the cache"""
+        key = self._key(path, True)
+        if key is None or image.isNull():
+            return
+        thumb_path = self._file_for(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = thumb_path + f".{threading.get_ident()}.tmp"
+            if not image.save(tmp_path, "PNG"):
+                return
+            os.replace(tmp_path, thumb_path)
+            size = os.path.getsize(thumb_path)
+        except OSError as e:
+            print(f"Error writing thumbnail cache entry: {e}")
+            return
+
+        with self._lock:
+            self._entries[key] = {"bytes": size, "used": time.time()}
+            self._dirty = True
+            self._evict()
+
+    def _evict(self):
+        total = sum(entry["bytes"] for entry in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self._entries.pop(key)["bytes"]
+            try:
+                os.remove(self._file_for(key))
+            except OSError:
+                pass
+        # Drop source hashes whose thumbnails are gone so the index stays bounded
+        live = {key.split("-", 1)[0] for key in self._entries}
+        self._sources = {p: s for p, s in self._sources.items() if s[2] in live}
@@ -0,0 +1,126 @@
+from PyQt5.QtGui import QImage, QImageReader
+from PyQt5.QtCore import Qt, QObject, QRunnable, QTimer, QCoreApplication, pyqtSignal
+
+from TextureDecoder import TextureDecoder
+
+THUMBNAIL_SIZE = 64
+
+# The cache index is saved this long after the last hit in cached()
+INDEX_SAVE_DELAY_MS = 5000
+
+
+class ThumbnailSignals(QObject):
+    finished = pyqtSignal(int, str, int, QImage)
+
+
+class ThumbnailTask(QRunnable):
+    """Decode one texture straight at thumbnail size on a worker thread"""
+
+    def __init__(self, number, path, generation, signals, cache=None):
+        super().__init__()
+        # The loader keeps queued tasks so it can take them back on cancel()
+        self.setAutoDelete(False)
+        self.number = number
+        self.path = path
+        self.generation = generation
+        self.signals = signals
+        self.cache = cache
+
+    def run(self):
+        # Same content under another name or project, no need to decode again
+        if self.cache is not None:
+            image = self.cache.lookup(self.path, hash_contents=True)
+            if not image.isNull():
+                self.signals.finished.emit(self.number, self.path, self.generation, image)
+                return
+
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+
+        # Let the image plugin decode at the target size instead of scaling a full-size image
+        size = reader.size()
+        if size.isValid() and not size.isEmpty():
+            size.scale(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio)
+            reader.setScaledSize(size)
+
+        image = reader.read()
+        if self.cache is not None and not image.isNull():
+            self.cache.store(self.path, image)
+        self.signals.finished.emit(self.number, self.path, self.generation, image)
+
+
+class ThumbnailLoader(QObject):
+    """Produces texture thumbnails in a worker pool.
+
+    QImage is safe to use off the GUI thread, so the workers only decode and
+    thumbnailReady delivers the images back on the GUI thread. Calling cancel()
+    drops queued work and ignores results of requests made before it.
+
+    With a ThumbnailCache, cached thumbnails are returned by cached() right
+    away and new ones are written to the cache; its index is saved whenever
+    the pool runs out of work. Hits in cached() only update the recency in
+    the index, which is then saved a little later and when the application
+    quits, so thumbnails in use are not the first to be evicted. The workers
+    are those of the shared TextureDecoder pool.
+    """
+    thumbnailReady = pyqtSignal(str, QImage)
+
+    def __init__(self, cache=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.pool = TextureDecoder.instance().pool
+        # Task number -> task not reported back yet. The same path can be
+        # requested again while a task for it is queued or running, e.g. when
+        # the file changes, so the tasks are told apart by a number of their own.
+        self._tasks = {}
+        self._next_task = 0
+        self._generation = 0
+        self._outstanding = 0
+        self._signals = ThumbnailSignals()
+        self._signals.finished.connect(self._on_finished)
+
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(INDEX_SAVE_DELAY_MS)
+        self._save_timer.timeout.connect(self._save_cache)
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self._save_cache)
+
+    def cached(self, path):
+        """Thumbnail for path if the cache already knows it, else a null QImage"""
+        if self.cache is None:
+            return QImage()
+        image = self.cache.lookup(path)
+        if not image.isNull():
+            # A batch of hits is saved once
+            self._save_timer.start()
+        return image
+
+    def _save_cache(self):
+        if self.cache is not None:
+            self.cache.save()
+
+    def request(self, path):
+        self._outstanding += 1
+        self._next_task += 1
+        task = ThumbnailTask(self._next_task, path, self._generation, self._signals, self.cache)
+        self._tasks[task.number] = task
+        self.pool.start(task)
+
+    def cancel(self):
+        self._generation += 1
+        # Take back the tasks not started yet, the pool is shared with other work
+        for number, task in list(self._tasks.items()):
+            if self.pool.tryTake(task):
+                del self._tasks[number]
+                self._outstanding = max(0, self._outstanding - 1)
+
+    def _on_finished(self, number, path, generation, image):
+        self._tasks.pop(number, None)
+        self._outstanding = max(0, self._outstanding - 1)
+        if self._outstanding == 0 and self.cache is not None:
+            self.cache.save()
+        if generation != self._generation:
+            return
+        self.thumbnailReady.emit(path, image)
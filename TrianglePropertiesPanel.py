@@ -2,6 +2,9 @@ from PyQt5.QtWidgets import QWidget, QFormLayout, QLabel, QDoubleSpinBox, QHBoxL
 from PyQt5.QtGui import QPixmap, QColor, QPolygonF
 from PyQt5.QtCore import QPointF
 
+from TextureDecoder import TextureDecoder
+from map_records import mark_edited
+
 class TrianglePropertiesPanel(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -80,9 +83,11 @@ class TrianglePropertiesPanel(QWidget):
         filename, _ = QFileDialog.getOpenFileName(self, "Select Texture", "", "Image Files (*.png *.jpg *.bmp)")
         if filename:
             self._tri_item.texture_path = filename
-            self._tri_item.texture_pixmap = QPixmap(filename)
+            self._tri_item.texture_pixmap = None
+            TextureDecoder.instance().attach(self._tri_item, filename)
             self.texture_edit.setText(filename)
             self._tri_item.update()
+            mark_edited(self._tri_item)
 
     def _on_stype_changed(self, new_stype):
         if self._tri_item is not None and hasattr(self._tri_item, 'stype'):
@@ -93,6 +98,7 @@ class TrianglePropertiesPanel(QWidget):
             brush_color = color_map.get(new_stype)
             self._tri_item.setBrush(brush_color)
             self._tri_item.update()
+            mark_edited(self._tri_item)
 
     def _on_edit(self, value):
         if self._disable_update or self._tri_item is None:
@@ -112,6 +118,7 @@ class TrianglePropertiesPanel(QWidget):
         self._tri_item.texture_offset_y = self.offset_y_spin.value()
         self._on_stype_changed(self.stype_combo.currentText())
         self._tri_item.update()
+        mark_edited(self._tri_item)
 
     def set_triangle(self, tri_item):
         if self._tri_item and self._tri_item != tri_item:
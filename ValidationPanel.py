@@ -0,0 +1,78 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTreeWidget, QTreeWidgetItem
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor
+
+import map_validation
+
+
+class ValidationPanel(QWidget):
+    """Findings of the last validation, clicking one selects the items it is about"""
+
+    findingActivated = pyqtSignal(object)
+    validateRequested = pyqtSignal()
+
+    # More rows than anyone reads make the list slow to fill
+    MAX_ROWS = 5000
+
+    COLORS = {
+        map_validation.ERROR: QColor(200, 40, 40),
+        map_validation.WARNING: QColor(190, 130, 0),
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._findings = []
+
+        self.summary_label = QLabel("Not validated yet")
+        validate_button = QPushButton("Validate")
+        validate_button.clicked.connect(self.validateRequested)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Severity", "Check", "Problem", "Entries"])
+        self.tree.setRootIsDecorated(False)
+        self.tree.setUniformRowHeights(True)
+        self.tree.itemClicked.connect(self._on_item_clicked)
+        self.tree.itemActivated.connect(self._on_item_clicked)
+
+        header = QHBoxLayout()
+        header.addWidget(self.summary_label, 1)
+        header.addWidget(validate_button)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(header)
+        layout.addWidget(self.tree)
+
+    def show_findings(self, findings, ms):
+        self._findings = findings
+        errors = sum(1 for finding in findings if finding.severity == map_validation.ERROR)
+        warnings = len(findings) - errors
+        if findings:
+            self.summary_label.setText(f"{errors} errors, {warnings} warnings ({ms:.0f} ms)")
+        else:
+            self.summary_label.setText(f"No problems found ({ms:.0f} ms)")
+
+        self.tree.setUpdatesEnabled(False)
+        self.tree.clear()
+        rows = []
+        for row, finding in enumerate(findings[:self.MAX_ROWS]):
+            item = QTreeWidgetItem([finding.severity.capitalize(), finding.check, finding.message,
+                                    str(len(finding.entries)) if finding.entries else ""])
+            item.setForeground(0, QBrush(self.COLORS[finding.severity]))
+            item.setData(0, Qt.UserRole, row)
+            rows.append(item)
+        if len(findings) > self.MAX_ROWS:
+            rows.append(QTreeWidgetItem(["", "", f"... and {len(findings) - self.MAX_ROWS} more", ""]))
+        self.tree.addTopLevelItems(rows)
+        for column in (0, 1, 3):
+            self.tree.resizeColumnToContents(column)
+        self.tree.setUpdatesEnabled(True)
+
+    def clear(self):
+        self._findings = []
+        self.tree.clear()
+        self.summary_label.setText("Not validated yet")
+
+    def _on_item_clicked(self, item, column=0):
+        row = item.data(0, Qt.UserRole)
+        if row is not None:
+            self.findingActivated.emit(self._findings[row])
@@ -0,0 +1,246 @@
+import os
+from PyQt5.QtGui import QImage, QImageReader, QPainter
+from PyQt5.QtCore import Qt, QRect
+
+from utils import resolve_texture_path
+
+DEFAULT_ATLAS_SIZE = 2048
+DEFAULT_PADDING = 2
+
+
+class MaxRectsPacker:
+    """Packs rectangles into a fixed size page with the MaxRects algorithm.
+
+    The page keeps a list of maximal free rectangles. Each insert picks the
+    free rectangle where the new one fits with the smallest leftover on its
+    shorter side (best short side fit), then splits every free rectangle it
+    overlaps and drops free rectangles contained in others.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free = [(0, 0, width, height)]
+
+    def insert(self, w, h):
+        """Place a w x h rectangle and return its (x, y), or None if it does not fit"""
+        best = None
+        best_score = None
+        for fx, fy, fw, fh in self.free:
+            if w <= fw and h <= fh:
+                score = (min(fw - w, fh - h), max(fw - w, fh - h))
+                if best_score is None or score < best_score:
+                    best = (fx, fy)
+                    best_score = score
+        if best is None:
+            return None
+
+        placed = (best[0], best[1], w, h)
+        free = []
+        for rect in self.free:
+            free.extend(self._split(rect, placed))
+        self.free = self._prune(free)
+        return best
+
+    @staticmethod
+    def _split(free, used):
+        fx, fy, fw, fh = free
+        ux, uy, uw, uh = used
+        if ux >= fx + fw or ux + uw <= fx or uy >= fy + fh or uy + uh <= fy:
+            return [free]
+        parts = []
+        if ux > fx:
+            parts.append((fx, fy, ux - fx, fh))
+        if ux + uw < fx + fw:
+            parts.append((ux + uw, fy, fx + fw - ux - uw, fh))
+        if uy > fy:
+            parts.append((fx, fy, fw, uy - fy))
+        if uy + uh < fy + fh:
+            parts.append((fx, uy + uh, fw, fy + fh - uy - uh))
+        return parts
+
+    @staticmethod
+    def _prune(rects):
+        def contains(a, b):
+            return (a[0] <= b[0] and a[1] <= b[1]
+                    and a[0] + a[2] >= b[0] + b[2] and a[1] + a[3] >= b[1] + b[3])
+
+        rects = list(set(rects))
+        # Largest first, so a rectangle only has to be checked against the ones kept before it
+        rects.sort(key=lambda r: r[2] * r[3], reverse=True)
+        kept = []
+        for rect in rects:
+            if not any(contains(other, rect) for other in kept):
+                kept.append(rect)
+        return kept
+
+
+def pack_textures(sizes, max_size=DEFAULT_ATLAS_SIZE, padding=DEFAULT_PADDING):
+    """Pack textures into as few pages as needed.
+
+    sizes maps a key to (width, height). Returns (pages, skipped) where pages
+    is a list of {key: (x, y, w, h)} and skipped lists the keys too large for
+    a page. Every texture gets padding pixels of room on each side.
+    """
+    pages = []
+    packers = []
+    skipped = []
+
+    # Tallest first, then widest, packs noticeably tighter than insertion order
+    order = sorted(sizes, key=lambda k: (sizes[k][1], sizes[k][0]), reverse=True)
+    for key in order:
+        w, h = sizes[key]
+        pw, ph = w + 2 * padding, h + 2 * padding
+        if pw > max_size or ph > max_size:
+            skipped.append(key)
+            continue
+
+        for packer, page in zip(packers, pages):
+            pos = packer.insert(pw, ph)
+            if pos is not None:
+                break
+        else:
+            packer = MaxRectsPacker(max_size, max_size)
+            page = {}
+            packers.append(packer)
+            pages.append(page)
+            pos = packer.insert(pw, ph)
+
+        page[key] = (pos[0] + padding, pos[1] + padding, w, h)
+
+    return pages, skipped
+
+
+def _is_tiled(shape, bounds, texture_size):
+    """True if the texture repeats across the shape with its current scale and offset.
+
+    bounds is (width, height) of the shape's bounding rect. Rotated textures
+    are treated as tiled since the sampled region is no longer axis aligned.
+    """
+    if shape.get("texture_rotation", 0.0) % 360:
+        return True
+    scale = shape.get("texture_scale", 1.0) or 1.0
+    u0 = -shape.get("texture_offset_x", 0.0) / scale
+    v0 = -shape.get("texture_offset_y", 0.0) / scale
+    u1 = u0 + bounds[0] / scale
+    v1 = v0 + bounds[1] / scale
+    # Allow a fraction of a pixel for rounding in the editor
+    eps = 0.5
+    return u0 < -eps or v0 < -eps or u1 > texture_size[0] + eps or v1 > texture_size[1] + eps
+
+
+def _shape_bounds(kind, shape):
+    if kind == "rectangles":
+        return shape["w"], shape["h"]
+    xs = [p["x"] for p in shape["points"]]
+    ys = [p["y"] for p in shape["points"]]
+    return max(xs) - min(xs), max(ys) - min(ys)
+
+
+def _extrude(painter, image, x, y, padding):
+    """Draw image at (x, y) and repeat its border pixels into the padding to avoid bleeding"""
+    w, h = image.width(), image.height()
+    painter.drawImage(x, y, image)
+    if padding <= 0:
+        return
+    painter.drawImage(QRect(x - padding, y, padding, h), image, QRect(0, 0, 1, h))
+    painter.drawImage(QRect(x + w, y, padding, h), image, QRect(w - 1, 0, 1, h))
+    painter.drawImage(QRect(x, y - padding, w, padding), image, QRect(0, 0, w, 1))
+    painter.drawImage(QRect(x, y + h, w, padding), image, QRect(0, h - 1, w, 1))
+    painter.drawImage(QRect(x - padding, y - padding, padding, padding), image, QRect(0, 0, 1, 1))
+    painter.drawImage(QRect(x + w, y - padding, padding, padding), image, QRect(w - 1, 0, 1, 1))
+    painter.drawImage(QRect(x - padding, y + h, padding, padding), image, QRect(0, h - 1, 1, 1))
+    painter.drawImage(QRect(x + w, y + h, padding, padding), image, QRect(w - 1, h - 1, 1, 1))
+
+
+def build_atlases(data, map_path, max_size=DEFAULT_ATLAS_SIZE, padding=DEFAULT_PADDING,
+                  exclude_tiled=True, exclude=()):
+    """Pack the textures of the map's rectangles and triangles into atlas pages.
+
+    data is the map dict as written to YAML and map_path the YAML file it is
+    exported to; texture paths are resolved against it and the pages are
+    written to textures/atlas_<n>.png next to it. Each shape whose texture
+    went into an atlas keeps its texture entry and gets texture_atlas, the
+    page path, and texture_uv, [u0, v0, u1, v1] normalized to the page.
+
+    Textures that repeat across a shape are left out when exclude_tiled is
+    set, as are the texture paths listed in exclude. Returns a report dict.
+    """
+    shapes = [(kind, shape) for kind in ("rectangles", "triangles") for shape in data.get(kind, [])
+              if shape.get("texture")]
+
+    sizes = {}
+    missing = set()
+    for _, shape in shapes:
+        texture = shape["texture"]
+        if texture in sizes or texture in missing:
+            continue
+        size = QImageReader(resolve_texture_path(texture, map_path)).size()
+        if size.isValid() and not size.isEmpty():
+            sizes[texture] = (size.width(), size.height())
+        else:
+            missing.add(texture)
+
+    excluded = set(exclude) & set(sizes)
+    if exclude_tiled:
+        for kind, shape in shapes:
+            texture = shape["texture"]
+            if texture in sizes and _is_tiled(shape, _shape_bounds(kind, shape), sizes[texture]):
+                excluded.add(texture)
+
+    candidates = {texture: size for texture, size in sizes.items() if texture not in excluded}
+    pages, skipped = pack_textures(candidates, max_size, padding)
+
+    base_dir = os.path.dirname(map_path)
+    textures_dir = os.path.join(base_dir, "textures")
+    os.makedirs(textures_dir, exist_ok=True)
+
+    placements = {}  # texture -> (relative page path, page size, rect)
+    page_files = []
+    for n, page in enumerate(pages):
+        # Crop the page to what was used, rounded up to a power of two for older GPUs
+        used_w = max(x + w + padding for x, y, w, h in page.values())
+        used_h = max(y + h + padding for x, y, w, h in page.values())
+        page_w = min(max_size, 1 << (used_w - 1).bit_length())
+        page_h = min(max_size, 1 << (used_h - 1).bit_length())
+
+        image = QImage(page_w, page_h, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        for texture, (x, y, w, h) in page.items():
+            source = QImage(resolve_texture_path(texture, map_path))
+            if source.size().width() != w or source.size().height() != h:
+                source = source.scaled(w, h)
+            _extrude(painter, source.convertToFormat(QImage.Format_ARGB32_Premultiplied), x, y, padding)
+        painter.end()
+
+        page_path = os.path.join(textures_dir, f"atlas_{n}.png")
+        if not image.save(page_path, "PNG"):
+            raise OSError(f"Could not write texture atlas {page_path}")
+        relative = os.path.relpath(page_path, base_dir)
+        page_files.append(relative)
+        for texture, rect in page.items():
+            placements[texture] = (relative, (page_w, page_h), rect)
+
+    # Drop pages left over from an earlier export with more of them
+    n = len(pages)
+    while os.path.exists(os.path.join(textures_dir, f"atlas_{n}.png")):
+        os.remove(os.path.join(textures_dir, f"atlas_{n}.png"))
+        n += 1
+
+    for _, shape in shapes:
+        placement = placements.get(shape["texture"])
+        if placement is None:
+            continue
+        relative, (page_w, page_h), (x, y, w, h) = placement
+        shape["texture_atlas"] = relative
+        shape["texture_uv"] = [x / page_w, y / page_h, (x + w) / page_w, (y + h) / page_h]
+
+    return {
+        "pages": page_files,
+        "packed": sorted(placements),
+        "excluded": sorted(excluded),
+        "too_large": sorted(skipped),
+        "missing": sorted(missing),
+    }
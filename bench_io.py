@@ -0,0 +1,191 @@
+"""Load and save benchmarks of the editor on synthetic maps.
+
+    python bench_io.py [--sizes 1000 10000 100000] [--formats yaml rmap rmapc] [--repeat <n>]
+                       [-o <results.json>] [--workdir <folder>]
+
+For every size a map is generated with mapgen into a project folder with
+its textures, written in each format, then loaded and saved the way
+MapDesigner.load() and save() do it, with every stage timed on its own:
+
+    parse           read_map(), or opening a chunked map
+    scene           MapDesigner.load_map_data(), building the graphics items
+    collect         MapDesigner._collect_map_data(), the snapshot of the scene
+    copy_textures   store_textures() into a new project folder
+    reuse_textures  store_textures() into that folder again, nothing to copy
+    write           write_map() of the snapshot
+
+The save stages run one after the other on this thread instead of in a
+MapSaveTask so they can be timed apart. Texture decoding is left out, the
+editor does it in the background after the scene is built.
+
+Each stage runs --repeat times, the results are written as JSON with the
+times of every run and their minimum and median in ms. The editor runs
+under the offscreen Qt platform with settings kept in the work folder, so
+it needs no display and leaves the real editor settings alone.
+"""
+import os
+import sys
+import json
+import time
+import copy
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import importlib.machinery
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QSettings, QT_VERSION_STR, PYQT_VERSION_STR
+
+import map_io
+import map_chunks
+import mapgen
+from MapSaver import store_textures
+from texture_store import TextureStore
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+FORMATS = {"yaml": ".yaml", "rmap": map_io.BINARY_EXTENSION, "rmapc": map_io.CHUNKED_EXTENSION}
+
+STAGES = ("parse", "scene", "collect", "copy_textures", "reuse_textures", "write")
+
+
+def load_editor():
+    """The RAME module, the editor script is not importable by name"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "RAME.pyw")
+    return importlib.machinery.SourceFileLoader("RAME", path).load_module()
+
+
+def _timed(times, stage, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    times.setdefault(stage, []).append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def bench_map(window, path, out_dir, repeat):
+    """{stage: [ms per run]} of loading and saving the map at path"""
+    times = {}
+    for run in range(repeat):
+        # Start from an empty scene, clearing the last run's items is not timed
+        window.chunk_pager.close()
+        window.load_map_data({})
+
+        # Same steps as MapDesigner.load()
+        window.filename = path
+        if map_chunks.is_chunked_map(path):
+            data = _timed(times, "parse", window.chunk_pager.open, path)
+        else:
+            data = _timed(times, "parse", map_io.read_map, path)
+        _timed(times, "scene", window.load_map_data, data)
+        window.texture_loader.cancel()
+
+        # Same steps as MapDesigner.save() and MapSaveTask.run()
+        snapshot = _timed(times, "collect", window._collect_map_data)
+        sources = window._texture_sources(snapshot)
+        target = os.path.join(out_dir, f"run{run}")
+        shutil.rmtree(target, ignore_errors=True)
+        textures_dir = os.path.join(target, "textures")
+        os.makedirs(textures_dir)
+        # store_textures() rewrites the texture paths of the data it is given
+        again = copy.deepcopy(snapshot)
+        store = TextureStore(textures_dir)
+        _timed(times, "copy_textures", store_textures, snapshot, sources, store, target)
+        # A save into the same project again, the textures are all there
+        _timed(times, "reuse_textures", store_textures, again, sources, TextureStore(textures_dir), target)
+        _timed(times, "write", map_io.write_map, os.path.join(target, os.path.basename(path)), snapshot)
+        copied = (store.copied_files, store.copied_bytes)
+    return times, copied
+
+
+def summarize(times):
+    return {stage: {"min_ms": round(min(runs), 2), "median_ms": round(statistics.median(runs), 2),
+                    "runs_ms": [round(ms, 2) for ms in runs]}
+            for stage, runs in times.items()}
+
+
+def run(sizes, formats, repeat, workdir, seed=0, textures=32):
+    window = load_editor().MapDesigner()
+    results = []
+    for shapes in sizes:
+        project = os.path.join(workdir, f"map_{shapes}")
+        os.makedirs(project, exist_ok=True)
+        print(f"Generating a map with {shapes} shapes", file=sys.stderr)
+        solid, transparent, sky = mapgen.generate_textures(os.path.join(project, "textures"), textures, seed)
+        data = mapgen.generate_map(shapes, [f"textures/{name}" for name in solid],
+                                   [f"textures/{name}" for name in transparent], f"textures/{sky}", seed)
+        counts = {kind: len(entries) for kind, entries in data.items() if isinstance(entries, list)}
+
+        for name in formats:
+            path = os.path.join(project, "map" + FORMATS[name])
+            map_io.write_map(path, data)
+            print(f"Benchmarking {os.path.basename(path)} with {shapes} shapes", file=sys.stderr)
+            times, (copied_files, copied_bytes) = bench_map(window, path, os.path.join(workdir, "saved", name), repeat)
+            result = {
+                "shapes": shapes,
+                "format": name,
+                "counts": counts,
+                "file_bytes": os.path.getsize(path),
+                "copied_files": copied_files,
+                "copied_bytes": copied_bytes,
+                "stages": summarize(times),
+            }
+            results.append(result)
+            print("  " + ", ".join(f"{stage} {result['stages'][stage]['median_ms']:.1f} ms" for stage in STAGES),
+                  file=sys.stderr)
+
+    window.journal.discard()
+    window.chunk_pager.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench_io", description="Time loading and saving maps in the editor")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="shapes per map")
+    parser.add_argument("--formats", nargs="+", choices=sorted(FORMATS), default=["yaml", "rmap"])
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="JSON file for the results, stdout by default")
+    parser.add_argument("--workdir", help="folder for the maps and saves, a temporary one by default")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rame-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    # Keeps the recent folder and recovery journal of the real editor as they are
+    QSettings.setPath(QSettings.NativeFormat, QSettings.UserScope, os.path.join(workdir, "settings"))
+    QSettings.setPath(QSettings.IniFormat, QSettings.UserScope, os.path.join(workdir, "settings"))
+
+    try:
+        # The editor prints progress messages, keep stdout for the results
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run(args.sizes, args.formats, max(1, args.repeat), workdir, args.seed)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "benchmark": "load_save",
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "pyqt": PYQT_VERSION_STR,
+        "platform": platform.platform(),
+        "repeat": max(1, args.repeat),
+        "results": results,
+    }
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Rendering benchmarks of the map scene on synthetic maps.
+
+    python bench_render.py [--sizes 1000 10000] [--zooms 0.1 0.25 0.5 1 2 4] [--positions <n>]
+                           [--frames <n>] [--width <px>] [--height <px>] [--select <n>]
+                           [-o <results.json>] [--workdir <folder>]
+
+For every size a map is generated with mapgen, its items are built and
+textured like in the editor, and the scene is rendered into a QImage of
+the given size with QGraphicsScene.render(). Each zoom factor is rendered
+at --positions places spread along the map, --frames times each after one
+untimed frame, and the time of every frame is recorded.
+
+Besides the whole frame, MapScene.drawBackground() (the grid) and
+drawForeground() (selection borders, --select items are selected) are
+timed on their own; the rest of the frame is the paint() of the items.
+The results list the min, mean, max and the 50th, 90th, 95th and 99th
+percentile of each per zoom factor, in ms.
+
+The sky and overlay are drawn by the view, not the scene, and are not
+part of the frames. Runs under the offscreen Qt platform.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtCore import QRectF, QT_VERSION_STR, PYQT_VERSION_STR
+
+import map_model
+import mapgen
+from bench_io import load_editor
+from utils import resolve_texture_path
+from MapScene import MapScene
+from MapPortal import MapPortal
+from TextureLoader import TextureLoader
+
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_ZOOMS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0)
+PERCENTILES = (50, 90, 95, 99)
+PARTS = ("frame", "background", "foreground", "items")
+
+
+class TimedScene(MapScene):
+    """MapScene adding up the time spent in drawBackground() and drawForeground()"""
+
+    def __init__(self):
+        super().__init__()
+        self.background_ms = 0.0
+        self.foreground_ms = 0.0
+
+    def drawBackground(self, painter, rect):
+        start = time.perf_counter()
+        super().drawBackground(painter, rect)
+        self.background_ms += (time.perf_counter() - start) * 1000
+
+    def drawForeground(self, painter, rect):
+        start = time.perf_counter()
+        super().drawForeground(painter, rect)
+        self.foreground_ms += (time.perf_counter() - start) * 1000
+
+
+def build_scene(data, map_path, item_views):
+    """TimedScene with the items of the map data, textures attached"""
+    scene = TimedScene()
+    # Same as MapDesigner._add_map_data()
+    model = map_model.MapModel.from_dict(data)
+    for record in model.records():
+        if isinstance(record, map_model.Portal):
+            continue
+        if isinstance(record, map_model.Triangle) and len(record.points) != 3:
+            continue
+        scene.addItem(item_views[type(record)].from_record(record))
+    for index, portal in enumerate(model.portals):
+        for end in portal.ends(index):
+            scene.addItem(MapPortal.from_record(end))
+
+    # The textures are decoded on worker threads like in the editor
+    loader = TextureLoader()
+    loader.load(scene.items(), lambda path: resolve_texture_path(path, map_path))
+    app = QApplication.instance()
+    while loader.is_loading():
+        app.processEvents()
+        time.sleep(0.001)
+    return scene
+
+
+def view_centers(scene, count, seed=0):
+    """count points spread along the map, each in the middle of some geometry"""
+    shapes = sorted((item.sceneBoundingRect().center() for item in scene.items()
+                     if hasattr(item, "texture_path")), key=lambda point: point.x())
+    if not shapes:
+        return [scene.itemsBoundingRect().center()]
+    rng = random.Random(seed)
+    step = len(shapes) / count
+    return [shapes[min(len(shapes) - 1, int(i * step + rng.random() * step))] for i in range(count)]
+
+
+def percentile(values, percent):
+    """Linear interpolation between the closest ranks of the sorted values"""
+    values = sorted(values)
+    position = (len(values) - 1) * percent / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def summarize(values):
+    summary = {"min_ms": min(values), "mean_ms": statistics.fmean(values), "max_ms": max(values)}
+    for percent in PERCENTILES:
+        summary[f"p{percent}_ms"] = percentile(values, percent)
+    return {key: round(value, 3) for key, value in summary.items()}
+
+
+def bench_scene(scene, zooms, centers, frames, width, height):
+    """{zoom: {part: summary}} of rendering the scene"""
+    image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+    target = QRectF(0, 0, width, height)
+    results = {}
+    for zoom in zooms:
+        times = {part: [] for part in PARTS}
+        for center in centers:
+            source = QRectF(0, 0, width / zoom, height / zoom)
+            source.moveCenter(center)
+            for frame in range(frames + 1):
+                image.fill(0)
+                scene.background_ms = scene.foreground_ms = 0.0
+                painter = QPainter(image)
+                start = time.perf_counter()
+                scene.render(painter, target, source)
+                painter.end()
+                ms = (time.perf_counter() - start) * 1000
+                if frame == 0:
+                    continue  # Fills caches, e.g. of scaled pixmaps
+                times["frame"].append(ms)
+                times["background"].append(scene.background_ms)
+                times["foreground"].append(scene.foreground_ms)
+                times["items"].append(ms - scene.background_ms - scene.foreground_ms)
+        results[str(zoom)] = {part: summarize(values) for part, values in times.items()}
+    return results
+
+
+def run(sizes, zooms, positions, frames, width, height, select, workdir, seed=0):
+    item_views = load_editor().MapDesigner.ITEM_VIEWS
+    results = []
+    for shapes in sizes:
+        project = os.path.join(workdir, f"map_{shapes}")
+        map_path = os.path.join(project, "map.yaml")
+        print(f"Generating a map with {shapes} shapes", file=sys.stderr)
+        solid, transparent, sky = mapgen.generate_textures(os.path.join(project, "textures"), seed=seed)
+        data = mapgen.generate_map(shapes, [f"textures/{name}" for name in solid],
+                                   [f"textures/{name}" for name in transparent], f"textures/{sky}", seed)
+
+        scene = build_scene(data, map_path, item_views)
+        rng = random.Random(seed)
+        items = scene.items()
+        for item in rng.sample(items, min(select, len(items))):
+            item.setSelected(True)
+
+        print(f"Rendering {len(items)} items at {len(zooms)} zoom factors", file=sys.stderr)
+        zoom_results = bench_scene(scene, zooms, view_centers(scene, positions, seed), frames, width, height)
+        for zoom, parts in zoom_results.items():
+            print(f"  zoom {zoom}: " + ", ".join(
+                f"{part} p50 {parts[part]['p50_ms']:.2f} ms p95 {parts[part]['p95_ms']:.2f} ms" for part in PARTS),
+                file=sys.stderr)
+        results.append({"shapes": shapes, "items": len(items), "selected": min(select, len(items)),
+                        "zooms": zoom_results})
+        scene.clear()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench_render", description="Time rendering the map scene")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="shapes per map")
+    parser.add_argument("--zooms", type=float, nargs="+", default=list(DEFAULT_ZOOMS))
+    parser.add_argument("--positions", type=int, default=8, help="places along the map rendered at every zoom")
+    parser.add_argument("--frames", type=int, default=5, help="timed frames per place and zoom")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--select", type=int, default=20, help="items to select for the selection borders")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="JSON file for the results, stdout by default")
+    parser.add_argument("--workdir", help="folder for the maps, a temporary one by default")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rame-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run(args.sizes, args.zooms, max(1, args.positions), max(1, args.frames),
+                          args.width, args.height, args.select, workdir, args.seed)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "benchmark": "render",
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "pyqt": PYQT_VERSION_STR,
+        "platform": platform.platform(),
+        "image": [args.width, args.height],
+        "positions": max(1, args.positions),
+        "frames": max(1, args.frames),
+        "results": results,
+    }
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
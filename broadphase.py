@@ -0,0 +1,79 @@
+"""Uniform grid over the solid geometry of a map, precomputed on export.
+
+The game needs a spatial index to find the shapes near the player. Instead
+of building one from the flat rectangles and triangles lists on every
+level load, the export stores it in the map under "broadphase":
+
+    broadphase:
+      cell_size: 256
+      bounds: [min_column, min_row, max_column, max_row]
+      cells:
+        - {column: 0, row: -1, rectangles: [0, 4], triangles: [2]}
+        ...
+
+The cell of a point is (floor(x / cell_size), floor(y / cell_size)). Only
+cells holding geometry are listed, sorted by row and column, and each
+lists the positions in the map's rectangles and triangles lists of the
+shapes whose bounding box reaches into it. Deco shapes are not solid and
+are left out. The grid has to be built after every pass that adds,
+removes or reorders shapes.
+"""
+import math
+
+import map_model
+
+DEFAULT_CELL_SIZE = 256
+
+# Wall type of shapes written without one, as in map_model
+_DEFAULT_WALL_TYPES = {"rectangles": "static", "triangles": "ramp"}
+
+
+def _bounds(kind, shape):
+    if kind == "rectangles":
+        return shape["x"], shape["y"], shape["x"] + shape["w"], shape["y"] + shape["h"]
+    xs = [p["x"] for p in shape["points"]]
+    ys = [p["y"] for p in shape["points"]]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _cell_range(low, high, cell_size):
+    """Cells from low to high, a shape ending on a cell border stays out of the next cell"""
+    first = math.floor(low / cell_size)
+    last = max(first, math.ceil(high / cell_size) - 1)
+    return range(first, last + 1)
+
+
+def build_grid(data, cell_size=DEFAULT_CELL_SIZE):
+    """The broadphase entry for map data, see the module docstring"""
+    cells = {}  # (row, column) -> {kind: [positions]}
+    for kind in ("rectangles", "triangles"):
+        for position, shape in enumerate(data.get(kind) or []):
+            if shape.get("wall_type", _DEFAULT_WALL_TYPES[kind]) not in map_model.SOLID_WALL_TYPES:
+                continue
+            left, top, right, bottom = _bounds(kind, shape)
+            for row in _cell_range(top, bottom, cell_size):
+                for column in _cell_range(left, right, cell_size):
+                    cell = cells.setdefault((row, column), {"rectangles": [], "triangles": []})
+                    cell[kind].append(position)
+
+    grid = {"cell_size": cell_size, "bounds": None, "cells": []}
+    if cells:
+        rows = [row for row, _ in cells]
+        columns = [column for _, column in cells]
+        grid["bounds"] = [min(columns), min(rows), max(columns), max(rows)]
+    for (row, column), shapes in sorted(cells.items()):
+        grid["cells"].append(dict(column=column, row=row, **shapes))
+    return grid
+
+
+def add_broadphase(data, cell_size=DEFAULT_CELL_SIZE):
+    """Store the grid in the map data, returns a report dict"""
+    grid = build_grid(data, cell_size)
+    data["broadphase"] = grid
+    counts = [len(cell["rectangles"]) + len(cell["triangles"]) for cell in grid["cells"]]
+    return {
+        "cell_size": cell_size,
+        "cells": len(counts),
+        "references": sum(counts),
+        "max_per_cell": max(counts, default=0),
+    }
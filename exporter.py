@@ -0,0 +1,72 @@
+import atlas
+import broadphase
+import occlusion
+import rect_merge
+
+# Options understood by export_map_data(), the export dialog starts from these
+DEFAULT_EXPORT_OPTIONS = {
+    "merge_rects": True,
+    # Read by the editor, which then merges the rectangles in the scene too
+    "merge_in_scene": False,
+    "drop_hidden": True,
+    "atlas": True,
+    "atlas_size": atlas.DEFAULT_ATLAS_SIZE,
+    "atlas_padding": atlas.DEFAULT_PADDING,
+    "atlas_exclude_tiled": True,
+    "broadphase": True,
+    "broadphase_cell_size": broadphase.DEFAULT_CELL_SIZE,
+}
+
+
+def export_map_data(data, map_path, options=None):
+    """Run the export passes over the map data in place.
+
+    data is the dict built for the YAML file and map_path the file it will be
+    written to. Returns a dict with the report of every pass that ran, keyed
+    by pass name.
+    """
+    opts = dict(DEFAULT_EXPORT_OPTIONS)
+    if options:
+        opts.update(options)
+
+    report = {}
+    # Before the atlas pass, merged rects may tile their texture differently
+    if opts["merge_rects"]:
+        report["merge"] = rect_merge.merge_map_data(data, map_path)
+    if opts["drop_hidden"]:
+        report["hidden"] = occlusion.cull_map_data(data, map_path)
+    if opts["atlas"]:
+        report["atlas"] = atlas.build_atlases(
+            data, map_path,
+            max_size=opts["atlas_size"],
+            padding=opts["atlas_padding"],
+            exclude_tiled=opts["atlas_exclude_tiled"],
+        )
+    # Last, it refers to the shapes by their position in the final lists
+    if opts["broadphase"]:
+        report["broadphase"] = broadphase.add_broadphase(data, opts["broadphase_cell_size"])
+    return report
+
+
+def summarize_report(report):
+    """One line summary of an export report for the status bar"""
+    parts = []
+    if "merge" in report and report["merge"]["removed"]:
+        r = report["merge"]
+        parts.append(f"{r['removed']} rectangles merged away ({r['before']} -> {r['after']})")
+    if "hidden" in report and report["hidden"]["hidden"]:
+        r = report["hidden"]
+        parts.append(f"{r['dropped']} hidden shapes dropped")
+        if r["kept"]:
+            parts.append(f"{r['kept']} hidden shapes kept for their collision")
+    if "atlas" in report:
+        r = report["atlas"]
+        parts.append(f"{len(r['packed'])} textures packed into {len(r['pages'])} atlas page(s)")
+        if r["excluded"]:
+            parts.append(f"{len(r['excluded'])} tiled textures kept separate")
+        if r["too_large"]:
+            parts.append(f"{len(r['too_large'])} too large for an atlas")
+    if "broadphase" in report:
+        r = report["broadphase"]
+        parts.append(f"collision grid of {r['cells']} cells")
+    return ", ".join(parts)
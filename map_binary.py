@@ -0,0 +1,285 @@
+"""Compact binary encoding of the map data written by save.
+
+Every list section of the map (rectangles, triangles, items, ...) is stored
+column by column: each field becomes one little-endian array with one value
+per entry, nested fields such as triangle points are flattened to columns
+like points.0.x. Strings (textures, wall types) are indices into a shared
+string table. Everything else, such as the sky and spawnpoint, goes into the
+JSON header.
+
+Layout:
+    magic (8 bytes) | header length (uint32) | header JSON | padding | columns
+
+Every column starts on an 8 byte boundary, so the file can be memory-mapped
+and the columns viewed as arrays without copying, see BinaryMap.
+
+Numbers are stored as float32 when every value in the column converts to
+float32 exactly and as float64 otherwise, so decoding gives back the same
+values that were encoded.
+"""
+import sys
+import json
+import mmap
+import array
+import struct
+
+MAGIC = b"RAMEMAP\x00"
+VERSION = 1
+ALIGNMENT = 8
+
+# Column kinds, the typecodes are the array/memoryview formats of the data
+NUMBER = "number"   # f, d, i or q
+BOOL = "bool"       # B
+STRING = "string"   # i, index into the string table, -1 for None
+JSON = "json"       # i, index into the string table of a JSON encoded value
+
+_FLOAT32 = struct.Struct("<f")
+
+
+def _flatten(value, prefix, out):
+    if isinstance(value, dict) and value:
+        for key, child in value.items():
+            _flatten(child, f"{prefix}.{key}" if prefix else str(key), out)
+    elif isinstance(value, list) and value and all(isinstance(v, (int, float)) for v in value):
+        for index, child in enumerate(value):
+            _flatten(child, f"{prefix}.{index}", out)
+    elif isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+        for index, child in enumerate(value):
+            _flatten(child, f"{prefix}.{index}", out)
+    else:
+        out[prefix] = value
+
+
+def _unflatten(fields):
+    root = {}
+    for name, value in fields:
+        parts = name.split(".")
+        node = root
+        for part, next_part in zip(parts, parts[1:]):
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+
+    # Dicts keyed 0..n-1 were lists
+    def fix(node):
+        if not isinstance(node, dict):
+            return node
+        node = {key: fix(value) for key, value in node.items()}
+        if node and all(key.isdigit() for key in node) and sorted(map(int, node)) == list(range(len(node))):
+            return [node[str(i)] for i in range(len(node))]
+        return node
+
+    return fix(root)
+
+
+def _is_float32(value):
+    try:
+        return _FLOAT32.unpack(_FLOAT32.pack(value))[0] == value
+    except (OverflowError, struct.error):
+        return False
+
+
+def _column_type(values):
+    """Pick (kind, typecode) able to hold every present value exactly"""
+    if all(isinstance(v, bool) for v in values):
+        return BOOL, "B"
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        if all(-2 ** 31 <= v < 2 ** 31 for v in values):
+            return NUMBER, "i"
+        if all(-2 ** 63 <= v < 2 ** 63 for v in values):
+            return NUMBER, "q"
+        return JSON, "i"
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return NUMBER, "f" if all(_is_float32(v) for v in values) else "d"
+    if all(v is None or isinstance(v, str) for v in values):
+        return STRING, "i"
+    return JSON, "i"
+
+
+class _StringTable:
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def add(self, s):
+        index = self._index.get(s)
+        if index is None:
+            index = self._index[s] = len(self.strings)
+            self.strings.append(s)
+        return index
+
+
+def _little_endian(arr):
+    if sys.byteorder != "little":
+        arr = array.array(arr.typecode, arr)
+        arr.byteswap()
+    return arr
+
+
+def dumps(data):
+    """Encode map data to bytes"""
+    strings = _StringTable()
+    meta = {}
+    columns = []
+    blobs = []
+
+    for section, entries in data.items():
+        if not (isinstance(entries, list) and entries and all(isinstance(e, dict) for e in entries)):
+            meta[section] = entries
+            continue
+
+        rows = []
+        names = {}
+        for entry in entries:
+            fields = {}
+            _flatten(entry, "", fields)
+            rows.append(fields)
+            names.update(dict.fromkeys(fields))
+
+        for name in names:
+            present = [name in row for row in rows]
+            values = [row[name] for row in rows if name in row]
+            kind, typecode = _column_type(values)
+
+            if kind == STRING:
+                encoded = [-1 if v is None else strings.add(v) for v in values]
+            elif kind == JSON:
+                encoded = [strings.add(json.dumps(v)) for v in values]
+            elif kind == BOOL:
+                encoded = [int(v) for v in values]
+            else:
+                encoded = values
+            # Absent values are stored as zero and masked out
+            it = iter(encoded)
+            column = array.array(typecode, (next(it) if p else 0 for p in present))
+
+            info = {"section": section, "name": name, "kind": kind, "type": typecode, "data": len(blobs)}
+            columns.append(info)
+            blobs.append(_little_endian(column).tobytes())
+            if not all(present):
+                info["mask"] = len(blobs)
+                blobs.append(bytes(present))
+
+        meta.setdefault("__sections__", []).append([section, len(rows)])
+
+    # Offsets depend on the header size, iterate until the header stops growing
+    offsets = [0] * len(blobs)
+    while True:
+        header = json.dumps({
+            "version": VERSION,
+            "meta": meta,
+            "strings": strings.strings,
+            "columns": columns,
+            "blobs": offsets,
+            "sizes": [len(b) for b in blobs],
+        }, separators=(",", ":")).encode("utf-8")
+        position = _align(len(MAGIC) + 4 + len(header))
+        new_offsets = []
+        for blob in blobs:
+            new_offsets.append(position)
+            position = _align(position + len(blob))
+        if new_offsets == offsets:
+            break
+        offsets = new_offsets
+
+    out = bytearray(MAGIC)
+    out += struct.pack("<I", len(header))
+    out += header
+    for offset, blob in zip(offsets, blobs):
+        out += b"\x00" * (offset - len(out))
+        out += blob
+    return bytes(out)
+
+
+def _align(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def is_binary_map(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class BinaryMap:
+    """Read-only view of a binary map, memory-mapped when opened from a file.
+
+    column() returns a memoryview of a column cast to its typecode without
+    copying, numpy() wraps the same memory in a NumPy array.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer)
+        if bytes(self._buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a binary map")
+        (header_size,) = struct.unpack_from("<I", self._buffer, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(bytes(self._buffer[start:start + header_size]).decode("utf-8"))
+        if header["version"] > VERSION:
+            raise ValueError(f"Binary map version {header['version']} is newer than supported")
+        self.meta = header["meta"]
+        self.strings = header["strings"]
+        self._offsets = header["blobs"]
+        self._sizes = header["sizes"]
+        self.columns = {}
+        for info in header["columns"]:
+            self.columns.setdefault(info["section"], {})[info["name"]] = info
+        self.sections = dict(self.meta.pop("__sections__", []))
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped)
+
+    def _blob(self, index):
+        offset = self._offsets[index]
+        return self._buffer[offset:offset + self._sizes[index]]
+
+    def column(self, section, name):
+        info = self.columns[section][name]
+        view = self._blob(info["data"]).cast(info["type"])
+        if sys.byteorder != "little":
+            swapped = array.array(info["type"], view)
+            swapped.byteswap()
+            return memoryview(swapped)
+        return view
+
+    def mask(self, section, name):
+        """Presence of the column's value per entry, or None when every entry has it"""
+        info = self.columns[section][name]
+        if "mask" not in info:
+            return None
+        return self._blob(info["mask"])
+
+    def numpy(self, section, name):
+        import numpy
+        return numpy.frombuffer(self.column(section, name), dtype=self.columns[section][name]["type"])
+
+    def to_dict(self):
+        """Decode the whole map back into the data written by save"""
+        data = {}
+        for section, count in self.sections.items():
+            fields = [[] for _ in range(count)]
+            for name, info in self.columns.get(section, {}).items():
+                values = self.column(section, name).tolist()
+                mask = self.mask(section, name)
+                kind = info["kind"]
+                for row, value in enumerate(values):
+                    if mask is not None and not mask[row]:
+                        continue
+                    if kind == STRING:
+                        value = None if value < 0 else self.strings[value]
+                    elif kind == JSON:
+                        value = json.loads(self.strings[value])
+                    elif kind == BOOL:
+                        value = bool(value)
+                    fields[row].append((name, value))
+            data[section] = [_unflatten(f) for f in fields]
+        data.update(self.meta)
+        return data
+
+
+def loads(buffer):
+    return BinaryMap(buffer).to_dict()
@@ -0,0 +1,189 @@
+"""Chunked encoding of map data for levels many screens long.
+
+The map is cut into vertical strips of chunk_width scene units. Every
+rectangle, triangle, item and jump pad goes into the strip its left edge
+lies in, each strip is stored as its own map_binary block. Everything else
+(sky, spawnpoint, start and finish line, portals) is global and kept in the
+header, next to an index of the chunks with their offset and the bounds of
+the geometry they hold. Geometry may reach past the right end of its strip,
+the bounds tell which chunks are needed to show an area.
+
+Layout:
+    magic (8 bytes) | header length (uint32) | header JSON | padding | chunks
+
+A reader only needs the header to place the view and can read the chunks
+it needs one at a time, see ChunkedMap.
+"""
+import json
+import math
+import struct
+
+import map_binary
+
+MAGIC = b"RAMECHK\x00"
+VERSION = 1
+ALIGNMENT = 8
+
+# About two screens at 100% zoom
+DEFAULT_CHUNK_WIDTH = 2048
+
+# Sections split into chunks, in the order the editor creates them
+CHUNKED_SECTIONS = ("rectangles", "triangles", "items", "jump_pads")
+
+
+def entry_bounds(section, entry):
+    """(left, top, right, bottom) of a map entry, items and jump pads count as points"""
+    if section == "rectangles":
+        return entry["x"], entry["y"], entry["x"] + entry["w"], entry["y"] + entry["h"]
+    if section == "triangles":
+        xs = [p["x"] for p in entry["points"]]
+        ys = [p["y"] for p in entry["points"]]
+        return min(xs), min(ys), max(xs), max(ys)
+    return entry["x"], entry["y"], entry["x"], entry["y"]
+
+
+def chunk_index(x, chunk_width):
+    return math.floor(x / chunk_width)
+
+
+def unite_bounds(bounds, other):
+    if bounds is None:
+        return other
+    return (min(bounds[0], other[0]), min(bounds[1], other[1]),
+            max(bounds[2], other[2]), max(bounds[3], other[3]))
+
+
+def dumps(data, chunk_width=DEFAULT_CHUNK_WIDTH):
+    """Encode map data to bytes"""
+    meta = {key: value for key, value in data.items() if key not in CHUNKED_SECTIONS}
+    sections = {}
+    chunks = {}
+    for section in CHUNKED_SECTIONS:
+        entries = data.get(section)
+        if entries is None:
+            continue
+        sections[section] = len(entries)
+        for position, entry in enumerate(entries):
+            bounds = entry_bounds(section, entry)
+            chunk = chunks.setdefault(chunk_index(bounds[0], chunk_width), {"data": {}, "order": {}, "bounds": None})
+            chunk["data"].setdefault(section, []).append(entry)
+            # Position in the whole map, to give back the entries in their order
+            chunk["order"].setdefault(section, []).append(position)
+            chunk["bounds"] = unite_bounds(chunk["bounds"], bounds)
+
+    index = []
+    blobs = []
+    for number in sorted(chunks):
+        chunk = chunks[number]
+        blobs.append(map_binary.dumps(dict(chunk["data"], __order__=chunk["order"])))
+        index.append({
+            "index": number,
+            "bounds": list(chunk["bounds"]),
+            "counts": {section: len(entries) for section, entries in chunk["data"].items()},
+        })
+
+    # Offsets depend on the header size, iterate until the header stops growing
+    offsets = [0] * len(blobs)
+    while True:
+        for info, offset, blob in zip(index, offsets, blobs):
+            info["offset"] = offset
+            info["size"] = len(blob)
+        header = json.dumps({
+            "version": VERSION,
+            "chunk_width": chunk_width,
+            "meta": meta,
+            "sections": sections,
+            "chunks": index,
+        }, separators=(",", ":")).encode("utf-8")
+        position = _align(len(MAGIC) + 4 + len(header))
+        new_offsets = []
+        for blob in blobs:
+            new_offsets.append(position)
+            position = _align(position + len(blob))
+        if new_offsets == offsets:
+            break
+        offsets = new_offsets
+
+    out = bytearray(MAGIC)
+    out += struct.pack("<I", len(header))
+    out += header
+    for offset, blob in zip(offsets, blobs):
+        out += b"\x00" * (offset - len(out))
+        out += blob
+    return bytes(out)
+
+
+def _align(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def is_chunked_map(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class ChunkedMap:
+    """Index of a chunked map file, reading chunks from disk only when asked.
+
+    No handle is kept open between reads, so the file can be replaced by a
+    save while it is in use, open() the new file afterwards.
+    """
+
+    def __init__(self, path, header):
+        if header["version"] > VERSION:
+            raise ValueError(f"Chunked map version {header['version']} is newer than supported")
+        self.path = path
+        self.chunk_width = header["chunk_width"]
+        self.meta = header["meta"]
+        self.sections = header["sections"]
+        self.chunks = {info["index"]: info for info in header["chunks"]}
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("Not a chunked map")
+            (header_size,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_size).decode("utf-8"))
+        return cls(path, header)
+
+    def bounds(self, index):
+        """(left, top, right, bottom) of the geometry in a chunk"""
+        return tuple(self.chunks[index]["bounds"])
+
+    def chunks_in(self, left, right):
+        """Indices of the chunks with geometry between left and right"""
+        return [index for index, info in self.chunks.items()
+                if info["bounds"][0] <= right and info["bounds"][2] >= left]
+
+    def _read(self, f, index):
+        info = self.chunks[index]
+        f.seek(info["offset"])
+        return map_binary.loads(f.read(info["size"]))
+
+    def chunk(self, index):
+        """{section: [entries]} of one chunk, empty for chunks without geometry"""
+        if index not in self.chunks:
+            return {}
+        with open(self.path, "rb") as f:
+            data = self._read(f, index)
+        data.pop("__order__", None)
+        return data
+
+    def to_dict(self):
+        """Decode the whole map back into the data written by save"""
+        data = dict(self.meta)
+        for section, count in self.sections.items():
+            data[section] = [None] * count
+        with open(self.path, "rb") as f:
+            for index in self.chunks:
+                chunk = self._read(f, index)
+                order = chunk.pop("__order__")
+                for section, entries in chunk.items():
+                    for position, entry in zip(order[section], entries):
+                        data[section][position] = entry
+        return data
+
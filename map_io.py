@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import tempfile
+import yaml
+
+import map_binary
+import map_chunks
+
+# Maps saved under this extension use the binary format of map_binary
+BINARY_EXTENSION = ".rmap"
+
+# And under this one the chunked format of map_chunks, for very long levels
+CHUNKED_EXTENSION = ".rmapc"
+
+# Read once, os.umask() can only be read by setting it, which races with
+# files created meanwhile on other threads, e.g. by a save
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+# The libyaml bindings parse and emit several times faster than the pure
+# Python implementation, PyYAML is not always built with them
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+    YAML_BACKEND = "libyaml"
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+    YAML_BACKEND = "python"
+
+
+def is_binary_path(path):
+    return path.lower().endswith(BINARY_EXTENSION)
+
+
+def is_chunked_path(path):
+    return path.lower().endswith(CHUNKED_EXTENSION)
+
+
+def read_map(path):
+    """Parse a map file, YAML, binary or chunked"""
+    if map_chunks.is_chunked_map(path):
+        return map_chunks.ChunkedMap.open(path).to_dict()
+    if map_binary.is_binary_map(path):
+        return map_binary.BinaryMap.open(path).to_dict()
+    with open(path) as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+def _file_mode(path):
+    """Permission bits for writing path: those of the existing file, else 0o666 without the umask"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+def write_map(path, data):
+    """Write map data without ever leaving a partly written file behind.
+
+    Paths ending in .rmap get the binary format, .rmapc the chunked one and
+    anything else YAML. The data goes to a temporary file in the same
+    folder, which is flushed to disk and then renamed over path, so readers
+    see either the old or the new map.
+    """
+    if is_chunked_path(path):
+        content = map_chunks.dumps(data)
+    elif is_binary_path(path):
+        content = map_binary.dumps(data)
+    else:
+        content = yaml.dump(data, Dumper=SafeDumper).encode("utf-8")
+
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp() creates the file readable by its owner only, the map
+        # keeps the mode it had or gets the usual one for a new file
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Make the rename itself durable, not possible on every platform
+    try:
+        dir_fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def convert_map(src_path, dst_path):
+    """Convert between YAML, binary and chunked maps, checking that nothing was lost"""
+    data = read_map(src_path)
+    write_map(dst_path, data)
+    if read_map(dst_path) != data:
+        raise ValueError(f"{dst_path} does not read back the same map as {src_path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python map_io.py <input.yaml|.rmap|.rmapc> <output.yaml|.rmap|.rmapc>")
+        sys.exit(2)
+    start = time.perf_counter()
+    convert_map(sys.argv[1], sys.argv[2])
+    # Parsing the output again to check it is part of the time
+    print(f"Converted {sys.argv[1]} to {sys.argv[2]} in {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"(YAML with {YAML_BACKEND})")
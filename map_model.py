@@ -0,0 +1,336 @@
+"""The map as plain Python objects, without Qt.
+
+A MapModel holds one record per map entry (Rect, Triangle, Item, JumpPad,
+Portal and the Spawnpoint, Start and Finish markers). Records use
+__slots__ and know the fields, defaults and legacy spellings of their
+entry, so parsing, serializing and validating a map does not need a
+QApplication and is cheap enough to run over many maps at once.
+
+The editor's graphics items are views of these records: each builds
+itself with from_record() and describes itself with to_record().
+"""
+import math
+
+import map_io
+
+RECT_WALL_TYPES = ("static", "wall", "deco", "death")
+TRIANGLE_WALL_TYPES = ("ramp",)
+ITEM_TYPES = ("plasma", "rocket")
+# Wall types the player collides with, deco is only drawn
+SOLID_WALL_TYPES = ("static", "wall", "death", "ramp")
+
+
+class Record:
+    """A map entry with the fields in FIELDS, given as (name, default) pairs"""
+    __slots__ = ()
+    KIND = None
+    FIELDS = ()
+    # Keys of old maps that from_dict() turns into FIELDS
+    LEGACY_FIELDS = ()
+
+    def __init__(self, **values):
+        for name, default in self.FIELDS:
+            setattr(self, name, values.pop(name, default))
+        if values:
+            raise TypeError(f"{type(self).__name__} has no fields {', '.join(values)}")
+
+    @classmethod
+    def from_dict(cls, data, warnings=None):
+        """Build the record from its map entry, missing fields take their defaults"""
+        return cls(**{name: data.get(name, default) for name, default in cls.FIELDS})
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name, _ in self.FIELDS}
+
+    def copy(self):
+        return type(self)(**{name: getattr(self, name) for name, _ in self.FIELDS})
+
+    def bounds(self):
+        """(left, top, right, bottom) in map coordinates"""
+        return self.x, self.y, self.x, self.y
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name, _ in self.FIELDS)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name, _ in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class Marker(Record):
+    __slots__ = ("x", "y")
+    FIELDS = (("x", 0.0), ("y", 0.0))
+
+
+class Spawnpoint(Marker):
+    __slots__ = ()
+    KIND = "player_spawnpoint"
+
+
+class Start(Marker):
+    __slots__ = ()
+    KIND = "start_line"
+
+
+class Finish(Marker):
+    __slots__ = ()
+    KIND = "finish_line"
+
+
+_TEXTURE_FIELDS = (
+    ("texture", None),
+    ("texture_scale", 1.0),
+    ("texture_rotation", 0.0),
+    ("texture_offset_x", 0.0),
+    ("texture_offset_y", 0.0),
+    ("z_index", 0),
+)
+
+
+class Rect(Record):
+    __slots__ = ("x", "y", "w", "h", "wall_type", "texture", "texture_scale", "texture_rotation",
+                 "texture_offset_x", "texture_offset_y", "z_index")
+    KIND = "rectangles"
+    FIELDS = (("x", 0.0), ("y", 0.0), ("w", 0.0), ("h", 0.0), ("wall_type", "static")) + _TEXTURE_FIELDS
+    LEGACY_FIELDS = ("pos_x", "pos_y")
+
+    @classmethod
+    def from_dict(cls, data, warnings=None):
+        rect = super().from_dict(data, warnings)
+        # Old maps stored the item position separately from the rect
+        rect.x += data.get("pos_x", 0.0)
+        rect.y += data.get("pos_y", 0.0)
+        return rect
+
+    def bounds(self):
+        return self.x, self.y, self.x + self.w, self.y + self.h
+
+
+class Triangle(Record):
+    """points holds three (x, y) tuples"""
+    __slots__ = ("points", "wall_type", "texture", "texture_scale", "texture_rotation",
+                 "texture_offset_x", "texture_offset_y", "z_index")
+    KIND = "triangles"
+    FIELDS = (("points", ()), ("wall_type", "ramp")) + _TEXTURE_FIELDS
+
+    @classmethod
+    def from_dict(cls, data, warnings=None):
+        triangle = super().from_dict(data, warnings)
+        triangle.points = tuple((p["x"], p["y"]) for p in triangle.points)
+        return triangle
+
+    def to_dict(self):
+        data = super().to_dict()
+        data["points"] = [{"x": x, "y": y} for x, y in self.points]
+        return data
+
+    def bounds(self):
+        xs = [x for x, _ in self.points]
+        ys = [y for _, y in self.points]
+        return min(xs), min(ys), max(xs), max(ys)
+
+
+class Item(Record):
+    __slots__ = ("x", "y", "type", "ammo", "stay")
+    KIND = "items"
+    FIELDS = (("x", 0.0), ("y", 0.0), ("type", "plasma"), ("ammo", 10), ("stay", False))
+
+    @classmethod
+    def from_dict(cls, data, warnings=None):
+        item = super().from_dict(data, warnings)
+        if item.type not in ITEM_TYPES:
+            if warnings is not None:
+                warnings.append(f"Unknown item type '{item.type}', defaulting to 'plasma'")
+            item.type = "plasma"
+        item.ammo = int(item.ammo)
+        return item
+
+
+class JumpPad(Record):
+    __slots__ = ("x", "y", "vel", "rotation")
+    KIND = "jump_pads"
+    FIELDS = (("x", 0.0), ("y", 0.0), ("vel", 0.3), ("rotation", 0.0))
+    LEGACY_FIELDS = ("vel_x", "vel_y")
+
+    @classmethod
+    def from_dict(cls, data, warnings=None):
+        if "vel" not in data and "vel_x" in data and "vel_y" in data:
+            # Legacy format: vel_x, vel_y become speed and rotation in degrees
+            vx = float(data["vel_x"])
+            vy = float(data["vel_y"])
+            return cls(x=data["x"], y=data["y"], vel=math.hypot(vx, vy),
+                       rotation=math.degrees(math.atan2(vy, vx)))
+        pad = super().from_dict(data, warnings)
+        pad.rotation = float(pad.rotation)
+        return pad
+
+
+class PortalEnd(Record):
+    """One side of a portal as placed in the editor, paired with its partner by ID"""
+    __slots__ = ("x", "y", "flipped", "type", "ID")
+    KIND = "portal"
+    FIELDS = (("x", 0.0), ("y", 0.0), ("flipped", False), ("type", "entry"), ("ID", 0))
+
+
+class Portal(Record):
+    __slots__ = ("entry_x", "entry_y", "entry_flipped", "exit_x", "exit_y", "exit_flipped")
+    KIND = "portals"
+    FIELDS = (("entry_x", 0.0), ("entry_y", 0.0), ("entry_flipped", False),
+              ("exit_x", 0.0), ("exit_y", 0.0), ("exit_flipped", False))
+
+    def ends(self, portal_id):
+        return (PortalEnd(x=self.entry_x, y=self.entry_y, flipped=self.entry_flipped, type="entry", ID=portal_id),
+                PortalEnd(x=self.exit_x, y=self.exit_y, flipped=self.exit_flipped, type="exit", ID=portal_id))
+
+    def bounds(self):
+        return (min(self.entry_x, self.exit_x), min(self.entry_y, self.exit_y),
+                max(self.entry_x, self.exit_x), max(self.entry_y, self.exit_y))
+
+
+MARKERS = {cls.KIND: cls for cls in (Spawnpoint, Start, Finish)}
+SECTIONS = {cls.KIND: cls for cls in (Rect, Triangle, Item, JumpPad, Portal)}
+
+# Fields an entry cannot do without, the rest have defaults
+REQUIRED = {
+    "rectangles": ("x", "y", "w", "h"),
+    "triangles": ("points",),
+    "items": ("x", "y"),
+    "jump_pads": ("x", "y"),
+    "portals": ("entry_x", "entry_y", "exit_x", "exit_y"),
+}
+
+
+def record_class(kind):
+    return MARKERS.get(kind) or SECTIONS.get(kind) or (PortalEnd if kind == "portal" else None)
+
+
+def pair_portals(ends):
+    """Pair PortalEnds by ID into Portals, returns (portals, problems).
+
+    Ends without exactly one partner of the other type are left out and
+    described in problems.
+    """
+    by_id = {}
+    for end in ends:
+        by_id.setdefault(end.ID, []).append(end)
+
+    portals = []
+    problems = []
+    for portal_id, group in by_id.items():
+        entries = [end for end in group if end.type == "entry"]
+        exits = [end for end in group if end.type == "exit"]
+        if not entries:
+            problems.append(f"The Portal Exit with ID {portal_id} has no Portal Entry.")
+        elif not exits:
+            problems.append(f"The Portal Entry with ID {portal_id} has no Portal Exit.")
+        elif len(exits) > 1:
+            problems.append(f"The Portal Entry with ID {portal_id} has more than one Exit.")
+        elif len(entries) > 1:
+            problems.append(f"The Portal Exit with ID {portal_id} has more than one Entry.")
+        else:
+            entry, exit = entries[0], exits[0]
+            portals.append(Portal(entry_x=entry.x, entry_y=entry.y, entry_flipped=entry.flipped,
+                                  exit_x=exit.x, exit_y=exit.y, exit_flipped=exit.flipped))
+    return portals, problems
+
+
+class MapModel:
+    """A whole map: sky and overlay, the markers and the lists of records"""
+    __slots__ = ("sky", "overlay", "player_spawnpoint", "start_line", "finish_line",
+                 "rectangles", "triangles", "items", "jump_pads", "portals", "warnings")
+
+    def __init__(self):
+        self.sky = None
+        self.overlay = None
+        self.player_spawnpoint = None
+        self.start_line = None
+        self.finish_line = None
+        self.rectangles = []
+        self.triangles = []
+        self.items = []
+        self.jump_pads = []
+        self.portals = []
+        # Problems found while parsing, entries that could not be read are skipped
+        self.warnings = []
+
+    @classmethod
+    def from_dict(cls, data):
+        """Parse map data as read from a map file"""
+        model = cls()
+        model.sky = data.get("sky")
+        model.overlay = data.get("parallax_1")
+        for kind, record_cls in MARKERS.items():
+            if data.get(kind) is not None:
+                setattr(model, kind, record_cls.from_dict(data[kind], model.warnings))
+
+        for kind, record_cls in SECTIONS.items():
+            records = getattr(model, kind)
+            for index, entry in enumerate(data.get(kind) or []):
+                missing = [name for name in REQUIRED[kind] if name not in entry]
+                if missing:
+                    model.warnings.append(f"Skipping {kind} #{index} without {', '.join(missing)}")
+                    continue
+                try:
+                    records.append(record_cls.from_dict(entry, model.warnings))
+                except (TypeError, ValueError, KeyError) as e:
+                    model.warnings.append(f"Skipping {kind} #{index}: {e}")
+        return model
+
+    @classmethod
+    def from_records(cls, records, sky=None, overlay=None):
+        """Build a model from records in any order, PortalEnds are paired by ID.
+
+        Returns (model, problems with the portals).
+        """
+        model = cls()
+        model.sky = sky
+        model.overlay = overlay
+        ends = []
+        for record in records:
+            if isinstance(record, PortalEnd):
+                ends.append(record)
+            else:
+                model.add(record)
+        model.portals, problems = pair_portals(ends)
+        return model, problems
+
+    @classmethod
+    def read(cls, path):
+        return cls.from_dict(map_io.read_map(path))
+
+    def write(self, path):
+        map_io.write_map(path, self.to_dict())
+
+    def add(self, record):
+        if record.KIND in MARKERS:
+            setattr(self, record.KIND, record)
+        else:
+            getattr(self, record.KIND).append(record)
+
+    def records(self):
+        """Every record of the map, markers first"""
+        for kind in MARKERS:
+            if getattr(self, kind) is not None:
+                yield getattr(self, kind)
+        for kind in SECTIONS:
+            yield from getattr(self, kind)
+
+    def to_dict(self):
+        """Map data as written to a map file, rectangles and triangles in z order"""
+        data = {}
+        for kind in MARKERS:
+            marker = getattr(self, kind)
+            if marker is not None:
+                data[kind] = marker.to_dict()
+        for kind in SECTIONS:
+            records = getattr(self, kind)
+            if kind in ("rectangles", "triangles"):
+                records = sorted(records, key=lambda r: r.z_index)
+            if records:
+                data[kind] = [record.to_dict() for record in records]
+        if self.sky:
+            data["sky"] = self.sky
+        if self.overlay:
+            data["parallax_1"] = self.overlay
+        return data
@@ -0,0 +1,42 @@
+import map_model
+
+
+def item_model(item):
+    """The map_model record of a scene item, or None for items that are not saved"""
+    if item.parentItem() is not None:
+        return None
+    to_record = getattr(item, "to_record", None)
+    if to_record is None:
+        return None
+    return to_record()
+
+
+def item_record(item):
+    """Describe one scene item as (kind, data), or None for items that are not saved.
+
+    data is the entry the item gets in the map YAML, except that texture
+    holds the path used in the editor and portals are described one by one
+    instead of as entry/exit pairs.
+    """
+    record = item_model(item)
+    if record is None:
+        return None
+    return record.KIND, record.to_dict()
+
+
+def mark_edited(item):
+    """Report that the record of a scene item changed, to the scene's itemEdited listeners"""
+    scene = item.scene()
+    if scene is not None and hasattr(scene, "itemEdited"):
+        scene.itemEdited.emit(item)
+
+
+def records_to_map_data(records, sky=None, overlay=None):
+    """Build map data from (kind, data) records as returned by item_record().
+
+    Portals are paired by ID, portals without exactly one partner are left
+    out. Returns (data, problems with the portals).
+    """
+    model, problems = map_model.MapModel.from_records(
+        (map_model.record_class(kind).from_dict(data) for kind, data in records), sky, overlay)
+    return model.to_dict(), problems
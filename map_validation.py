@@ -0,0 +1,379 @@
+"""Checks of a whole map in one pass, without Qt.
+
+validate() runs every check over a MapModel and returns all findings at
+once, instead of stopping at the first problem. The checks work on columns
+the way NumPy code would: the x, y, w and h of all rectangles are pulled out
+of the records once, and each check is a few whole-column operations
+(map with operator functions, compress, Counter), which run in C. Python
+loops only run over the entries a column operation flagged, so a clean map
+with 50k shapes takes milliseconds.
+
+A Finding names the entries it is about as (kind, index) pairs, indices
+into the model's lists (or into the portal ends given to validate()), so
+the editor can select the items behind it.
+"""
+import os
+import time
+import operator
+from collections import Counter
+from itertools import chain, compress, count, repeat
+from operator import attrgetter, itemgetter
+
+import map_model
+
+ERROR = "error"
+WARNING = "warning"
+
+# Size of the player sprite, the spawnpoint is the middle of its top edge
+PLAYER_WIDTH = 64
+PLAYER_HEIGHT = 96
+
+# Remainders smaller than this still count as on the grid
+GRID_TOLERANCE = 1e-6
+
+
+class Finding:
+    """One problem of the map, check is the name of the check that found it"""
+    __slots__ = ("severity", "check", "message", "entries")
+
+    def __init__(self, severity, check, message, entries=()):
+        self.severity = severity
+        self.check = check
+        self.message = message
+        # (kind, index) pairs of the entries involved, empty for the whole map
+        self.entries = tuple(entries)
+
+    def to_dict(self):
+        return {"severity": self.severity, "check": self.check, "message": self.message,
+                "entries": [list(entry) for entry in self.entries]}
+
+    def __repr__(self):
+        return f"Finding({self.severity}, {self.check}, {self.message!r})"
+
+
+class RectColumns:
+    """x, y, w and h of every rectangle as lists, shared by the checks"""
+    __slots__ = ("x", "y", "w", "h")
+
+    def __init__(self, rects):
+        for name in self.__slots__:
+            setattr(self, name, list(map(attrgetter(name), rects)))
+
+
+class TriangleColumns:
+    """Corner coordinates x1 .. y3 of every triangle as lists.
+
+    Triangles without three points get zeros, check_triangles() reports them.
+    """
+    __slots__ = ("x1", "y1", "x2", "y2", "x3", "y3")
+
+    def __init__(self, triangles):
+        points = [p if len(p) == 3 else _NO_POINTS for p in map(attrgetter("points"), triangles)]
+        for corner in range(3):
+            corners = list(map(itemgetter(corner), points))
+            setattr(self, f"x{corner + 1}", list(map(itemgetter(0), corners)))
+            setattr(self, f"y{corner + 1}", list(map(itemgetter(1), corners)))
+
+    def across(self, left, right):
+        """Mask of the triangles reaching into the strip between left and right"""
+        xs = (self.x1, self.x2, self.x3)
+        # Some corner right of left and some corner left of right, cheaper
+        # than min() and max() per triangle
+        past_left = map(any, zip(*[_compare(operator.gt, x, left) for x in xs]))
+        before_right = map(any, zip(*[_compare(operator.lt, x, right) for x in xs]))
+        return map(operator.and_, past_left, before_right)
+
+
+_NO_POINTS = ((0.0, 0.0),) * 3
+
+
+# Column operations: a mask is an iterable with one truth value per entry
+
+def _compare(op, column, value):
+    return map(op, column, repeat(value))
+
+
+def _where(mask):
+    """Indices where the mask is true"""
+    return list(compress(count(), mask))
+
+
+def _remainders(column, grid_size):
+    """Zero for the values that are exact multiples of the grid"""
+    return map(operator.mod, column, repeat(grid_size))
+
+
+def validate(model, ends=(), resolve=None, grid_size=None):
+    """Every finding of the map, errors first.
+
+    ends are PortalEnds not yet paired into model.portals, as placed in the
+    editor. resolve maps a texture path to the file it points to, without
+    it textures are not checked. Coordinates are checked against the grid
+    only when grid_size is given.
+    """
+    columns = RectColumns(model.rectangles)
+    findings = []
+    findings += check_markers(model)
+    findings += check_rects(model, columns)
+    findings += check_triangles(model)
+    findings += check_entities(model)
+    findings += check_duplicates(model, columns)
+    findings += check_portals(ends)
+    findings += check_spawnpoint(model, columns)
+    if grid_size:
+        findings += check_grid(model, ends, grid_size, columns)
+    if resolve is not None:
+        findings += check_textures(model, resolve)
+    findings.sort(key=lambda finding: finding.severity != ERROR)
+    return findings
+
+
+def timed_validate(model, *args, **kwargs):
+    """(findings, time taken in ms)"""
+    start = time.perf_counter()
+    findings = validate(model, *args, **kwargs)
+    return findings, (time.perf_counter() - start) * 1000
+
+
+def check_markers(model):
+    findings = []
+    for kind in map_model.MARKERS:
+        if getattr(model, kind) is None:
+            findings.append(Finding(ERROR, "markers", f"The map has no {kind.replace('_', ' ')}"))
+    return findings
+
+
+def check_rects(model, columns=None):
+    """Rectangles without area and with unknown wall types"""
+    if columns is None:
+        columns = RectColumns(model.rectangles)
+    findings = []
+    if columns.w and min(min(columns.w), min(columns.h)) <= 0:
+        empty = map(operator.or_, _compare(operator.le, columns.w, 0), _compare(operator.le, columns.h, 0))
+        for index in _where(empty):
+            w, h = columns.w[index], columns.h[index]
+            findings.append(Finding(ERROR, "size", f"Rectangle has size {w}x{h}", [("rectangles", index)]))
+    findings += _unknown_wall_types("rectangles", model.rectangles, map_model.RECT_WALL_TYPES)
+    return findings
+
+
+def check_triangles(model):
+    """Triangles that are not three points spanning an area"""
+    findings = []
+    for index, points in enumerate(map(attrgetter("points"), model.triangles)):
+        if len(points) != 3:
+            findings.append(Finding(ERROR, "size", f"Triangle has {len(points)} points", [("triangles", index)]))
+            continue
+        (x1, y1), (x2, y2), (x3, y3) = points
+        if (x2 - x1) * (y3 - y1) == (x3 - x1) * (y2 - y1):
+            findings.append(Finding(ERROR, "size", "Triangle has no area", [("triangles", index)]))
+    findings += _unknown_wall_types("triangles", model.triangles, map_model.TRIANGLE_WALL_TYPES)
+    return findings
+
+
+def _unknown_wall_types(kind, records, known):
+    wall_types = list(map(attrgetter("wall_type"), records))
+    if set(wall_types) <= set(known):
+        return []
+    unknown = map(operator.not_, map(set(known).__contains__, wall_types))
+    return [Finding(ERROR, "wall_type", f"Unknown wall type '{wall_types[index]}'", [(kind, index)])
+            for index in _where(unknown)]
+
+
+def check_entities(model):
+    """Items and jump pads with values the game cannot use"""
+    findings = []
+    ammo = list(map(attrgetter("ammo"), model.items))
+    for index in _where(_compare(operator.lt, ammo, 0)):
+        findings.append(Finding(ERROR, "values", f"Item has {ammo[index]} ammo", [("items", index)]))
+    vel = list(map(attrgetter("vel"), model.jump_pads))
+    for index in _where(_compare(operator.le, vel, 0)):
+        findings.append(Finding(ERROR, "values", f"Jump pad has velocity {vel[index]}", [("jump_pads", index)]))
+    return findings
+
+
+def _geometry(kind, records, columns):
+    """Hashable position and size of every entry, copies of an entry share it"""
+    if kind == "rectangles":
+        return list(zip(columns.x, columns.y, columns.w, columns.h))
+    if kind == "triangles":
+        return list(map(attrgetter("points"), records))
+    if kind == "portals":
+        return list(map(attrgetter("entry_x", "entry_y", "exit_x", "exit_y"), records))
+    return list(map(attrgetter("x", "y"), records))
+
+
+def check_duplicates(model, columns=None):
+    """Entries that are exact copies of another one, whatever their z order"""
+    if columns is None:
+        columns = RectColumns(model.rectangles)
+    findings = []
+    for kind, record_cls in map_model.SECTIONS.items():
+        records = getattr(model, kind)
+        if len(records) < 2:
+            continue
+        # Only entries at the same place can be copies, the other fields
+        # are compared for those alone
+        geometry = _geometry(kind, records, columns)
+        counts = Counter(geometry)
+        if len(counts) == len(geometry):
+            continue
+        shared = {value for value, n in counts.items() if n > 1}
+        key = attrgetter(*[name for name, _ in record_cls.FIELDS if name != "z_index"])
+        groups = {}
+        for index in _where(map(shared.__contains__, geometry)):
+            groups.setdefault(key(records[index]), []).append(index)
+        for indices in groups.values():
+            if len(indices) > 1:
+                findings.append(Finding(WARNING, "duplicates",
+                                        f"{len(indices)} identical {kind.replace('_', ' ')}",
+                                        [(kind, index) for index in indices]))
+    return findings
+
+
+def check_portals(ends):
+    """Portal ends without exactly one partner of the other type"""
+    by_id = {}
+    for index, end in enumerate(ends):
+        by_id.setdefault(end.ID, []).append(index)
+
+    findings = []
+    for portal_id, indices in by_id.items():
+        types = [ends[index].type for index in indices]
+        entries = types.count("entry")
+        exits = types.count("exit")
+        if not entries:
+            message = f"The Portal Exit with ID {portal_id} has no Portal Entry."
+        elif not exits:
+            message = f"The Portal Entry with ID {portal_id} has no Portal Exit."
+        elif exits > 1:
+            message = f"The Portal Entry with ID {portal_id} has more than one Exit."
+        elif entries > 1:
+            message = f"The Portal Exit with ID {portal_id} has more than one Entry."
+        else:
+            continue
+        findings.append(Finding(ERROR, "portals", message, [("portal", index) for index in indices]))
+    return findings
+
+
+def check_spawnpoint(model, columns=None):
+    """Solid geometry overlapping the player at the spawnpoint"""
+    spawn = model.player_spawnpoint
+    if spawn is None:
+        return []
+    if columns is None:
+        columns = RectColumns(model.rectangles)
+    left = spawn.x - PLAYER_WIDTH / 2
+    right = spawn.x + PLAYER_WIDTH / 2
+    top = spawn.y
+    bottom = spawn.y + PLAYER_HEIGHT
+
+    entries = []
+    solid = map_model.SOLID_WALL_TYPES
+    # Rectangles overlapping the player horizontally, then the rest of the
+    # test for the few of them
+    rights = map(operator.add, columns.x, columns.w)
+    across = map(operator.and_, _compare(operator.lt, columns.x, right), _compare(operator.gt, rights, left))
+    for index in _where(across):
+        y, h = columns.y[index], columns.h[index]
+        if y < bottom and y + h > top and model.rectangles[index].wall_type in solid:
+            entries.append(("rectangles", index))
+
+    # Corners and middle of the player, touching a slope is fine
+    probes = ((left, top), (right, top), (left, bottom), (right, bottom), (spawn.x, top + PLAYER_HEIGHT / 2))
+    for index in _where(TriangleColumns(model.triangles).across(left, right)):
+        triangle = model.triangles[index]
+        if len(triangle.points) != 3 or triangle.wall_type not in solid:
+            continue
+        _, t, _, b = triangle.bounds()
+        if t >= bottom or b <= top:
+            continue
+        if any(_inside_triangle(px, py, triangle.points) for px, py in probes):
+            entries.append(("triangles", index))
+
+    if not entries:
+        return []
+    return [Finding(WARNING, "spawnpoint", "The player spawns inside solid geometry",
+                    [("player_spawnpoint", 0)] + entries)]
+
+
+def _inside_triangle(px, py, points):
+    """Whether the point lies strictly inside the triangle"""
+    (x1, y1), (x2, y2), (x3, y3) = points
+    d1 = (px - x2) * (y1 - y2) - (x1 - x2) * (py - y2)
+    d2 = (px - x3) * (y2 - y3) - (x2 - x3) * (py - y3)
+    d3 = (px - x1) * (y3 - y1) - (x3 - x1) * (py - y1)
+    return (d1 < 0 and d2 < 0 and d3 < 0) or (d1 > 0 and d2 > 0 and d3 > 0)
+
+
+def check_grid(model, ends, grid_size, columns=None):
+    """Entries placed or sized off the editor grid"""
+    if columns is None:
+        columns = RectColumns(model.rectangles)
+
+    def off(value):
+        remainder = value % grid_size
+        return GRID_TOLERANCE < remainder < grid_size - GRID_TOLERANCE
+
+    findings = []
+    # Exact multiples are the rule, only entries with a remainder need the
+    # tolerance
+    rect_columns = [getattr(columns, name) for name in RectColumns.__slots__]
+    suspects = set()
+    for column in rect_columns:
+        if any(_remainders(column, grid_size)):
+            suspects.update(_where(_remainders(column, grid_size)))
+    for index in sorted(suspects):
+        if any(map(off, (columns.x[index], columns.y[index], columns.w[index], columns.h[index]))):
+            findings.append(Finding(WARNING, "grid", "Rectangle is off the grid", [("rectangles", index)]))
+
+    points = list(map(attrgetter("points"), model.triangles))
+    if any(_remainders(chain.from_iterable(chain.from_iterable(points)), grid_size)):
+        for index, triangle_points in enumerate(points):
+            if any(off(value) for point in triangle_points for value in point):
+                findings.append(Finding(WARNING, "grid", "Triangle is off the grid", [("triangles", index)]))
+
+    for kind, records in (("items", model.items), ("jump_pads", model.jump_pads), ("portal", ends)):
+        xs = list(map(attrgetter("x"), records))
+        ys = list(map(attrgetter("y"), records))
+        remainders = map(operator.or_, map(bool, _remainders(xs, grid_size)), map(bool, _remainders(ys, grid_size)))
+        for index in _where(remainders):
+            if off(xs[index]) or off(ys[index]):
+                findings.append(Finding(WARNING, "grid", f"{kind.replace('_', ' ').capitalize()} is off the grid",
+                                        [(kind, index)]))
+    for kind in map_model.MARKERS:
+        marker = getattr(model, kind)
+        if marker is not None and (off(marker.x) or off(marker.y)):
+            findings.append(Finding(WARNING, "grid", f"The {kind.replace('_', ' ')} is off the grid", [(kind, 0)]))
+    return findings
+
+
+def check_textures(model, resolve):
+    """Texture paths that do not point to a file, one finding per path"""
+    textures = {kind: list(map(attrgetter("texture"), getattr(model, kind))) for kind in ("rectangles", "triangles")}
+    paths = set(chain.from_iterable(textures.values())) | {model.sky, model.overlay}
+    paths.discard(None)
+    paths.discard("")
+
+    # Each path is looked up once, however many shapes use it
+    findings = []
+    for texture in sorted(paths):
+        path = resolve(texture)
+        if path and os.path.isfile(path):
+            continue
+        entries = [(kind, index) for kind, column in textures.items()
+                   for index in _where(_compare(operator.eq, column, texture))]
+        entries += [(label, 0) for label, value in (("sky", model.sky), ("overlay", model.overlay)) if value == texture]
+        findings.append(Finding(WARNING, "textures", f"Texture {texture} not found", entries))
+    return findings
+
+
+def entry_record(model, ends, kind, index):
+    """The record a finding entry names, None for the sky and overlay"""
+    if kind in map_model.MARKERS:
+        return getattr(model, kind)
+    if kind == "portal":
+        return ends[index]
+    if kind in map_model.SECTIONS:
+        return getattr(model, kind)[index]
+    return None
@@ -0,0 +1,223 @@
+"""Synthetic maps for benchmarks, shaped like the levels people draw.
+
+    python mapgen.py <output map> [--shapes <count>] [--seed <seed>] [--textures <count>]
+
+generate_map() lays out a level from left to right: runs of ground
+tiles, floating platforms, walls, ramps, death pits and deco shapes with
+transparent textures in front, together with items, jump pads, portals
+and the spawnpoint, start and finish lines. Shapes are on the grid and
+share a handful of textures the way real maps do, so merging, atlases and
+texture loading have realistic work to do. The same seed gives the same
+map.
+
+generate_textures() writes the textures into a folder: noisy, patterned
+images of the usual sizes, PNG and JPEG, some with transparent parts, and
+a sky. Only writing the textures needs Qt.
+"""
+import os
+import sys
+import random
+import argparse
+
+import map_io
+import map_model
+
+# Coordinates are multiples of this, like maps drawn with the editor's grid
+GRID = 32
+
+# One of each per this many rectangles and triangles, portals need two
+ITEM_EVERY = 60
+JUMP_PAD_EVERY = 90
+PORTAL_EVERY = 300
+
+# (width, height) of the textures written by generate_textures()
+TEXTURE_SIZES = ((64, 64), (128, 128), (128, 64), (256, 256), (256, 128), (512, 512))
+SKY_SIZE = (1024, 512)
+
+
+def generate_textures(folder, count=32, seed=0):
+    """Write count textures and a sky into folder, returns (texture names, transparent names, sky name)"""
+    from PyQt5.QtCore import Qt, QRectF
+    from PyQt5.QtGui import QImage, QPainter, QColor, QPen
+
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+
+    def noise(width, height, alpha):
+        # Coarse noise scaled up smoothly, the QImage only borrows the bytes
+        pixels = rng.randbytes(max(1, width // 8) * max(1, height // 8) * 4)
+        coarse = QImage(pixels, max(1, width // 8), max(1, height // 8), QImage.Format_RGB32)
+        image = coarse.scaled(width, height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        image = image.convertToFormat(QImage.Format_ARGB32 if alpha else QImage.Format_RGB32)
+        if alpha:
+            image.fill(Qt.transparent)
+        return image
+
+    textures = []
+    transparent = []
+    for number in range(count):
+        width, height = TEXTURE_SIZES[rng.randrange(len(TEXTURE_SIZES))]
+        alpha = number % 4 == 3
+        image = noise(width, height, alpha)
+        base = QColor.fromHsv(rng.randrange(360), rng.randrange(60, 200), rng.randrange(90, 230))
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        if alpha:
+            # Plants, chains and signs: blobs on a transparent background
+            painter.setPen(Qt.NoPen)
+            for _ in range(rng.randrange(3, 9)):
+                size = rng.randrange(width // 6, width // 2)
+                painter.setBrush(base.lighter(rng.randrange(70, 140)))
+                painter.drawEllipse(QRectF(rng.randrange(width - size), rng.randrange(height - size), size, size))
+        else:
+            # Tinted noise with a brick or plank pattern, tiles seamlessly
+            painter.setCompositionMode(QPainter.CompositionMode_Multiply)
+            painter.fillRect(image.rect(), base)
+            painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+            painter.setPen(QPen(base.darker(180), 2))
+            rows = rng.choice((2, 4, 8))
+            for row in range(rows):
+                y = row * height // rows
+                painter.drawLine(0, y, width, y)
+                shift = width // 4 if row % 2 else 0
+                for column in range(2):
+                    x = shift + column * width // 2
+                    painter.drawLine(x, y, x, y + height // rows)
+        painter.end()
+
+        extension = ".jpg" if not alpha and rng.random() < 0.3 else ".png"
+        name = f"synthetic_{number:03d}{extension}"
+        image.save(os.path.join(folder, name))
+        (transparent if alpha else textures).append(name)
+
+    sky = noise(*SKY_SIZE, False)
+    painter = QPainter(sky)
+    painter.setCompositionMode(QPainter.CompositionMode_Multiply)
+    painter.fillRect(sky.rect(), QColor(120, 170, 230))
+    painter.end()
+    sky.save(os.path.join(folder, "synthetic_sky.jpg"))
+    return textures, transparent, "synthetic_sky.jpg"
+
+
+def generate_map(shapes, textures=(), transparent=(), sky=None, seed=0):
+    """Map data with about shapes rectangles and triangles.
+
+    textures and transparent are the texture paths for solid and deco
+    shapes as written into the map, e.g. textures/brick.png. Without them
+    the shapes are untextured.
+    """
+    rng = random.Random(seed)
+    model = map_model.MapModel()
+    model.sky = sky
+
+    # Like in real maps a few textures are used everywhere and most rarely
+    weights = [1 / (rank + 1) for rank in range(len(textures))]
+
+    def texture():
+        if not textures:
+            return {}
+        scale = rng.choice((1.0, 1.0, 1.0, 0.5, 2.0))
+        return {"texture": rng.choices(textures, weights)[0], "texture_scale": scale}
+
+    def rect(x, y, w, h, wall_type="static", z_index=0, **look):
+        model.add(map_model.Rect(x=float(x), y=float(y), w=float(w), h=float(h), wall_type=wall_type,
+                                 z_index=z_index, **(look or texture())))
+
+    x = 0
+    ground = 0
+    model.add(map_model.Spawnpoint(x=float(GRID * 2), y=float(ground - 3 * GRID)))
+    model.add(map_model.Start(x=float(GRID * 4), y=float(ground - 2 * GRID)))
+    portal_entry = None
+    count = 0
+    while len(model.rectangles) + len(model.triangles) < shapes:
+        feature = rng.random()
+        if feature < 0.35:
+            # A run of ground tiles sharing one texture
+            look = texture()
+            for _ in range(rng.randrange(2, 9)):
+                rect(x, ground, 2 * GRID, 2 * GRID, **look)
+                x += 2 * GRID
+        elif feature < 0.55:
+            # Floating platform
+            rect(x, ground - rng.randrange(3, 11) * GRID, rng.randrange(2, 9) * GRID, GRID)
+            x += rng.randrange(1, 4) * GRID
+        elif feature < 0.62:
+            # Wall to climb
+            rect(x, ground - rng.randrange(4, 13) * GRID, rng.randrange(1, 3) * GRID, 12 * GRID, "wall")
+            x += 2 * GRID
+        elif feature < 0.82:
+            # Ramp up or down, the ground continues at its other end
+            w = rng.randrange(2, 7) * GRID
+            h = rng.randrange(1, 4) * GRID
+            if rng.random() < 0.5:
+                points = ((x, ground), (x + w, ground - h), (x + w, ground))
+                ground -= h
+            else:
+                points = ((x, ground), (x + w, ground + h), (x, ground + h))
+                ground += h
+            model.add(map_model.Triangle(points=tuple((float(px), float(py)) for px, py in points),
+                                         **texture()))
+            x += w
+        elif feature < 0.87:
+            # Death pit
+            w = rng.randrange(2, 6) * GRID
+            rect(x, ground + 4 * GRID, w, GRID, "death")
+            x += w
+        else:
+            # Deco in front of the geometry
+            look = {"texture": rng.choice(transparent)} if transparent else {}
+            rect(x - rng.randrange(4) * GRID, ground - rng.randrange(1, 6) * GRID,
+                 rng.randrange(1, 5) * GRID, rng.randrange(1, 5) * GRID, "deco", z_index=2, **look)
+
+        # Pickups, jump pads and portals spread along the level
+        shape_count = len(model.rectangles) + len(model.triangles)
+        while count < shape_count:
+            count += 1
+            if count % ITEM_EVERY == 0:
+                model.add(map_model.Item(x=float(x), y=float(ground - 2 * GRID), type=rng.choice(map_model.ITEM_TYPES),
+                                         ammo=rng.choice((5, 10, 20)), stay=rng.random() < 0.2))
+            if count % JUMP_PAD_EVERY == 0:
+                model.add(map_model.JumpPad(x=float(x), y=float(ground - GRID),
+                                            vel=rng.choice((0.3, 0.5, 0.8)), rotation=float(rng.randrange(-135, -44, 15))))
+            if count % PORTAL_EVERY == 0:
+                if portal_entry is None:
+                    portal_entry = (float(x), float(ground - 2 * GRID))
+                else:
+                    model.add(map_model.Portal(entry_x=portal_entry[0], entry_y=portal_entry[1],
+                                               exit_x=float(x), exit_y=float(ground - 2 * GRID)))
+                    portal_entry = None
+
+    model.add(map_model.Finish(x=float(x), y=float(ground - 2 * GRID)))
+    return model.to_dict()
+
+
+def write_synthetic_map(path, shapes, seed=0, textures=32):
+    """Write a synthetic map and its textures/ folder next to it"""
+    folder = os.path.join(os.path.dirname(os.path.abspath(path)), "textures")
+    solid, transparent, sky = generate_textures(folder, textures, seed)
+    data = generate_map(shapes, [f"textures/{name}" for name in solid], [f"textures/{name}" for name in transparent],
+                        f"textures/{sky}", seed)
+    map_io.write_map(path, data)
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="mapgen", description="Write a synthetic map for benchmarks")
+    parser.add_argument("output", help="map file, .yaml, .rmap or .rmapc")
+    parser.add_argument("--shapes", type=int, default=10000, help="rectangles and triangles, about")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--textures", type=int, default=32, help="textures to write into textures/")
+    args = parser.parse_args(argv)
+
+    # No window is shown, the application is only needed for painting the textures
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtGui import QGuiApplication
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+    data = write_synthetic_map(args.output, args.shapes, args.seed, args.textures)
+    print(f"Wrote {args.output}: " + ", ".join(
+        f"{len(data[kind])} {kind}" for kind in map_model.SECTIONS if kind in data))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
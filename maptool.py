@@ -0,0 +1,364 @@
+"""Headless map tool, for checking and converting maps without the editor.
+
+    python maptool.py validate <map|folder|glob>... [--grid <size>] [-j <jobs>]
+    python maptool.py stats <map|folder|glob>... [-j <jobs>]
+    python maptool.py convert <input> <output>
+    python maptool.py migrate <map|folder|glob>... [--in-place | -o <output>] [-j <jobs>]
+
+Maps are read through map_model, with the same schema handling as the
+editor. Folders are searched recursively for maps. With several maps the
+work is spread over a process pool, one process per core by default.
+
+Every result is printed to stdout as one JSON object per line as soon as
+it is done, with the time the map took, followed by a summary line.
+Anything else the map code prints goes to stderr. A map that
+fails only gives an error line, the exit status is 1 when any map has
+problems or could not be processed. A folder or glob pattern without any
+map gives an error line too.
+
+Only map_model, map_validation and the map_io modules are imported, no
+Qt, so the tool starts fast enough to run over many maps from a script.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import map_io
+import map_binary
+import map_chunks
+import map_model
+import map_validation
+
+
+MAP_EXTENSIONS = (".yaml", ".yml", map_io.BINARY_EXTENSION, map_io.CHUNKED_EXTENSION)
+
+
+def _is_map_name(name):
+    # Skips journals and other hidden files next to the maps
+    return not name.startswith(".") and name.lower().endswith(MAP_EXTENSIONS)
+
+
+def _maps_in(folder):
+    """Map files in folder and its subfolders, sorted, hidden folders left out"""
+    found = []
+    for path, dirs, files in os.walk(folder):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        found.extend(os.path.join(path, f) for f in files if _is_map_name(f))
+    return sorted(found)
+
+
+def find_maps(patterns, unmatched=None):
+    """Map files named by paths, folders (searched recursively) and glob patterns.
+
+    Folders and glob patterns without any map are added to the unmatched list if one is given.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            found = _maps_in(pattern)
+        elif glob.has_magic(pattern):
+            # Like the folders given, a pattern such as maps/** only picks the maps
+            found = []
+            for match in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isdir(match):
+                    found.extend(_maps_in(match))
+                elif _is_map_name(os.path.basename(match)):
+                    found.append(match)
+        else:
+            # A missing file gives an error when it is read
+            found = [pattern]
+        if not found and unmatched is not None:
+            unmatched.append(pattern)
+        paths.extend(found)
+    # Each map once, in the order given
+    return list(dict.fromkeys(paths))
+
+
+def _format_of(path):
+    if map_chunks.is_chunked_map(path):
+        return "chunked"
+    if map_binary.is_binary_map(path):
+        return "binary"
+    return "yaml"
+
+
+def _read(path):
+    """(map data, model, parse time in ms)"""
+    start = time.perf_counter()
+    data = map_io.read_map(path)
+    if not isinstance(data, dict):
+        raise ValueError("not a map")
+    model = map_model.MapModel.from_dict(data)
+    return data, model, (time.perf_counter() - start) * 1000
+
+
+def _resolve_texture(texture, path):
+    # Same as utils.resolve_texture_path, which needs Qt
+    if os.path.isabs(texture):
+        return texture
+    return os.path.normpath(os.path.join(os.path.dirname(path), texture))
+
+
+def validate_map(path, grid_size=None):
+    """Parse warnings and validation findings of one map"""
+    _, model, ms = _read(path)
+    findings, validate_ms = map_validation.timed_validate(
+        model, resolve=lambda texture: _resolve_texture(texture, path), grid_size=grid_size)
+    return {
+        "ok": not findings and not model.warnings,
+        "warnings": model.warnings,
+        "findings": [finding.to_dict() for finding in findings],
+        "parse_ms": round(ms, 1),
+        "validate_ms": round(validate_ms, 1),
+    }
+
+
+def map_stats(path):
+    """Counts, extent, textures and wall types of one map"""
+    _, model, ms = _read(path)
+    counts = {kind: len(getattr(model, kind)) for kind in map_model.SECTIONS}
+    bounds = None
+    textures = set()
+    wall_types = {}
+    for record in model.records():
+        left, top, right, bottom = record.bounds()
+        if bounds is None:
+            bounds = [left, top, right, bottom]
+        else:
+            bounds = [min(bounds[0], left), min(bounds[1], top), max(bounds[2], right), max(bounds[3], bottom)]
+        if isinstance(record, (map_model.Rect, map_model.Triangle)):
+            wall_types[record.wall_type] = wall_types.get(record.wall_type, 0) + 1
+            if record.texture:
+                textures.add(record.texture)
+    return {
+        "format": _format_of(path),
+        "bytes": os.path.getsize(path),
+        "parse_ms": round(ms, 1),
+        "counts": counts,
+        "markers": [kind for kind in map_model.MARKERS if getattr(model, kind) is not None],
+        "bounds": bounds,
+        "wall_types": wall_types,
+        "textures": len(textures),
+        "sky": model.sky,
+        "overlay": model.overlay,
+    }
+
+
+def convert_map(src, dst):
+    """Convert between the map formats, checking that nothing was lost"""
+    start = time.perf_counter()
+    map_io.convert_map(src, dst)
+    return {
+        "output": dst,
+        "format": _format_of(dst),
+        "bytes": os.path.getsize(dst),
+        "ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def _migrate_entry(record_cls, entry):
+    """The entry in the current schema, keys the record does not know are kept as they are"""
+    migrated = {key: value for key, value in entry.items() if key not in record_cls.LEGACY_FIELDS}
+    migrated.update(record_cls.from_dict(entry).to_dict())
+    return migrated
+
+
+def migrate_map(path, output):
+    """Rewrite a map in the current schema, e.g. legacy jump pads to vel/rotation.
+
+    Only the fields the records know are rewritten. Everything else, such as
+    the broadphase grid or the atlas entries of an exported map, and entries
+    that cannot be read are written back untouched, in their order.
+    """
+    data, model, _ = _read(path)
+    migrated = dict(data)
+    changed = {}
+    for kind, record_cls in list(map_model.MARKERS.items()) + list(map_model.SECTIONS.items()):
+        if not data.get(kind):
+            continue
+        single = kind in map_model.MARKERS
+        entries = []
+        count = 0
+        for entry in [data[kind]] if single else data[kind]:
+            # Entries the model skipped stay as they are, see model.warnings
+            required = map_model.REQUIRED.get(kind, ())
+            if isinstance(entry, dict) and all(name in entry for name in required):
+                try:
+                    new_entry = _migrate_entry(record_cls, entry)
+                except (TypeError, ValueError, KeyError):
+                    new_entry = entry
+                if new_entry != entry:
+                    count += 1
+                    entry = new_entry
+            entries.append(entry)
+        migrated[kind] = entries[0] if single else entries
+        if count:
+            changed[kind] = count
+    map_io.write_map(output, migrated)
+    return {"output": output, "changed": changed, "warnings": model.warnings}
+
+
+def _run(command, path, *args):
+    """One result line, errors included instead of raised"""
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            result = command(path, *args)
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    result = dict(file=path, **result)
+    result.setdefault("ok", True)
+    result["ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+# Queue of the pool workers for the numbers of the jobs they start, see _init_worker()
+_started = None
+
+
+def _init_worker(started):
+    global _started
+    _started = started
+
+
+def _run_numbered(number, command, path, *args):
+    # SimpleQueue writes right away, the number is out even if the map then kills the process
+    _started.put(number)
+    return _run(command, path, *args)
+
+
+def _error(job, e):
+    return {"file": job[1], "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def _run_alone(job):
+    """Run one job in a process of its own, its death only fails this job"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return pool.submit(_run, *job).result()
+        except Exception as e:
+            return _error(job, e)
+
+
+def run_jobs(jobs, workers=None):
+    """Run (command, path, *args) jobs, yielding the results as they finish.
+
+    Several jobs are spread over a process pool. A worker process that dies,
+    e.g. from a crash in a native library, breaks the whole pool and fails
+    every job still in it. The jobs the workers had started then run again
+    one by one in processes of their own, so only the one that kills its
+    process gives an error result, and the rest go to a new pool.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        for job in jobs:
+            yield _run(*job)
+        return
+
+    pending = dict(enumerate(jobs))
+    while pending:
+        started = multiprocessing.SimpleQueue()
+        broken = False
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                 initializer=_init_worker, initargs=(started,)) as pool:
+            futures = {pool.submit(_run_numbered, number, *job): number for number, job in pending.items()}
+            for future in as_completed(futures):
+                number = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    continue
+                except Exception as e:
+                    result = _error(pending[number], e)
+                del pending[number]
+                yield result
+        if not broken:
+            break
+
+        suspects = set()
+        while not started.empty():
+            suspects.add(started.get())
+        # A worker that died before starting anything leaves no suspects, run them all alone
+        suspects = [number for number in pending if number in suspects] or list(pending)
+        for number in suspects:
+            yield _run_alone(pending.pop(number))
+
+
+def _emit(result):
+    print(json.dumps(result), flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="maptool", description="Check and convert RAME maps without the editor")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    validate = commands.add_parser("validate", help="report parse warnings and problems")
+    validate.add_argument("maps", nargs="+")
+    validate.add_argument("--grid", type=int, help="also report coordinates off a grid of this size")
+
+    stats = commands.add_parser("stats", help="report entry counts, extent and textures")
+    stats.add_argument("maps", nargs="+")
+
+    for batch in (validate, stats):
+        batch.add_argument("-j", "--jobs", type=int, help="worker processes, one per core by default")
+
+    convert = commands.add_parser("convert", help="convert between .yaml, .rmap and .rmapc")
+    convert.add_argument("input")
+    convert.add_argument("output")
+
+    migrate = commands.add_parser("migrate", help="rewrite maps in the current schema")
+    migrate.add_argument("maps", nargs="+")
+    target = migrate.add_mutually_exclusive_group(required=True)
+    target.add_argument("--in-place", action="store_true", help="overwrite the maps")
+    target.add_argument("-o", "--output", help="output file, for a single map")
+    migrate.add_argument("-j", "--jobs", type=int, help="worker processes, one per core by default")
+
+    args = parser.parse_args(argv)
+
+    unmatched = []
+    if args.command == "convert":
+        jobs = [(convert_map, args.input, args.output)]
+    else:
+        maps = find_maps(args.maps, unmatched)
+        if args.command == "migrate":
+            if args.output and len(maps) != 1:
+                parser.error("-o needs exactly one map, use --in-place for several")
+            jobs = [(migrate_map, path, args.output or path) for path in maps]
+        elif args.command == "validate":
+            jobs = [(validate_map, path, args.grid) for path in maps]
+        else:
+            jobs = [(map_stats, path) for path in maps]
+
+    start = time.perf_counter()
+    summary = {"summary": True, "files": len(jobs), "ok": 0, "problems": 0, "errors": 0, "map_ms": 0.0,
+               "unmatched": len(unmatched)}
+    # A typo in a pattern should not pass as a run over zero maps
+    for pattern in unmatched:
+        _emit({"file": pattern, "ok": False, "error": "no maps match"})
+    for result in run_jobs(jobs, getattr(args, "jobs", None)):
+        _emit(result)
+        if "error" in result:
+            summary["errors"] += 1
+        elif result["ok"]:
+            summary["ok"] += 1
+        else:
+            summary["problems"] += 1
+        summary["map_ms"] += result.get("ms", 0.0)
+    summary["map_ms"] = round(summary["map_ms"], 1)
+    summary["ms"] = round((time.perf_counter() - start) * 1000, 1)
+    _emit(summary)
+    return 0 if summary["ok"] == summary["files"] and not unmatched else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
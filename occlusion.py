@@ -0,0 +1,180 @@
+"""Finding shapes that can never be seen because opaque rectangles cover them.
+
+A rectangle whose texture has no transparent pixels hides everything
+below it in z order. find_hidden() looks for rectangles and triangles
+whose bounding box is completely covered by such rectangles with a higher
+z index, alone or together.
+
+Hidden shapes still collide, so only some of them can be left out of an
+exported map without changing the game: deco shapes, which are only
+drawn, and shapes whose area is also covered by shapes of their own wall
+type. The others are only reported, the editor lists them in the
+Validation dock.
+"""
+from PyQt5.QtGui import QImage
+
+from utils import resolve_texture_path
+import map_model
+
+# Cell size of the lookup grid of the rectangles
+_CELL = 256
+
+
+def opaque_textures(resolve):
+    """is_opaque(texture) for find_hidden(), resolve maps a texture path to its file"""
+    cache = {}
+
+    def is_opaque(texture):
+        if texture not in cache:
+            cache[texture] = _is_opaque(resolve(texture))
+        return cache[texture]
+    return is_opaque
+
+
+def _is_opaque(path):
+    image = QImage(path)
+    if image.isNull():
+        return False
+    if not image.hasAlphaChannel():
+        return True
+    alpha = image.convertToFormat(QImage.Format_Alpha8)
+    # Rows are padded to 4 bytes, only count the pixels
+    bits = alpha.constBits()
+    bits.setsize(alpha.sizeInBytes())
+    data = bytes(bits)
+    row = alpha.bytesPerLine()
+    width = alpha.width()
+    return all(data[y * row:y * row + width].count(255) == width for y in range(alpha.height()))
+
+
+def _subtract(piece, cut):
+    """Parts of the box piece outside of cut, boxes are (left, top, right, bottom)"""
+    l, t, r, b = piece
+    cl, ct, cr, cb = cut
+    if cl >= r or cr <= l or ct >= b or cb <= t:
+        return [piece]
+    parts = []
+    if ct > t:
+        parts.append((l, t, r, ct))
+    if cb < b:
+        parts.append((l, cb, r, b))
+    top, bottom = max(t, ct), min(b, cb)
+    if cl > l:
+        parts.append((l, top, cl, bottom))
+    if cr < r:
+        parts.append((cr, top, r, bottom))
+    return parts
+
+
+def _covered(box, cuts):
+    """Whether the union of the boxes in cuts covers box"""
+    pieces = [box]
+    for cut in cuts:
+        pieces = [part for piece in pieces for part in _subtract(piece, cut)]
+        if not pieces:
+            return True
+    return False
+
+
+class _BoxGrid:
+    """Boxes bucketed by grid cell, to find the ones overlapping a box quickly"""
+
+    def __init__(self):
+        self.cells = {}
+        self.boxes = []
+
+    def add(self, box, value):
+        number = len(self.boxes)
+        self.boxes.append((box, value))
+        for cell in self._cells(box):
+            self.cells.setdefault(cell, []).append(number)
+
+    def overlapping(self, box):
+        """(box, value) pairs overlapping box"""
+        numbers = set()
+        for cell in self._cells(box):
+            numbers.update(self.cells.get(cell, ()))
+        l, t, r, b = box
+        found = []
+        for number in numbers:
+            other = self.boxes[number]
+            ol, ot, o_r, ob = other[0]
+            if ol < r and o_r > l and ot < b and ob > t:
+                found.append(other)
+        return found
+
+    @staticmethod
+    def _cells(box):
+        l, t, r, b = box
+        columns = range(int(l // _CELL), int(r // _CELL) + 1)
+        return [(row, column) for row in range(int(t // _CELL), int(b // _CELL) + 1) for column in columns]
+
+
+def find_hidden(rects, triangles, is_opaque):
+    """Shapes covered by opaque rectangles above them.
+
+    rects and triangles are map_model records, is_opaque(texture) tells
+    whether a texture has no transparent pixels. Returns (kind, index,
+    droppable) for every hidden shape, droppable if leaving it out does not
+    change collisions.
+    """
+    occluders = _BoxGrid()
+    for rect in rects:
+        if rect.w > 0 and rect.h > 0 and rect.texture and is_opaque(rect.texture):
+            occluders.add(rect.bounds(), rect.z_index)
+    walls = None  # Grid of all rectangles, built when a hidden wall turns up
+
+    hidden = []
+    dropped = set()  # ids of the records found droppable so far
+    shapes = [("rectangles", index, rect) for index, rect in enumerate(rects) if rect.w > 0 and rect.h > 0]
+    shapes += [("triangles", index, triangle) for index, triangle in enumerate(triangles)
+               if len(triangle.points) == 3]
+    for kind, index, shape in shapes:
+        box = shape.bounds()
+        if box[0] == box[2] or box[1] == box[3]:
+            continue
+        cuts = [other for other, z in occluders.overlapping(box) if z > shape.z_index]
+        if not cuts:
+            continue
+        # Largest first, most boxes are hidden by a single big one
+        cuts.sort(key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
+        if not _covered(box, cuts):
+            continue
+        if shape.wall_type == "deco":
+            droppable = True
+        else:
+            # Shapes dropped before do not count, two copies of a wall
+            # cover each other but only one of them may go
+            if walls is None:
+                walls = _BoxGrid()
+                for rect in rects:
+                    if rect.w > 0 and rect.h > 0:
+                        walls.add(rect.bounds(), rect)
+            same = [other for other, rect in walls.overlapping(box)
+                    if rect.wall_type == shape.wall_type and rect is not shape and id(rect) not in dropped]
+            droppable = _covered(box, same)
+        if droppable:
+            dropped.add(id(shape))
+        hidden.append((kind, index, droppable))
+    return hidden
+
+
+def cull_map_data(data, map_path, drop=True):
+    """Find the hidden shapes of map data and leave out the droppable ones, returns a report dict"""
+    rect_entries = data.get("rectangles") or []
+    triangle_entries = data.get("triangles") or []
+    hidden = find_hidden(
+        [map_model.Rect.from_dict(entry) for entry in rect_entries],
+        [map_model.Triangle.from_dict(entry) for entry in triangle_entries],
+        opaque_textures(lambda texture: resolve_texture_path(texture, map_path)))
+
+    dropped = {(kind, index) for kind, index, droppable in hidden if droppable}
+    if drop and dropped:
+        for kind, entries in (("rectangles", rect_entries), ("triangles", triangle_entries)):
+            if entries:
+                data[kind] = [entry for index, entry in enumerate(entries) if (kind, index) not in dropped]
+    return {
+        "hidden": len(hidden),
+        "dropped": len(dropped) if drop else 0,
+        "kept": len(hidden) - (len(dropped) if drop else 0),
+    }
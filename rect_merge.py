@@ -0,0 +1,156 @@
+"""Greedy merging of abutting rectangles that look and collide the same.
+
+Maps drawn on the grid are full of rows and blocks of small rectangles
+with the same wall type and texture settings, each of them a separate
+collision and draw object in the game. merge_rects() joins rectangles that
+share a whole edge into one, first along rows, then along columns, and
+repeats until nothing changes, so rows, columns and blocks of tiles each
+end up as one rectangle. The covered area stays exactly the same.
+
+Textures are anchored at the top left corner of a rectangle plus its
+texture offset, rotated around its center. Two rectangles can only be
+merged when their textures line up in the world, i.e. their anchors are
+the same or a whole number of texture tiles apart. The merged rectangle
+gets the texture offset that puts its anchor back on the same spot.
+"""
+import math
+
+from PyQt5.QtGui import QImageReader
+
+import map_model
+from utils import resolve_texture_path
+
+# Coordinates closer than this count as equal when comparing anchors
+PRECISION = 4
+
+
+def texture_anchor(rect):
+    """World position of the texture origin of a map_model.Rect"""
+    half_w, half_h = rect.w / 2, rect.h / 2
+    dx, dy = _rotate(rect.texture_offset_x - half_w, rect.texture_offset_y - half_h, rect.texture_rotation)
+    return rect.x + half_w + dx, rect.y + half_h + dy
+
+
+def offset_for_anchor(anchor, x, y, w, h, rotation):
+    """Texture offset that puts the texture origin of the rect at anchor"""
+    half_w, half_h = w / 2, h / 2
+    dx, dy = _rotate(anchor[0] - x - half_w, anchor[1] - y - half_h, -rotation)
+    return dx + half_w, dy + half_h
+
+
+def _rotate(x, y, degrees):
+    if not degrees % 360:
+        return x, y
+    angle = math.radians(degrees)
+    cos, sin = math.cos(angle), math.sin(angle)
+    return x * cos - y * sin, x * sin + y * cos
+
+
+def _look(rect, texture_size):
+    """Key of everything besides the geometry that has to match for a merge"""
+    key = (rect.wall_type, rect.texture, rect.z_index)
+    if not rect.texture:
+        return key
+    # In texture space the tiles are axis aligned, anchors that differ by
+    # whole tiles there give the same picture
+    ax, ay = texture_anchor(rect)
+    u, v = _rotate(ax, ay, -rect.texture_rotation)
+    size = texture_size(rect.texture) if texture_size else None
+    if size:
+        period_u = size[0] * rect.texture_scale
+        period_v = size[1] * rect.texture_scale
+        u = round(u % period_u, PRECISION) % period_u
+        v = round(v % period_v, PRECISION) % period_v
+    return key + (rect.texture_scale, rect.texture_rotation % 360, round(u, PRECISION), round(v, PRECISION))
+
+
+def _merge_runs(boxes, along_x):
+    """Join boxes sharing a whole edge along one axis, boxes are [x, y, w, h, sources]"""
+    if along_x:
+        boxes.sort(key=lambda b: (b[1], b[3], b[0]))
+    else:
+        boxes.sort(key=lambda b: (b[0], b[2], b[1]))
+    merged = []
+    for box in boxes:
+        last = merged[-1] if merged else None
+        if last is not None and along_x and last[1] == box[1] and last[3] == box[3] and last[0] + last[2] == box[0]:
+            last[2] += box[2]
+            last[4] += box[4]
+        elif last is not None and not along_x and last[0] == box[0] and last[2] == box[2] and last[1] + last[3] == box[1]:
+            last[3] += box[3]
+            last[4] += box[4]
+        else:
+            merged.append(box)
+    return merged
+
+
+def merge_rects(rects, texture_size=None):
+    """Merge map_model.Rects, returns (merged rects, sources).
+
+    sources[i] lists the indices of the rects merged[i] was made of, rects
+    that could not be merged come back unchanged with a single source.
+    texture_size(texture) gives the (width, height) of a texture or None,
+    without it only textures with the exact same anchor are joined.
+    Merged rects are in the order of their first source.
+    """
+    groups = {}
+    results = []  # (sources, rect)
+    for index, rect in enumerate(rects):
+        if rect.w > 0 and rect.h > 0:
+            groups.setdefault(_look(rect, texture_size), []).append(index)
+        else:
+            results.append(([index], rect))
+
+    for indices in groups.values():
+        if len(indices) == 1:
+            results.append((indices, rects[indices[0]]))
+            continue
+        boxes = [[rects[i].x, rects[i].y, rects[i].w, rects[i].h, [i]] for i in indices]
+        count = None
+        while count != len(boxes):
+            count = len(boxes)
+            boxes = _merge_runs(_merge_runs(boxes, along_x=True), along_x=False)
+        for x, y, w, h, sources in boxes:
+            sources.sort()
+            first = rects[sources[0]]
+            if len(sources) == 1:
+                results.append((sources, first))
+                continue
+            merged = first.copy()
+            merged.x, merged.y, merged.w, merged.h = x, y, w, h
+            if first.texture:
+                merged.texture_offset_x, merged.texture_offset_y = offset_for_anchor(
+                    texture_anchor(first), x, y, w, h, first.texture_rotation)
+            results.append((sources, merged))
+
+    results.sort(key=lambda result: result[0][0])
+    return [rect for _, rect in results], [sources for sources, _ in results]
+
+
+def texture_sizes(resolve):
+    """texture_size() for merge_rects(), resolve maps a texture path to its file"""
+    sizes = {}
+
+    def texture_size(texture):
+        if texture not in sizes:
+            size = QImageReader(resolve(texture)).size()
+            sizes[texture] = (size.width(), size.height()) if size.isValid() and not size.isEmpty() else None
+        return sizes[texture]
+    return texture_size
+
+
+def merge_map_data(data, map_path):
+    """Merge the rectangles of map data in place, returns a report dict"""
+    entries = data.get("rectangles") or []
+    rects = [map_model.Rect.from_dict(entry) for entry in entries]
+    merged, sources = merge_rects(rects, texture_sizes(lambda texture: resolve_texture_path(texture, map_path)))
+    if len(merged) < len(rects):
+        # Entries of rects left alone stay as they were, with any extra keys
+        data["rectangles"] = [entries[group[0]] if len(group) == 1 else rect.to_dict()
+                              for rect, group in zip(merged, sources)]
+    return {
+        "before": len(rects),
+        "after": len(merged),
+        "removed": len(rects) - len(merged),
+        "merged": sum(1 for group in sources if len(group) > 1),
+    }
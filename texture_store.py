@@ -0,0 +1,173 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+TEXTURE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+
+MANIFEST_NAME = ".textures.json"
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-1 of a file's contents, read in chunks"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TextureStore:
+    """The textures/ folder of a project, addressed by file contents.
+
+    add() copies a texture into the folder unless a file with the same
+    contents is already there, in which case the existing file is used. A
+    different file whose name is already taken is stored under its name with
+    a content hash suffix, e.g. brick-3f2a9c01d4e5.png, so textures that
+    share a name never overwrite or shadow each other. The exception is a
+    file that was copied from the same source before: when the source has
+    been edited since, its copy is updated in place.
+
+    A manifest in the folder records the hash, size and mtime of every
+    stored file and of the sources they were copied from, so unchanged files
+    are recognized from a stat() without reading them again. add_many()
+    hashes and copies in worker threads; copied_files and copied_bytes count
+    what was actually transferred.
+    """
+
+    def __init__(self, textures_dir, max_workers=None):
+        self.textures_dir = textures_dir
+        self.max_workers = max_workers
+        self.copied_files = 0
+        self.copied_bytes = 0
+        self._lock = threading.Lock()
+        self._names_by_digest = {}
+        # name -> {"size", "mtime_ns", "digest", "source"}
+        self._files = {}
+        # source path -> [size, mtime_ns, digest]
+        self._sources = {}
+        self._load_manifest()
+        self._scan()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.textures_dir, MANIFEST_NAME)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            self._files = manifest.get("files", {})
+            self._sources = manifest.get("sources", {})
+        except (OSError, ValueError):
+            self._files = {}
+            self._sources = {}
+
+    def save_manifest(self):
+        manifest = {"files": self._files, "sources": self._sources}
+        try:
+            os.makedirs(self.textures_dir, exist_ok=True)
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            print(f"Error writing texture manifest: {e}")
+
+    def _scan(self):
+        files = {}
+        if os.path.isdir(self.textures_dir):
+            for name in sorted(os.listdir(self.textures_dir)):
+                path = os.path.join(self.textures_dir, name)
+                if not name.lower().endswith(TEXTURE_EXTENSIONS) or not os.path.isfile(path):
+                    continue
+                stat = os.stat(path)
+                entry = self._files.get(name)
+                if not entry or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                    # New or edited in place, the manifest no longer describes it
+                    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                             "digest": file_digest(path), "source": (entry or {}).get("source")}
+                files[name] = entry
+                self._names_by_digest.setdefault(entry["digest"], name)
+        self._files = files
+
+    def _source_digest(self, src_path):
+        """Digest of a source file, hashed only when its size or mtime changed"""
+        key = os.path.abspath(src_path)
+        stat = os.stat(src_path)
+        with self._lock:
+            source = self._sources.get(key)
+        if source and source[0] == stat.st_size and source[1] == stat.st_mtime_ns:
+            return source[2]
+        digest = file_digest(src_path)
+        with self._lock:
+            self._sources[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def _plan(self, src_path, digest, planned):
+        """Pick the name src_path is stored under, returns (name, needs_copy)"""
+        name = self._names_by_digest.get(digest)
+        if name is not None:
+            return name, False
+
+        source = os.path.abspath(src_path)
+        name = os.path.basename(src_path)
+        entry = self._files.get(name)
+        if (entry is not None and entry.get("source") != source) or name in planned:
+            # Same name but different contents, otherwise the digest would have matched
+            stem, ext = os.path.splitext(name)
+            name = f"{stem}-{digest[:12]}{ext}"
+        return name, True
+
+    def _copy(self, src_path, name, digest):
+        dst_path = os.path.join(self.textures_dir, name)
+        tmp_path = dst_path + ".tmp"
+        shutil.copy2(src_path, tmp_path)
+        os.replace(tmp_path, dst_path)
+        stat = os.stat(dst_path)
+        return name, {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                      "digest": digest, "source": os.path.abspath(src_path)}
+
+    def add_many(self, src_paths, progress=None):
+        """Store several files and return {src_path: stored path}.
+
+        progress, if given, is called with (copied, total) after each copy.
+        """
+        src_paths = list(dict.fromkeys(src_paths))
+        if not src_paths:
+            return {}
+        os.makedirs(self.textures_dir, exist_ok=True)
+
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            digests = dict(zip(src_paths, executor.map(self._source_digest, src_paths)))
+
+            names = {}
+            copies = {}  # name -> (src_path, digest)
+            for src_path in src_paths:
+                digest = digests[src_path]
+                name, needs_copy = self._plan(src_path, digest, copies)
+                if needs_copy:
+                    copies[name] = (src_path, digest)
+                    self._names_by_digest[digest] = name
+                names[src_path] = name
+
+            results = executor.map(lambda item: self._copy(item[1][0], item[0], item[1][1]), copies.items())
+            for done, (name, entry) in enumerate(results, 1):
+                if progress is not None:
+                    progress(done, len(copies))
+                old = self._files.get(name)
+                if old is not None and self._names_by_digest.get(old["digest"]) == name:
+                    # The file was updated in place, its old contents are gone
+                    del self._names_by_digest[old["digest"]]
+                self._files[name] = entry
+                self.copied_files += 1
+                self.copied_bytes += entry["size"]
+
+        self.save_manifest()
+        return {src_path: os.path.join(self.textures_dir, name) for src_path, name in names.items()}
+
+    def add(self, src_path):
+        """Store src_path in the folder and return the path of the stored file"""
+        return self.add_many([src_path])[src_path]
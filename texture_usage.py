@@ -0,0 +1,185 @@
+"""Which textures of a project are used, how often, and at what size.
+
+scan() lists every image in the textures/ folder with the number of map
+shapes drawing it, whether it is the sky or the overlay (parallax_1), its
+size on disk, its resolution and the memory it takes once decoded.
+
+Shapes draw their texture tiled at texture_scale, so a texture whose
+users all have a small scale is only ever seen much smaller than it is.
+Such a texture can be replaced by a smaller copy and the scale of its
+users raised by the same factor without changing the picture. The factor
+is a power of two that divides the width and height, so the tiles keep
+exactly the same size in the world and the pattern does not drift.
+
+The textures folder is shared by every map next to it, so before a file
+is deleted other_map_references() tells which of the other maps still use
+it.
+"""
+import os
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QImageReader
+
+import map_io
+from texture_store import TEXTURE_EXTENSIONS
+from TextureCache import TextureCache
+from utils import resolve_texture_path
+
+MAP_EXTENSIONS = (".yaml", ".yml", map_io.BINARY_EXTENSION, map_io.CHUNKED_EXTENSION)
+
+# Textures only drawn at this scale or below are offered for downscaling
+DOWNSCALE_BELOW = 0.5
+
+# Pixmaps are decoded to 32 bits per pixel
+BYTES_PER_PIXEL = 4
+
+
+class TextureUsage:
+    """Usage of one file in the textures folder"""
+
+    __slots__ = ("path", "file_size", "width", "height", "shapes", "sky", "overlay", "max_scale")
+
+    def __init__(self, path):
+        self.path = path
+        self.file_size = os.path.getsize(path)
+        size = QImageReader(path).size()
+        self.width, self.height = (size.width(), size.height()) if size.isValid() else (0, 0)
+        self.shapes = 0
+        self.sky = False
+        self.overlay = False
+        self.max_scale = None  # Largest texture_scale of the shapes using it
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def decoded_size(self):
+        return self.width * self.height * BYTES_PER_PIXEL
+
+    @property
+    def references(self):
+        return self.shapes + self.sky + self.overlay
+
+    @property
+    def unused(self):
+        return self.references == 0
+
+    @property
+    def downscale_factor(self):
+        """Power of two to shrink the texture by, 1 if it is not only drawn small"""
+        # The sky and overlay are drawn at the size of the view
+        if self.sky or self.overlay or not self.shapes or self.max_scale > DOWNSCALE_BELOW:
+            return 1
+        factor = 1
+        while (self.max_scale * factor * 2 <= 1 and self.width % (factor * 2) == 0
+               and self.height % (factor * 2) == 0):
+            factor *= 2
+        return factor
+
+
+def scan(folder, model, resolve):
+    """TextureUsage of every image in folder, sorted by name.
+
+    model is a map_model.MapModel of the whole map, resolve maps the
+    texture paths in it to files.
+    """
+    usages = {}
+    if folder and os.path.isdir(folder):
+        for name in sorted(os.listdir(folder), key=str.lower):
+            path = os.path.join(folder, name)
+            if name.lower().endswith(TEXTURE_EXTENSIONS) and os.path.isfile(path):
+                usages[TextureCache.key(path)] = TextureUsage(path)
+
+    resolved = {}  # Most shapes share a handful of textures
+
+    def usage_of(texture):
+        if texture not in resolved:
+            path = resolve(texture)
+            resolved[texture] = usages.get(TextureCache.key(path)) if path else None
+        return resolved[texture]
+
+    for shapes in (model.rectangles, model.triangles):
+        for shape in shapes:
+            if not shape.texture:
+                continue
+            usage = usage_of(shape.texture)
+            if usage is None:
+                continue
+            usage.shapes += 1
+            if usage.max_scale is None or shape.texture_scale > usage.max_scale:
+                usage.max_scale = shape.texture_scale
+    if model.sky and usage_of(model.sky):
+        usage_of(model.sky).sky = True
+    if model.overlay and usage_of(model.overlay):
+        usage_of(model.overlay).overlay = True
+    return list(usages.values())
+
+
+def referenced_files(data, map_path):
+    """TextureCache keys of the files the shapes, sky and overlay of map data use"""
+    textures = {data.get("sky"), data.get("parallax_1")}
+    for kind in ("rectangles", "triangles"):
+        for shape in data.get(kind) or []:
+            if isinstance(shape, dict):
+                textures.add(shape.get("texture"))
+    return {TextureCache.key(resolve_texture_path(texture, map_path))
+            for texture in textures if isinstance(texture, str) and texture}
+
+
+def other_map_references(map_path, paths):
+    """{path: [map file names]} of the paths used by the other maps in the folder of map_path.
+
+    A map that cannot be read counts as using every path, nothing it may
+    need is deleted.
+    """
+    folder = os.path.dirname(os.path.abspath(map_path))
+    keys = {TextureCache.key(path): path for path in paths}
+    users = {}
+    for name in sorted(os.listdir(folder)):
+        other = os.path.join(folder, name)
+        if (not name.lower().endswith(MAP_EXTENSIONS) or name.startswith(".") or not os.path.isfile(other)
+                or os.path.normcase(other) == os.path.normcase(os.path.abspath(map_path))):
+            continue
+        try:
+            data = map_io.read_map(other)
+            used = referenced_files(data, other) if isinstance(data, dict) else set(keys)
+        except Exception as e:
+            print(f"Could not read {other} for its textures: {e}")
+            used = set(keys)
+        for key in used & keys.keys():
+            users.setdefault(keys[key], []).append(name)
+    return users
+
+
+def downscaled_name(path, factor):
+    """File name for the copy of the texture at path shrunk by factor, e.g. brick_128x64.png"""
+    stem, extension = os.path.splitext(os.path.basename(path))
+    size = QImageReader(path).size()
+    return f"{stem}_{size.width() // factor}x{size.height() // factor}{extension}"
+
+
+def downscale(path, factor, folder):
+    """Write a copy of the image at path shrunk by factor into folder.
+
+    The copy gets a name of its own, see downscaled_name(), the original is
+    left alone. Returns the path of the copy, None if the image could not be
+    read or written.
+    """
+    image = QImage(path)
+    if image.isNull():
+        return None
+    scaled = image.scaled(image.width() // factor, image.height() // factor,
+                          Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    stem, extension = os.path.splitext(downscaled_name(path, factor))
+    target = os.path.join(folder, stem + extension)
+    number = 1
+    while os.path.exists(target):
+        number += 1
+        target = os.path.join(folder, f"{stem}_{number}{extension}")
+    image_format = bytes(QImageReader.imageFormat(path)).decode() or None
+    if not scaled.save(target, image_format):
+        if os.path.exists(target):
+            os.remove(target)
+        return None
+    return target
@@ -22,3 +22,10 @@ def resolve_texture_path(texture, map_file_path):
         return texture
     # Otherwise, relative path: join with yaml directory
     return os.path.normpath(os.path.join(os.path.dirname(map_file_path), texture))
+
+def format_bytes(size):
+    # Human readable file size, e.g. 1.5 MB
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size} {unit}" if unit == "bytes" else f"{size:.1f} {unit}"
+        size /= 1024